@@ -4,6 +4,7 @@ from io import BytesIO
 from typing import TypedDict, Dict, Optional, List, Set
 import lib.fetch as fetch
 import lib.scrape as scrape
+import lib.name_matching as name_matching
 
 data_path = './data'
 
@@ -40,8 +41,8 @@ files: List[File] = [
 ]
 
 
-for file in files:
-    fetch.download_file_from_url(file['url'], data_path + '/raw/kanton', file['output_file_name'])
+# Downloads in parallel, files which did not change since the last run are skipped
+fetch.download_files_from_urls(files, data_path + '/raw/kanton')
 
 
 
@@ -55,17 +56,16 @@ scrape.scrape_table_to_csv('https://www.agvchapp.bfs.admin.ch/de/communes/result
 # go through all geimeinde and  execute search on Kanton Zürich website by Gemeindename file location: data_path + '/raw/bund', 'gemeinde.csv'
 gemeinde = pd.read_csv(data_path + '/raw/bund/gemeinde.csv')
 
-kanton_matches_by_commune = []
+# Remove (ZH) from Gemeindename
+gemeinde_names = gemeinde['Gemeindename'].str.replace(' (ZH)', '', regex=False)
+# All searches run concurrently over one pooled session
+searches = fetch.search_kanton_zurich_by_keywords(gemeinde_names.tolist())
 
-for index, row in gemeinde.iterrows():
-    # Remove (ZH) from Gemeindename
-    row['Gemeindename'] = row['Gemeindename'].replace(' (ZH)', '')
-    search = fetch.search_kanton_zurich_by_keyword(row['Gemeindename'])
-
-    new_row = {'Gemeindename': row['Gemeindename'], 'BFS_NR': row['BFS-Gde Nummer'], 'matches': search['resultsData']['numberOfResults']}
-    kanton_matches_by_commune.append(new_row)
-
-kanton_matches_by_commune_df = pd.DataFrame(kanton_matches_by_commune) 
+kanton_matches_by_commune_df = pd.DataFrame({
+    'Gemeindename': gemeinde_names,
+    'BFS_NR': gemeinde['BFS-Gde Nummer'],
+    'matches': [search['resultsData']['numberOfResults'] for search in searches],
+})
 kanton_matches_by_commune_df.to_csv(data_path + '/raw/kanton/kanton_matches_by_commune.csv', index=False)
 
 
@@ -77,36 +77,23 @@ scrape.scrape_table_to_csv('https://als.wikipedia.org/wiki/Gemeinden_des_Kantons
 gemeinde = pd.read_csv(data_path + '/raw/bund/gemeinde.csv')
 wiki_names = pd.read_csv(data_path + '/raw/wikipedia/gemeinde_wikipedia.csv').dropna(subset=['Offiziell Name vo dr Gmäind'])
 
-merged_wiki = pd.merge(gemeinde, wiki_names, left_on='Gemeindename', right_on='Offiziell Name vo dr Gmäind', how='left')
-
-# Go thorugh all merged rows and check if 'Offiziell Name vo dr Gmäind' is null
-# If its null try to find the gemeinde if the name is adapted (some gemeinde have a ZH appendix or are missing the appendix)
-for index, row in merged_wiki.iterrows():
-    if pd.isnull(row['Offiziell Name vo dr Gmäind']):
-        name = row['Gemeindename'].replace(' (ZH)', '').replace(' ZH', '')
-        # Find if the name is in the wiki_names
-        if wiki_names['Offiziell Name vo dr Gmäind'].replace(' ZH', '').str.contains(name).any():
-            # Get Wiki Row with the name
-            wiki_row  = wiki_names[wiki_names['Offiziell Name vo dr Gmäind'].replace(' ZH', '').str.contains(name)]
-            # Merge the row with the wiki_names
-            merged_wiki.loc[index, 'Offiziell Name vo dr Gmäind'] = wiki_row['Offiziell Name vo dr Gmäind'].values[0]
-
-
-
-# Stammheim is mising in the wikipedia tables  therefor I must add the pageviews manually
-merged_wiki.loc[merged_wiki['Gemeindename'] == 'Stammheim', 'Offiziell Name vo dr Gmäind'] = 'Stammheim ZH'           
-# Schlatt has a different name in the wikipedia table
-merged_wiki.loc[merged_wiki['Gemeindename'] == 'Schlatt (ZH)', 'Offiziell Name vo dr Gmäind'] = 'Schlatt ZH'
-
+# Match the gemeinde names to the wikipedia names over a normalized name index (canton appendix like " (ZH)" or " ZH",
+# case and diacritics are ignored), names which still differ are matched over a trigram index
+# Stammheim is mising in the wikipedia tables therefor I must add the pageviews manually
+wiki_matches = name_matching.match_names(gemeinde['Gemeindename'], wiki_names['Offiziell Name vo dr Gmäind'], overrides={'Stammheim': 'Stammheim ZH'})
+name_matching.report_matches(wiki_matches)
 
-merged_wiki = merged_wiki[['BFS-Gde Nummer', 'Gemeindename', 'Offiziell Name vo dr Gmäind']]
-# Rename columns
-merged_wiki.columns = ['BFS_NR', 'Gemeindename', 'CH_Gemeindename_wikipedia']
+merged_wiki = pd.DataFrame({
+    'BFS_NR': gemeinde['BFS-Gde Nummer'],
+    'Gemeindename': gemeinde['Gemeindename'],
+    'CH_Gemeindename_wikipedia': wiki_matches['match'],
+})
 
 # Get Pageviews for all comunes and save it to a csv file
-for index, row in merged_wiki.iterrows():
-    search = fetch.fetch_wikipedia_pageviews(row['CH_Gemeindename_wikipedia'].replace(' ', '_'), 2021)
-    merged_wiki.loc[index, 'pageviews'] = search
+# Communes without a match (printed by report_matches above) have no Wikipedia page and keep NaN pageviews
+matched = merged_wiki['CH_Gemeindename_wikipedia'].notna()
+merged_wiki['pageviews'] = float('nan')
+merged_wiki.loc[matched, 'pageviews'] = fetch.fetch_wikipedia_pageviews_batch(merged_wiki.loc[matched, 'CH_Gemeindename_wikipedia'].str.replace(' ', '_').tolist(), 2021)
 
 merged_wiki.to_csv(data_path + '/raw/wikipedia/wiki_pageviews.csv', index=False)
 
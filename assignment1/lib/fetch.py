@@ -1,22 +1,184 @@
 import requests
-from io import BytesIO
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+# The HTTP cache is shared by all assignments, it lives in shared/http_cache.py of the repository root
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+import shared.http_cache as http_cache
 
+max_workers = 16
+# Maximum requests per second per host, hosts which are not listed use default_rate_limit
+host_rate_limits = {
+    'www.zh.ch': 10,
+    'wikimedia.org': 50,
+}
+default_rate_limit = 5
 
-def download_file_from_url(url: str, dir_path: str, output_file_name: str = None):
+
+class RateLimiter:
+    """
+    Spaces the requests to every host by at least 1 / (requests per second), shared by all threads
+    """
+
+    def __init__(self, rate_limits: Dict[str, float], default: float):
+        self.rate_limits = rate_limits
+        self.default = default
+        self.next_slot: Dict[str, float] = {}
+        self.lock = threading.Lock()
+
+    def wait(self, url: str):
+        """
+        Block until the next request to the host of the url is allowed
+        :param url: URL of the request
+        """
+        host = urlparse(url).hostname
+        interval = 1 / self.rate_limits.get(host, self.default)
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+rate_limiter = RateLimiter(host_rate_limits, default_rate_limit)
+
+
+def create_session(pool_size: int = max_workers) -> requests.Session:
+    """
+    Create a session with keep-alive connection pools and retries with exponential backoff
+    (connection errors, 429 and 5xx, honours Retry-After)
+    :param pool_size: Number of connections kept open per host
+    :return: The session
+    """
+    retry = Retry(
+        total=5,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=['GET', 'HEAD'],
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+# Shared by all fetch functions, connections are reused between requests
+session = create_session()
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    """
+    GET request over the shared session with the per host rate limit
+    :param url: URL of the request
+    :param kwargs: Passed to requests.Session.get
+    :return: The response
+    """
+    rate_limiter.wait(url)
+    return session.get(url, timeout=kwargs.pop('timeout', 30), **kwargs)
+
+
+def cached_get(url: str, ttl: float = None, **kwargs) -> http_cache.CachedResponse:
+    """
+    Same as get, but the response is served from the shared HTTP cache if possible (see http_cache.py)
+    :param url: URL of the request
+    :param ttl: Seconds a cached response is fresh (default: HTTP_CACHE_TTL)
+    :param kwargs: Passed to get
+    :return: The response
+    """
+    return http_cache.get(url, ttl=ttl, fetch=get, **kwargs)
+
+
+def map_concurrent(function: Callable, items: Iterable, workers: int = max_workers) -> List:
+    """
+    Call the function for every item with a bounded thread pool
+    :param function: Function with one argument
+    :param items: Arguments
+    :param workers: Number of threads
+    :return: Results in the order of the items
     """
-    Download a file from a URL and save it to a directory
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(function, items))
+
+
+def _read_metadata(path: str) -> dict:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def download_file_from_url(url: str, dir_path: str, output_file_name: str = None, chunk_size: int = 1024 * 1024) -> bool:
+    """
+    Download a file from a URL and save it to a directory.
+    The response is streamed in chunks to a temporary file which is renamed when complete.
+    The ETag / Last-Modified of the response are kept in a sidecar file (<file>.meta.json),
+    the next download is a conditional request and an unchanged file is not downloaded again.
     :param url: URL to download the file from
     :param dir_path: Directory to extract the file to
     :param output_file_name: Name of the file to save as
+    :param chunk_size: Size of the chunks written to disk
+    :return: True if the file was downloaded, False if it did not change
     """
-    print('Downloading file from: ' + url)
-    response = requests.get(url)
-    file = BytesIO(response.content)
     if output_file_name is None:
         output_file_name = url.split('/')[-1]
-    with open(dir_path + '/' + output_file_name, 'wb') as f:
-        f.write(file.getbuffer())
+    path = dir_path + '/' + output_file_name
+    metadata_path = path + '.meta.json'
+    if http_cache.cache.offline:
+        if not os.path.exists(path):
+            raise http_cache.OfflineCacheMiss('Not downloaded yet: ' + url)
+        print('Offline, using existing file: ' + path)
+        return False
+    headers = {}
+    metadata = _read_metadata(metadata_path) if os.path.exists(path) else {}
+    if metadata.get('url') == url:
+        if metadata.get('etag'):
+            headers['If-None-Match'] = metadata['etag']
+        if metadata.get('last_modified'):
+            headers['If-Modified-Since'] = metadata['last_modified']
+
+    print('Downloading file from: ' + url)
+    with get(url, headers=headers, stream=True) as response:
+        if response.status_code == 304:
+            print('Not modified: ' + path)
+            return False
+        response.raise_for_status()
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    f.write(chunk)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        metadata = {'url': url, 'etag': response.headers.get('ETag'), 'last_modified': response.headers.get('Last-Modified')}
+    with open(metadata_path, 'w', encoding='utf-8') as f:
+        json.dump(metadata, f)
     print('Download complete')
+    return True
+
+
+def download_files_from_urls(files: List[dict], dir_path: str, workers: int = max_workers) -> List[bool]:
+    """
+    Download several files in parallel, see download_file_from_url
+    :param files: Dicts with the url and the output_file_name of every file
+    :param dir_path: Directory to extract the files to
+    :param workers: Number of parallel downloads
+    :return: True for every file which was downloaded, False if it did not change
+    """
+    return map_concurrent(lambda file: download_file_from_url(file['url'], dir_path, file.get('output_file_name')), files, workers)
 
 
 def search_kanton_zurich_by_keyword(keyword: str):
@@ -26,7 +188,7 @@ def search_kanton_zurich_by_keyword(keyword: str):
     :return: JSON response from the search
     """
     print('Searching Kanton Zürich website for keyword: ' + keyword)
-    response = requests.get('https://www.zh.ch/de/suche/_jcr_content/searchoverview.zhweb-search.json?fullText=' + keyword + '&noAutoCorrection=false')
+    response = cached_get('https://www.zh.ch/de/suche/_jcr_content/searchoverview.zhweb-search.json?fullText=' + keyword + '&noAutoCorrection=false')
     return response.json()
 
 
@@ -43,7 +205,7 @@ def fetch_wikipedia_pageviews(page: str, year: int) -> int:
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3'
         }
     views = 0
-    response = requests.get('https://wikimedia.org/api/rest_v1/metrics/pageviews/per-article/als.wikipedia/all-access/all-agents/' + page + '/monthly/' + str(year) + '0101/' + str(year) + '1231', headers=headers)
+    response = cached_get('https://wikimedia.org/api/rest_v1/metrics/pageviews/per-article/als.wikipedia/all-access/all-agents/' + page + '/monthly/' + str(year) + '0101/' + str(year) + '1231', headers=headers)
     if response.status_code != 200:
         return views
     response = response.json()
@@ -52,5 +214,23 @@ def fetch_wikipedia_pageviews(page: str, year: int) -> int:
 
     return views
 
-    
-        
\ No newline at end of file
+
+def search_kanton_zurich_by_keywords(keywords: List[str], workers: int = max_workers) -> List[dict]:
+    """
+    Execute searches on Kanton Zürich website concurrently
+    :param keywords: Keywords to search for
+    :param workers: Number of parallel requests
+    :return: JSON responses in the order of the keywords
+    """
+    return map_concurrent(search_kanton_zurich_by_keyword, keywords, workers)
+
+
+def fetch_wikipedia_pageviews_batch(pages: List[str], year: int, workers: int = max_workers) -> List[int]:
+    """
+    Fetch pageviews for several Wikipedia pages concurrently
+    :param pages: Names of the Wikipedia pages
+    :param year: Year to fetch pageviews for
+    :param workers: Number of parallel requests
+    :return: Count per year in the order of the pages
+    """
+    return map_concurrent(lambda page: fetch_wikipedia_pageviews(page, year), pages, workers)
@@ -0,0 +1,131 @@
+import re
+import unicodedata
+import pandas as pd
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Tuple
+
+# Canton suffixes which differ between the sources, e.g. "Schlatt (ZH)" (BFS) and "Schlatt ZH" (Wikipedia)
+canton_suffix_pattern = re.compile(r'\s*(\(ZH\)|\bZH)\s*$')
+
+
+def normalize_commune_name(name: str) -> str:
+    """
+    Normalize a commune name for matching: without canton suffix, lower case, without diacritics and punctuation
+    :param name: Name of the commune, e.g. "Schlatt (ZH)"
+    :return: The normalized name, e.g. "schlatt"
+    """
+    if not isinstance(name, str):
+        return None
+    name = canton_suffix_pattern.sub('', name)
+    decomposed = unicodedata.normalize('NFKD', name)
+    name = ''.join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+    return ' '.join(re.sub(r'[^\w]+', ' ', name).split())
+
+
+def _ngrams(key: str, n: int) -> set:
+    padded = f' {key} '
+    return {padded[i:i + n] for i in range(max(len(padded) - n + 1, 1))}
+
+
+class NameIndex:
+    """
+    Index of candidate names: a hash index of the normalized names and an n-gram index for fuzzy lookups
+    """
+
+    def __init__(self, names: Iterable[str], n: int = 3):
+        """
+        :param names: Candidate names
+        :param n: Length of the n-grams of the fuzzy index
+        """
+        self.n = n
+        self.names: List[str] = []
+        self.keys: List[str] = []
+        self.exact: Dict[str, List[str]] = defaultdict(list)
+        self.ngrams: Dict[str, List[int]] = defaultdict(list)
+        self.ngram_counts: List[int] = []
+        for name in dict.fromkeys(names):
+            key = normalize_commune_name(name)
+            if not key:
+                continue
+            self.exact[key].append(name)
+            grams = _ngrams(key, n)
+            for gram in grams:
+                self.ngrams[gram].append(len(self.names))
+            self.names.append(name)
+            self.keys.append(key)
+            self.ngram_counts.append(len(grams))
+
+    def fuzzy(self, key: str, min_score: float = 0.6) -> Tuple[List[str], float]:
+        """
+        Find the most similar names by the Dice coefficient of their n-grams
+        :param key: Normalized name
+        :param min_score: Minimum similarity (0-1)
+        :return: The best names (several if tied) and their score, empty if no name reaches min_score
+        """
+        grams = _ngrams(key, self.n)
+        shared = Counter(position for gram in grams for position in self.ngrams.get(gram, ()))
+        best, best_score = [], min_score
+        for position, count in shared.items():
+            score = 2 * count / (len(grams) + self.ngram_counts[position])
+            if score > best_score + 1e-9:
+                best, best_score = [self.names[position]], score
+            elif abs(score - best_score) <= 1e-9:
+                best.append(self.names[position])
+        return best, best_score if best else 0.0
+
+
+def match_names(names: pd.Series, candidates: pd.Series, min_score: float = 0.6, overrides: Dict[str, str] = None) -> pd.DataFrame:
+    """
+    Match every name to a candidate: overrides first, then the normalized names are joined in one vectorized pass,
+    only the remaining names are looked up in the n-gram index
+    :param names: Names to match, e.g. the BFS commune names
+    :param candidates: Candidate names, e.g. the communes of the Wikipedia table
+    :param min_score: Minimum similarity of a fuzzy match
+    :param overrides: Fixed matches for names which can not be matched, name -> candidate
+    :return: One row per name (same index): name, match, method (override, exact, fuzzy or None), score, candidates, ambiguous
+    """
+    index = NameIndex(candidates.dropna())
+    unique_names = names.dropna().unique()
+    keys = names.map(dict(zip(unique_names, map(normalize_commune_name, unique_names))))
+    exact = keys.map(dict(index.exact))
+
+    result = pd.DataFrame({'name': names, 'match': None, 'method': None, 'score': 0.0, 'candidates': exact, 'ambiguous': False}, index=names.index)
+    has_exact = exact.notna()
+    result.loc[has_exact, 'match'] = exact[has_exact].str[0]
+    result.loc[has_exact, 'method'] = 'exact'
+    result.loc[has_exact, 'score'] = 1.0
+
+    for position in result.index[~has_exact & keys.notna()]:
+        best, score = index.fuzzy(keys[position], min_score)
+        result.at[position, 'candidates'] = best
+        if best:
+            result.at[position, 'match'] = best[0]
+            result.at[position, 'method'] = 'fuzzy'
+            result.at[position, 'score'] = score
+
+    if overrides:
+        overridden = names.isin(overrides.keys())
+        result.loc[overridden, 'match'] = names[overridden].map(overrides)
+        result.loc[overridden, 'method'] = 'override'
+        result.loc[overridden, 'score'] = 1.0
+        result.loc[overridden, 'candidates'] = result.loc[overridden, 'match'].map(lambda match: [match])
+
+    result['ambiguous'] = result['candidates'].map(lambda found: isinstance(found, list) and len(found) > 1)
+    return result
+
+
+def report_matches(matches: pd.DataFrame) -> pd.DataFrame:
+    """
+    Print the fuzzy, ambiguous and missing matches of match_names
+    :param matches: Result of match_names
+    :return: The rows which need a check
+    """
+    check = matches[(matches['method'] == 'fuzzy') | matches['ambiguous'] | matches['match'].isna()]
+    for _, row in check.iterrows():
+        if row['match'] is None or pd.isna(row['match']):
+            print(f'No match for {row["name"]}')
+        elif row['ambiguous']:
+            print(f'Ambiguous match for {row["name"]}: {row["candidates"]} (using {row["match"]})')
+        else:
+            print(f'Fuzzy match for {row["name"]}: {row["match"]} (score {row["score"]:.2f})')
+    return check
@@ -1,40 +1,158 @@
-import requests
-from bs4 import BeautifulSoup
+import lib.fetch as fetch
 import pandas as pd
-from io import StringIO
+import re
+from pandas.errors import EmptyDataError
+from pandas.io.parsers import TextParser
+from lxml import html as lxml_html
+from typing import List, Union
 
+# Selection of tables: an index, a list of indexes or a regular expression which is searched in the caption
+TableSelection = Union[int, List[int], str]
 
 
-def scrape_table_to_csv(url: str, dir_path: str, output_file_name: str = None, multiple_tables=False):
+# Same whitespace handling as pd.read_html: line breaks and runs of whitespace become a single space
+whitespace_pattern = re.compile(r'[\r\n]+|\s{2,}')
+
+
+def _cell_text(cell) -> str:
+    return whitespace_pattern.sub(' ', cell.text_content().strip())
+
+
+def _is_hidden(element) -> bool:
+    return 'display:none' in element.get('style', '').replace(' ', '')
+
+
+def _expand_spans(rows, remainder: list = None, overflow: bool = True):
+    """
+    Convert <tr> elements to text rows, cells with rowspan or colspan are copied like pd.read_html does
+    :param rows: The <tr> elements (or a <thead> without <tr>)
+    :param remainder: Cells of the previous section which span into these rows, (column, text, remaining rows)
+    :param overflow: Return cells which span beyond the last row as remainder instead of adding rows for them
+    :return: The text rows and the remainder
+    """
+    texts = []
+    remainder = remainder or []
+    for row in rows:
+        values = []
+        next_remainder = []
+        column = 0
+        for cell in row.xpath('./td|./th'):
+            # Cells of earlier rows which span into this row before this cell
+            while remainder and remainder[0][0] <= column:
+                span_column, text, rowspan = remainder.pop(0)
+                values.append(text)
+                if rowspan > 1:
+                    next_remainder.append((span_column, text, rowspan - 1))
+                column += 1
+            text = _cell_text(cell)
+            rowspan = int(cell.get('rowspan') or 1)
+            for _ in range(int(cell.get('colspan') or 1)):
+                values.append(text)
+                if rowspan > 1:
+                    next_remainder.append((column, text, rowspan - 1))
+                column += 1
+        for span_column, text, rowspan in remainder:
+            values.append(text)
+            if rowspan > 1:
+                next_remainder.append((span_column, text, rowspan - 1))
+        texts.append(values)
+        remainder = next_remainder
+    if not overflow:
+        while remainder:
+            texts.append([text for _, text, _ in remainder])
+            remainder = [(span_column, text, rowspan - 1) for span_column, text, rowspan in remainder if rowspan > 1]
+    return texts, remainder
+
+
+def table_to_dataframe(table) -> pd.DataFrame:
+    """
+    Convert an lxml table element to a dataframe with the same result as pd.read_html (lxml flavor, thousands=','):
+    rowspan and colspan are expanded, leading rows of only <th> cells (or <thead>) are the header,
+    several header rows become a MultiIndex and the values are converted by the pandas text parser
+    :param table: The table element, hidden elements must already be removed (see extract_tables)
+    :return: The dataframe or None if the table is empty
+    """
+    header_rows = []
+    for thead in table.xpath('.//thead'):
+        header_rows.extend(thead.xpath('./tr'))
+        if thead.xpath('./td|./th'):  # <thead> without <tr>
+            header_rows.append(thead)
+    body_rows = table.xpath('.//tbody//tr') + table.xpath('./tr')
+    footer_rows = table.xpath('.//tfoot//tr')
+    if not header_rows:
+        while body_rows and all(cell.tag == 'th' for cell in body_rows[0].xpath('./td|./th')):
+            header_rows.append(body_rows.pop(0))
+
+    head, remainder = _expand_spans(header_rows)
+    body, remainder = _expand_spans(body_rows, remainder, overflow=bool(footer_rows))
+    foot, _ = _expand_spans(footer_rows, remainder, overflow=False)
+
+    header = None
+    if head:
+        header = 0 if len(head) == 1 else [i for i, values in enumerate(head) if any(values)]
+    rows = head + body + foot
+    width = max((len(values) for values in rows), default=0)
+    rows = [values + [''] * (width - len(values)) for values in rows]
+    try:
+        with TextParser(rows, header=header, thousands=',') as parser:
+            return parser.read()
+    except EmptyDataError:
+        return None
+
+
+def extract_tables(page: str, tables: TableSelection = None) -> List[pd.DataFrame]:
+    """
+    Parse a page once with lxml and convert the selected tables to dataframes
+    :param page: HTML of the page
+    :param tables: Index, list of indexes or caption pattern of the tables (default: all tables)
+    :return: One dataframe per selected table, empty tables are skipped
+    """
+    document = lxml_html.fromstring(page)
+    # Like pd.read_html: <br> is a line break in the cell text, hidden elements and tables without text are dropped
+    for br in document.iter('br'):
+        br.tail = '\n' + (br.tail or '')
+    all_tables = [table for table in document.iter('table') if any(text.replace('\n', '') for text in table.itertext())]
+    if tables is None:
+        selected = all_tables
+    elif isinstance(tables, int):
+        selected = [all_tables[tables]]
+    elif isinstance(tables, str):
+        pattern = re.compile(tables)
+        selected = [table for table in all_tables if table.find('caption') is not None and pattern.search(_cell_text(table.find('caption')))]
+    else:
+        selected = [all_tables[index] for index in tables]
+
+    frames = []
+    for table in selected:
+        if _is_hidden(table):
+            continue
+        for element in table.xpath('.//style') + [element for element in table.xpath('.//*[@style]') if _is_hidden(element)]:
+            element.drop_tree()
+        df = table_to_dataframe(table)
+        if df is not None:
+            frames.append(df)
+    return frames
+
+
+def scrape_table_to_csv(url: str, dir_path: str, output_file_name: str = None, multiple_tables=False, tables: TableSelection = None):
     """
     Scrape a table from a webpage and save it to a csv file
     :param url: URL of the webpage
     :param dir_path: Directory to extract the file to
     :param output_file_name: Name of the file to save as
-    :param multiple_tables: If the webpage has multiple tables
+    :param multiple_tables: If the webpage has multiple tables (all tables are concatenated)
+    :param tables: Index, list of indexes or caption pattern of the tables, overrides multiple_tables
     """
     # Load the webpage
-    response = requests.get(url)
-    soup = BeautifulSoup(response.text, 'html.parser')
-    
-    # Find the tables
-    
-   
-    tables = soup.find_all('table')[0:1]
-    if multiple_tables:
-         tables = soup.find_all('table')
-    df = pd.DataFrame()
-
-    for i, table in enumerate(tables):
-        #find the table
-        table = soup.find_all('table')[i]
-        # Convert the table to a dataframe
-        table_df = pd.read_html(StringIO(str(table)))[0]
-        df = pd.concat([df, table_df], ignore_index=True)
-
+    response = fetch.cached_get(url)
+    if tables is None and not multiple_tables:
+        tables = 0
 
+    # Concatenate once instead of growing the dataframe per table
+    frames = extract_tables(response.text, tables)
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
 
     # Save the dataframe to a csv file
     df.to_csv(dir_path + '/' + output_file_name, index=False)
 
-    print('Download complete')
\ No newline at end of file
+    print('Download complete')
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The scripts import the helpers as lib.<module> from the assignment directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,80 @@
+import threading
+import time
+import pytest
+import lib.fetch as fetch
+
+
+class FakeStream:
+    def __init__(self, status_code=200, chunks=(b'abc', b'def'), headers=None):
+        self.status_code = status_code
+        self.chunks = chunks
+        self.headers = headers or {'ETag': '"v1"', 'Last-Modified': 'Mon, 01 Jan 2024 00:00:00 GMT'}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(self.status_code)
+
+    def iter_content(self, chunk_size):
+        yield from self.chunks
+
+
+@pytest.fixture
+def requests_made(monkeypatch):
+    # Every request to the server: (url, headers), answered with 304 if the ETag matches
+    made = []
+
+    def get(url, headers=None, **kwargs):
+        made.append((url, dict(headers or {})))
+        return FakeStream(304 if (headers or {}).get('If-None-Match') == '"v1"' else 200)
+    monkeypatch.setattr(fetch, 'get', get)
+    monkeypatch.setattr(fetch.http_cache.cache, 'offline', False)
+    return made
+
+
+def test_map_concurrent_keeps_order():
+    assert fetch.map_concurrent(lambda x: (time.sleep(0.001 * (10 - x)), x * x)[1], range(10), workers=4) == [x * x for x in range(10)]
+
+
+def test_rate_limiter_spaces_requests():
+    limiter = fetch.RateLimiter({'slow.example.org': 20}, 1000)
+    start = time.monotonic()
+    threads = [threading.Thread(target=limiter.wait, args=('https://slow.example.org/x',)) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Five requests at 20 per second: the last one waits 4 intervals
+    assert time.monotonic() - start >= 0.19
+
+
+def test_download_is_conditional(tmp_path, requests_made):
+    assert fetch.download_file_from_url('https://example.org/data.csv', str(tmp_path))
+    assert (tmp_path / 'data.csv').read_bytes() == b'abcdef'
+    assert requests_made[0][1] == {}
+
+    assert not fetch.download_file_from_url('https://example.org/data.csv', str(tmp_path))
+    assert requests_made[1][1]['If-None-Match'] == '"v1"'
+    assert (tmp_path / 'data.csv').read_bytes() == b'abcdef'
+    assert not [path for path in tmp_path.iterdir() if path.name.endswith('.tmp')]
+
+
+def test_failed_download_keeps_the_old_file(tmp_path, monkeypatch):
+    (tmp_path / 'data.csv').write_bytes(b'old')
+
+    class BrokenStream(FakeStream):
+        def iter_content(self, chunk_size):
+            yield b'partial'
+            raise ConnectionError('reset')
+    monkeypatch.setattr(fetch, 'get', lambda url, **kwargs: BrokenStream())
+    monkeypatch.setattr(fetch.http_cache.cache, 'offline', False)
+
+    with pytest.raises(ConnectionError):
+        fetch.download_file_from_url('https://example.org/data.csv', str(tmp_path))
+    assert (tmp_path / 'data.csv').read_bytes() == b'old'
+    assert [path.name for path in tmp_path.iterdir()] == ['data.csv']
@@ -0,0 +1,28 @@
+import pandas as pd
+from lib.name_matching import match_names, normalize_commune_name
+
+
+def test_normalize_commune_name():
+    assert normalize_commune_name('Schlatt (ZH)') == 'schlatt'
+    assert normalize_commune_name('Schlatt ZH') == 'schlatt'
+    assert normalize_commune_name('Bäretswil') == 'baretswil'
+    assert normalize_commune_name('Stammheim  ') == 'stammheim'
+    assert normalize_commune_name(None) is None
+
+
+def test_match_names():
+    names = pd.Series(['Schlatt (ZH)', 'Bäretswil', 'Wädenswil', 'Horgen', 'Wangen-Brüttisellen', 'Atlantis', None], index=range(10, 17))
+    candidates = pd.Series(['Schlatt ZH', 'Baretswil', 'Waedenswil', 'Horgen', 'Horgen', 'Wangen-Bruettisellen', 'Bauma'])
+    matches = match_names(names, candidates, overrides={'Wädenswil': 'Waedenswil'})
+
+    assert list(matches.index) == list(names.index)
+    assert list(matches['match']) == ['Schlatt ZH', 'Baretswil', 'Waedenswil', 'Horgen', 'Wangen-Bruettisellen', None, None]
+    assert list(matches['method']) == ['exact', 'exact', 'override', 'exact', 'fuzzy', None, None]
+    assert not matches['ambiguous'].any()
+    assert 0.6 < matches.loc[14, 'score'] < 1
+
+
+def test_ambiguous_match():
+    matches = match_names(pd.Series(['Au']), pd.Series(['Au (ZH)', 'Au ZH']))
+    assert matches.loc[0, 'ambiguous']
+    assert matches.loc[0, 'candidates'] == ['Au (ZH)', 'Au ZH']
@@ -0,0 +1,94 @@
+from io import StringIO
+import pandas as pd
+import pytest
+import lib.scrape as scrape
+
+# Same structure as the communes table of https://www.agvchapp.bfs.admin.ch/de/communes/results (thead, numbers, dates)
+bfs_page = '''
+<html><body>
+<table class="table">
+  <thead><tr><th>Kanton</th><th>Bezirk-Nr.</th><th>Bezirksname</th><th>BFS-Gde Nummer</th><th>Gemeindename</th><th>Datum der Aufnahme</th></tr></thead>
+  <tbody>
+    <tr><td>ZH</td><td>101</td><td>Bezirk Affoltern</td><td>1</td><td>Aeugst am Albis</td><td>01.01.1960</td></tr>
+    <tr><td>ZH</td><td>101</td><td>Bezirk Affoltern</td><td>2</td><td>Affoltern am Albis</td><td>01.01.1960</td></tr>
+    <tr><td>ZH</td><td>104</td><td>Bezirk Dielsdorf</td><td>81</td><td>Schlatt (ZH)</td><td>01.01.1960</td></tr>
+    <tr><td>ZH</td><td>112</td><td>Bezirk Zürich</td><td>261</td><td>Zürich</td><td>01.01.1960</td></tr>
+  </tbody>
+</table>
+</body></html>
+'''
+
+# Same structure as the tables of https://als.wikipedia.org/wiki/Gemeinden_des_Kantons_Zürich:
+# one table per district with a caption, hidden sort keys, thousands separators,
+# <br> in cells, rowspan / colspan and an empty layout table
+wikipedia_page = '''
+<html><body>
+<table class="toc"><tr><td></td></tr></table>
+<table class="wikitable sortable">
+  <caption>Bezirk Affoltern</caption>
+  <tr><th>Wappe</th><th>Offiziell Name vo dr Gmäind</th><th>Iiwohner</th><th>Flächi<br>in km²</th></tr>
+  <tr><td></td><td><a href="/wiki/Aeugst_am_Albis">Aeugst am Albis</a></td><td><span style="display:none">0001987</span>1,987</td><td>7.91</td></tr>
+  <tr><td></td><td><a href="/wiki/Affoltern_am_Albis">Affoltern am Albis</a><sup>[1]</sup></td><td>12,229</td><td>10.59</td></tr>
+  <tr><td rowspan="2">–</td><td>Bonstette</td><td>5,595</td><td>7.43</td></tr>
+  <tr><td>Hedinge</td><td colspan="2">3,456</td></tr>
+</table>
+<table class="wikitable sortable">
+  <caption>Bezirk Zürich</caption>
+  <tr><th>Wappe</th><th>Offiziell Name vo dr Gmäind</th><th>Iiwohner</th><th>Flächi<br>in km²</th></tr>
+  <tr><td></td><td>Zürich</td><td>421,878</td><td>87.88</td></tr>
+</table>
+<table class="wikitable">
+  <caption>Bezirk Andelfinge</caption>
+  <tr><th>Wappe</th><th>Offiziell Name vo dr Gmäind</th><th>Iiwohner</th><th>Flächi<br>in km²</th></tr>
+  <tr><td></td><td>Schlatt ZH</td><td>709</td><td>8.68</td></tr>
+  <tr><td></td><td>Stammheim ZH</td><td>2,757</td><td>26.81</td></tr>
+</table>
+</body></html>
+'''
+
+# Two header rows with rowspan / colspan become a MultiIndex
+multi_header_page = '''
+<table>
+  <tr><th rowspan="2">Gmäind</th><th colspan="2">Iiwohner</th></tr>
+  <tr><th>2000</th><th>2020</th></tr>
+  <tr><td>Zürich</td><td>363,273</td><td>421,878</td></tr>
+  <tr><td>Winterthur</td><td>90,483</td><td>114,220</td></tr>
+</table>
+'''
+
+
+@pytest.mark.parametrize('page', [bfs_page, wikipedia_page, multi_header_page], ids=['bfs', 'wikipedia', 'multi_header'])
+def test_same_result_as_read_html(page):
+    expected = pd.read_html(StringIO(page), flavor='lxml')
+    frames = scrape.extract_tables(page)
+
+    assert len(frames) == len(expected)
+    for df, expected_df in zip(frames, expected):
+        pd.testing.assert_frame_equal(df, expected_df)
+
+
+def test_thousands_separators_and_header_levels():
+    assert scrape.extract_tables(wikipedia_page, 'Bezirk Zürich')[0]['Iiwohner'].tolist() == [421878]
+
+    df = scrape.extract_tables(multi_header_page)[0]
+    assert df.columns.nlevels == 2
+    assert df[('Iiwohner', '2020')].tolist() == [421878, 114220]
+
+
+def test_select_by_index_and_caption():
+    assert [df.shape for df in scrape.extract_tables(wikipedia_page, [1, 2])] == [(1, 4), (2, 4)]
+    assert scrape.extract_tables(wikipedia_page, 'Andelfinge')[0]['Iiwohner'].tolist() == [709, 2757]
+
+
+@pytest.mark.parametrize('page,multiple_tables', [(bfs_page, False), (wikipedia_page, True)], ids=['bfs', 'wikipedia'])
+def test_csv_same_as_read_html_per_table(tmp_path, monkeypatch, page, multiple_tables):
+    class Response:
+        text = page
+    monkeypatch.setattr(scrape.fetch, 'cached_get', lambda url: Response())
+
+    scrape.scrape_table_to_csv('https://example.org', str(tmp_path), 'table.csv', multiple_tables=multiple_tables)
+
+    expected = pd.read_html(StringIO(page), flavor='lxml')
+    expected = pd.concat(expected if multiple_tables else expected[:1], ignore_index=True)
+    expected.to_csv(tmp_path / 'expected.csv', index=False)
+    assert (tmp_path / 'table.csv').read_text() == (tmp_path / 'expected.csv').read_text()
@@ -1,4 +1,8 @@
-import requests
+import os
+import sys
+# The HTTP cache is shared by all assignments, it lives in shared/http_cache.py of the repository root
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+import shared.http_cache as http_cache
 
 def get_accidents_count(bfs_id: int) -> int:
     """
@@ -7,7 +11,7 @@ def get_accidents_count(bfs_id: int) -> int:
     :return: Number of accidents
     """
     url = f"https://api3.geo.admin.ch/rest/services/api/MapServer/find?layer=ch.astra.unfaelle-personenschaeden_alle&searchText={bfs_id}&searchField=fsocommunecode&returnGeometry=false"
-    response = requests.get(url)
+    response = http_cache.get(url)
     data = response.json()
     # Count array length
     return len(data['results'])
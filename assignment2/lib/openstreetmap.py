@@ -1,5 +1,9 @@
-import requests
 import math
+import os
+import sys
+# The HTTP cache is shared by all assignments, it lives in shared/http_cache.py of the repository root
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+import shared.http_cache as http_cache
 
 
 
@@ -10,7 +14,7 @@ def fetch_overpass_api(query: str) -> dict:
     :return: JSON response
     """
     overpass_url = "http://overpass-api.de/api/interpreter"
-    response = requests.get(overpass_url, params={'data': query})
+    response = http_cache.get(overpass_url, params={'data': query})
     if response.status_code != 200:
         print(f"Error fetching data from Overpass API: {response.status_code}")
     return response.json()
@@ -48,8 +52,8 @@ def get_building_distances(bfs_id: int) -> float:
     """
     
     # Send requests to Overpass API
-    building_response = requests.get(overpass_url, params={"data": building_query})
-    townhall_response = requests.get(overpass_url, params={"data": townhall_query})
+    building_response = http_cache.get(overpass_url, params={"data": building_query})
+    townhall_response = http_cache.get(overpass_url, params={"data": townhall_query})
     
     # Parse JSON responses
     building_data = building_response.json()
@@ -114,7 +118,7 @@ def get_border_coords(country_code):
     """
     
     # Send request to Overpass API
-    border_response = requests.get(overpass_url, params={"data": border_query})
+    border_response = http_cache.get(overpass_url, params={"data": border_query})
     
     # Parse JSON response
     border_data = border_response.json()
@@ -154,7 +158,7 @@ def get_distance_to_border(bfs_id: int, border_coords) -> float:
     """
     
     # Send request to Overpass API
-    city_response = requests.get(overpass_url, params={"data": city_query})
+    city_response = http_cache.get(overpass_url, params={"data": city_query})
     
     # Parse JSON response
     city_data = city_response.json()
@@ -223,8 +227,8 @@ def get_commune_area(bfs_nummer):
     """
     
     # Send requests to Overpass API
-    commune_response = requests.get(overpass_url, params={"data": commune_query})
-    water_response = requests.get(overpass_url, params={"data": water_query})
+    commune_response = http_cache.get(overpass_url, params={"data": commune_query})
+    water_response = http_cache.get(overpass_url, params={"data": water_query})
     
     # Parse JSON responses
     commune_data = commune_response.json()
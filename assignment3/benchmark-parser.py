@@ -0,0 +1,127 @@
+import argparse
+import multiprocessing
+import resource
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+import lib.parser_functions as pf
+import lib.synthetic_tours as synthetic_tours
+
+# Offline benchmark of parser_functions on synthetic hikr pages
+# Example: python benchmark-parser.py --tours 500 --waypoints 20 --peaks 10
+
+
+def benchmark_end_to_end(tours: Dict[str, str], repeat: int) -> float:
+    """
+    Returns the best time of `repeat` runs for parsing all tours with parse_tour.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for file_path, content in tours.items():
+            pf.parse_tour(content, file_path)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def benchmark_fields(tours: Dict[str, str]) -> Dict[str, float]:
+    """
+    Returns the total time per stage: building the shared document, the fiche table, the peak / photo scan
+    and every field extractor on top of them.
+    """
+    timings = defaultdict(float)
+    for file_path, content in tours.items():
+        tour = pf.TourDocument(content, file_path)
+        for stage in ['document', 'fiche', 'peaks_and_photo_count', 'publishing_date_str']:
+            start = time.perf_counter()
+            getattr(tour, stage)
+            timings[f'[{stage}]'] += time.perf_counter() - start
+        for field, parser in pf.field_parsers.items():
+            start = time.perf_counter()
+            parser(tour)
+            timings[field] += time.perf_counter() - start
+    return timings
+
+
+def _reset_peak_rss():
+    # A new process starts with the ru_maxrss of its parent on Linux, clear_refs 5 resets the high water mark (VmHWM)
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def _peak_rss() -> int:
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+def _parse_peak_rss(generator_kwargs: Dict, fields: List[str]) -> Tuple[int, int]:
+    _reset_peak_rss()
+    before = _peak_rss()
+    # Pages are generated one by one so the RSS growth is the parser, the parsed tours are kept like a batch of batch_parser
+    parsed = [pf.parse_tour(content, file_path, fields) for file_path, content in synthetic_tours.iter_tours(**generator_kwargs)]
+    return before, _peak_rss()
+
+
+def measure_peak_memory(generator_kwargs: Dict, fields: List[str] = None) -> Tuple[int, int]:
+    """
+    Returns the peak resident set size of a fresh process before and after parsing the tours.
+    Measured as RSS in a fresh process per call and not with tracemalloc, which does not see the allocations of libxml2 / lxml.
+    """
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return pool.submit(_parse_peak_rss, generator_kwargs, fields).result()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the hikr tour parser on synthetic pages')
+    parser.add_argument('--tours', type=int, default=200)
+    parser.add_argument('--waypoints', type=int, default=8)
+    parser.add_argument('--peaks', type=int, default=3)
+    parser.add_argument('--photos', type=int, default=20)
+    parser.add_argument('--partners', type=int, default=2)
+    parser.add_argument('--fiche-fields', nargs='*', default=None, help='Fiche labels to include, e.g. "Region:" "Aufstieg:" (default: all)')
+    parser.add_argument('--filler-bytes', type=int, default=30000, help='Size of unrelated markup per page')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    generator_kwargs = dict(
+        count=args.tours,
+        seed=args.seed,
+        waypoints=args.waypoints,
+        peaks=args.peaks,
+        photos=args.photos,
+        partners=args.partners,
+        fiche_fields=args.fiche_fields,
+        filler_bytes=args.filler_bytes,
+    )
+    tours = synthetic_tours.generate_tours(**generator_kwargs)
+    total_bytes = sum(len(content.encode('utf-8')) for content in tours.values())
+    print(f'{len(tours)} synthetic tours, {total_bytes / len(tours) / 1024:.1f} KB per tour')
+
+    elapsed = benchmark_end_to_end(tours, args.repeat)
+    print(f'End to end: {len(tours) / elapsed:.1f} tours/sec ({elapsed / len(tours) * 1000:.3f} ms per tour)')
+
+    timings = benchmark_fields(tours)
+    total = sum(timings.values())
+    print(f'\n{"Stage / field":<30}{"ms per tour":>14}{"share":>10}')
+    for field, seconds in sorted(timings.items(), key=lambda item: item[1], reverse=True):
+        print(f'{field:<30}{seconds / len(tours) * 1000:>14.4f}{seconds / total:>10.1%}')
+
+    # Every variant runs in a fresh process, ru_maxrss is a high water mark of the whole process
+    print(f'\n{"Peak RSS":<30}{"total MB":>14}{"parse MB":>10}')
+    for variant, fields in [('all fields', None), ('peaks + photo_count (no DOM)', ['peaks', 'photo_count'])]:
+        before, after = measure_peak_memory(generator_kwargs, fields)
+        print(f'{variant:<30}{after / 1024 / 1024:>14.1f}{(after - before) / 1024 / 1024:>10.1f}')
@@ -0,0 +1,16 @@
+import argparse
+import lib.compaction as compaction
+
+# Packs the raw tours into a few large Parquet files (post_id, html, size) for the Spark job
+# Example: python compact-data.py ./data/raw/200posts.zip ./data/compacted
+# Upload the output directory and read it with spark_functions.read_compacted, or parse it locally with parse-data.py
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compact hikr tours into large Parquet files')
+    parser.add_argument('input', help='Directory, glob pattern of post*.html files, zip or tar(.gz) archive')
+    parser.add_argument('output', nargs='?', default='./data/compacted', help='Output directory of the Parquet files')
+    parser.add_argument('--file-size-mb', type=int, default=512, help='Maximum raw HTML size per file')
+    parser.add_argument('--row-group-size-mb', type=int, default=64, help='Maximum raw HTML size per row group')
+    args = parser.parse_args()
+
+    compaction.compact_corpus(args.input, args.output, args.file_size_mb * 1024 * 1024, args.row_group_size_mb * 1024 * 1024)
@@ -0,0 +1,126 @@
+### Materialized aggregate tables (tours per peak, region and author with ascent statistics)
+### Dashboards read these small tables instead of exploding the parsed tours again
+
+from typing import Dict, List
+from pyspark.sql import DataFrame, SparkSession
+from pyspark.sql.functions import col, count, explode, lit, max, min, sum, when
+from pyspark.sql.utils import AnalysisException
+
+# Aggregate table name -> key columns
+aggregate_keys: Dict[str, List[str]] = {
+    'peaks': ['peak_id', 'peak_name', 'peak_height'],
+    'regions': ['country', 'region_2_content', 'region_3_content'],
+    'authors': ['author_id', 'author_public_name'],
+}
+
+# Fields of the parsed tours which the aggregates need
+aggregate_fields: List[str] = ['peaks', 'regions', 'author_id', 'author_public_name', 'ascent', 'photo_count']
+
+
+def _key_columns(parsed_df: DataFrame, name: str) -> DataFrame:
+    if name == 'peaks':
+        # One row per tour and peak, tour partners are not exploded so every tour is counted once
+        return parsed_df \
+            .select(explode(col('peaks')).alias('peak'), 'ascent', 'photo_count') \
+            .select(col('peak.id').alias('peak_id'), col('peak.name').alias('peak_name'), col('peak.height').alias('peak_height'), 'ascent', 'photo_count')
+    if name == 'regions':
+        return parsed_df.select(col('regions.country').alias('country'), col('regions.region_2_content').alias('region_2_content'), col('regions.region_3_content').alias('region_3_content'), 'ascent', 'photo_count')
+    return parsed_df.select('author_id', 'author_public_name', 'ascent', 'photo_count')
+
+
+def compute_aggregate(parsed_df: DataFrame, name: str) -> DataFrame:
+    """
+    Computes an aggregate table from parsed tours. Only additive statistics are stored
+    (counts, sums, min, max) so tables can be merged with merge_aggregates.
+
+    Parameters:
+    parsed_df (DataFrame): The parsed tours (needs the aggregate_fields).
+    name (str): The name of the aggregate, see aggregate_keys.
+
+    Returns:
+    DataFrame: The aggregate table.
+    """
+    return _key_columns(parsed_df, name) \
+        .groupBy(*aggregate_keys[name]) \
+        .agg(
+            count('*').alias('tour_count'),
+            count('ascent').alias('ascent_count'),
+            sum('ascent').alias('ascent_sum'),
+            min('ascent').alias('ascent_min'),
+            max('ascent').alias('ascent_max'),
+            sum('photo_count').alias('photo_count_sum'),
+        )
+
+
+def merge_aggregates(existing_df: DataFrame, delta_df: DataFrame, name: str) -> DataFrame:
+    """
+    Merges the aggregate of newly added tours into an existing aggregate table.
+
+    Parameters:
+    existing_df (DataFrame): The existing aggregate table.
+    delta_df (DataFrame): The aggregate of the new tours, see compute_aggregate.
+    name (str): The name of the aggregate, see aggregate_keys.
+
+    Returns:
+    DataFrame: The merged aggregate table.
+    """
+    return existing_df.unionByName(delta_df) \
+        .groupBy(*aggregate_keys[name]) \
+        .agg(
+            sum('tour_count').alias('tour_count'),
+            sum('ascent_count').alias('ascent_count'),
+            sum('ascent_sum').alias('ascent_sum'),
+            min('ascent_min').alias('ascent_min'),
+            max('ascent_max').alias('ascent_max'),
+            sum('photo_count_sum').alias('photo_count_sum'),
+        )
+
+
+def build_aggregates(parsed_df: DataFrame, aggregates_path: str):
+    """
+    (Re)builds all aggregate tables from the parsed tours.
+
+    Parameters:
+    parsed_df (DataFrame): All parsed tours.
+    aggregates_path (str): Directory of the aggregate tables, one sub directory per table.
+    """
+    for name in aggregate_keys:
+        compute_aggregate(parsed_df, name).write.mode('overwrite').parquet(f'{aggregates_path}/{name}')
+
+
+def update_aggregates(spark: SparkSession, new_tours_df: DataFrame, aggregates_path: str):
+    """
+    Adds newly parsed tours to the aggregate tables. Only valid for tours which are not yet part of the tables,
+    tours which changed need a rebuild with build_aggregates (min / max can not be retracted).
+
+    Parameters:
+    spark (SparkSession): The spark session.
+    new_tours_df (DataFrame): The newly parsed tours.
+    aggregates_path (str): Directory of the aggregate tables.
+    """
+    for name in aggregate_keys:
+        path = f'{aggregates_path}/{name}'
+        delta_df = compute_aggregate(new_tours_df, name)
+        try:
+            # Checkpoint to cut the lineage, Spark can not overwrite a path it reads from
+            merged_df = merge_aggregates(spark.read.parquet(path), delta_df, name).localCheckpoint()
+        except AnalysisException: # First run, no table yet
+            merged_df = delta_df
+        merged_df.write.mode('overwrite').parquet(path)
+
+
+def read_aggregate(spark: SparkSession, aggregates_path: str, name: str) -> DataFrame:
+    """
+    Reads an aggregate table and adds the average ascent and photo count.
+
+    Parameters:
+    spark (SparkSession): The spark session.
+    aggregates_path (str): Directory of the aggregate tables.
+    name (str): The name of the aggregate, see aggregate_keys.
+
+    Returns:
+    DataFrame: The aggregate table.
+    """
+    return spark.read.parquet(f'{aggregates_path}/{name}') \
+        .withColumn('avg_ascent', when(col('ascent_count') > 0, col('ascent_sum') / col('ascent_count')).otherwise(lit(None))) \
+        .withColumn('avg_photo_count', col('photo_count_sum') / col('tour_count'))
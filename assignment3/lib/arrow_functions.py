@@ -0,0 +1,299 @@
+### Batch oriented parsing of hikr tours into Arrow record batches
+### Can be used with Spark mapInArrow / mapInPandas instead of the row at a time udf
+
+from typing import Dict, Iterable, Iterator, List
+from dataclasses import is_dataclass, asdict
+from datetime import datetime, timedelta, timezone
+from array import array
+import pandas as pd
+import pyarrow as pa
+import lib.parser_functions as pf
+
+
+def _struct(*fields) -> pa.StructType:
+    return pa.struct([pa.field(name, field_type) for name, field_type in fields])
+
+
+# Arrow version of spark_functions.parsed_tour_schema, the field order must stay the same
+parsed_tour_arrow_schema = pa.schema([
+    pa.field("name", pa.string()),
+    pa.field("id", pa.string()),
+    pa.field("author_public_name", pa.string()),
+    pa.field("author_internal_name", pa.string()),
+    pa.field("author_id", pa.string()),
+    pa.field("publishing_date_str", pa.string()),
+    # An instant like Spark's TimestampType, see to_arrow_value
+    pa.field("publishing_date", pa.timestamp('us', tz='UTC')),
+    pa.field("photo_count", pa.int32()),
+    pa.field("peaks", pa.list_(_struct(
+        ("latitude", pa.float32()),
+        ("longitude", pa.float32()),
+        ("name", pa.string()),
+        ("height", pa.int32()),
+        ("id", pa.int32()),
+    ))),
+    pa.field("regions", _struct(
+        ("region_0_content", pa.string()),
+        ("country", pa.string()),
+        ("region_2_content", pa.string()),
+        ("region_3_content", pa.string()),
+        ("region_4_content", pa.string()),
+    )),
+    pa.field("tour_date", pa.date32()),
+    pa.field("waypoints", pa.list_(_struct(
+        ("image", pa.string()),
+        ("name_raw", pa.string()),
+        ("type", pa.string()),
+        ("waypoint_url", pa.string()),
+        ("height", pa.int32()),
+        ("name", pa.string()),
+        ("peak_id", pa.string()),
+    ))),
+    pa.field("hiking_difficulty", _struct(
+        ("hiking_difficulty", pa.string()),
+        ("hiking_difficulty_description", pa.string()),
+    )),
+    pa.field("ascent", pa.int32()),
+    pa.field("descent", pa.int32()),
+    pa.field("duration", pa.string()),
+    pa.field("climbing_difficulty", _struct(
+        ("climbing_difficulty", pa.string()),
+        ("climbing_difficulty_description", pa.string()),
+    )),
+    pa.field("hightour_difficulty", pa.string()),
+    pa.field("mountain_bike_difficulty", _struct(
+        ("mountainbike_difficulty", pa.string()),
+        ("mountainbike_difficulty_description", pa.string()),
+    )),
+    pa.field("via_ferrata_difficulty", pa.string()),
+    pa.field("ski_difficulty", pa.string()),
+    pa.field("snowshoe_difficulty", _struct(
+        ("snowshoe_tour_difficulty", pa.string()),
+        ("snowshoe_tour_difficulty_description", pa.string()),
+    )),
+    pa.field("tour_partner", pa.list_(_struct(
+        ("name", pa.string()),
+        ("user_id", pa.string()),
+    ))),
+    pa.field("page_views", pa.int32()),
+])
+
+
+# Storage variant of parsed_tour_arrow_schema, see parser_functions.slim_tour:
+# difficulties as int8 ordinals without descriptions, duration in seconds
+slim_tour_arrow_schema = pa.schema([
+    pa.field(field.name, pa.int8()) if field.name in pf.difficulty_scales
+    else pa.field(field.name, pa.int32()) if field.name == "duration"
+    else field
+    for field in parsed_tour_arrow_schema
+])
+
+
+def parsed_tour_arrow_schema_for(fields: List[str] = None, slim: bool = False) -> pa.Schema:
+    """
+    Returns the Arrow schema of a parsed tour which only contains the given fields.
+
+    Parameters:
+    fields (List[str]): The fields in output order (default: all fields).
+    slim (bool): Use the slim storage schema (slim_tour_arrow_schema).
+
+    Returns:
+    pa.Schema: The schema.
+    """
+    schema = slim_tour_arrow_schema if slim else parsed_tour_arrow_schema
+    if fields is None:
+        return schema
+    return pa.schema([schema.field(field) for field in fields])
+
+
+def to_arrow_value(value):
+    """
+    Converts a parsed value into plain Python types which pyarrow can consume.
+    Dataclasses become dicts and timedelta becomes a string (same as the Spark schema).
+    Naive datetimes are localized like the udf path does (TimestampType reads them in the local time of the worker)
+    and converted to UTC.
+
+    Parameters:
+    value: A value of a parsed tour.
+
+    Returns:
+    The converted value.
+    """
+    if is_dataclass(value):
+        return asdict(value)
+    if isinstance(value, timedelta):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.astimezone(timezone.utc)
+    if isinstance(value, list):
+        return [to_arrow_value(item) for item in value]
+    return value
+
+
+# array.array type codes of the numeric child columns, their buffers are handed to Arrow without a copy
+array_type_codes = {
+    pa.int32(): 'i',
+    pa.int64(): 'q',
+    pa.float32(): 'f',
+    pa.float64(): 'd',
+}
+
+
+class RecordListBuilder:
+    """
+    Columnar builder for a list<struct> column, e.g. the waypoints, peaks or tour partners of a batch of tours.
+    The records of all tours are accumulated into one flat array per struct field plus list offsets,
+    numeric fields are kept in array.array buffers which become Arrow buffers without a copy.
+    """
+
+    def __init__(self, struct_type: pa.StructType):
+        self.struct_type = struct_type
+        self.names = [child.name for child in struct_type]
+        self.offsets = array('i', [0])
+        self.valid = []
+        self.columns = []
+        self.columns_valid = []
+        for child in struct_type:
+            type_code = array_type_codes.get(child.type)
+            self.columns.append(array(type_code) if type_code else [])
+            self.columns_valid.append([])
+
+    def append(self, records: list):
+        """
+        Appends the records of one tour.
+
+        Parameters:
+        records (list): Dataclass instances or dicts with the fields of the struct, or None.
+        """
+        self.valid.append(records is not None)
+        for record in records or ():
+            for name, column, column_valid in zip(self.names, self.columns, self.columns_valid):
+                value = record.get(name) if isinstance(record, dict) else getattr(record, name)
+                column_valid.append(value is not None)
+                if isinstance(column, array):
+                    column.append(value if value is not None else 0)
+                else:
+                    column.append(value)
+        self.offsets.append(self.offsets[-1] + len(records or ()))
+
+    def _child_array(self, child: pa.Field, column, column_valid: List[bool]) -> pa.Array:
+        if not isinstance(column, array):
+            return pa.array(column, type=child.type)
+        validity = None
+        null_count = column_valid.count(False)
+        if null_count:
+            validity = pa.array(column_valid, type=pa.bool_()).buffers()[1]
+        return pa.Array.from_buffers(child.type, len(column), [validity, pa.py_buffer(column)], null_count)
+
+    def finish(self) -> pa.ListArray:
+        """
+        Builds the Arrow column from the accumulated buffers.
+
+        Returns:
+        pa.ListArray: The list<struct> column, one entry per appended tour.
+        """
+        children = [self._child_array(child, column, column_valid) for child, column, column_valid in zip(self.struct_type, self.columns, self.columns_valid)]
+        values = pa.StructArray.from_arrays(children, fields=list(self.struct_type))
+        mask = None if all(self.valid) else pa.array([not valid for valid in self.valid], type=pa.bool_())
+        offsets = pa.Array.from_buffers(pa.int32(), len(self.offsets), [None, pa.py_buffer(self.offsets)])
+        return pa.ListArray.from_arrays(offsets, values, mask=mask)
+
+
+def tours_to_record_batch(tours: List[Dict], schema: pa.Schema = parsed_tour_arrow_schema) -> pa.RecordBatch:
+    """
+    Builds a record batch column by column from a list of parsed tours.
+
+    Parameters:
+    tours (List[Dict]): The parsed tours, see parser_functions.parse_tour
+    schema (pa.Schema): The schema of the record batch.
+
+    Returns:
+    pa.RecordBatch: The record batch.
+    """
+    arrays = []
+    for field in schema:
+        if pa.types.is_list(field.type) and pa.types.is_struct(field.type.value_type):
+            builder = RecordListBuilder(field.type.value_type)
+            for tour in tours:
+                builder.append(tour.get(field.name))
+            arrays.append(builder.finish())
+            continue
+        values = [to_arrow_value(tour.get(field.name)) for tour in tours]
+        if pa.types.is_struct(field.type):
+            # Only keep the keys known to the schema, e.g. regions can have more levels
+            keys = [child.name for child in field.type]
+            values = [{key: value.get(key) for key in keys} if value is not None else None for value in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def parse_records(values: Iterable[str], file_paths: Iterable[str], fields: List[str] = None, stats: pf.ParseStats = None, slim: bool = False) -> List[Dict]:
+    """
+    Parses the HTML content of a batch of tours.
+
+    Parameters:
+    values (Iterable[str]): The raw HTML contents.
+    file_paths (Iterable[str]): The file paths of the tours.
+    fields (List[str]): Only parse these fields (default: all fields).
+    stats (pf.ParseStats): Record time and failures per field, failing fields become None (optional).
+    slim (bool): Convert the tours into the slim storage representation, see parser_functions.slim_tour.
+
+    Returns:
+    List[Dict]: The parsed tours.
+    """
+    tours = [pf.parse_tour(value, file_path, fields, stats) for value, file_path in zip(values, file_paths)]
+    return [pf.slim_tour(tour) for tour in tours] if slim else tours
+
+
+def parse_arrow_batches(batches: Iterator[pa.RecordBatch], fields: List[str] = None, stats_accumulator=None, passthrough: List[str] = None, slim: bool = False) -> Iterator[pa.RecordBatch]:
+    """
+    Parses batches of (value, file_path) rows. Can be used with DataFrame.mapInArrow:
+    tours_df.mapInArrow(parse_arrow_batches, spark_functions.parsed_tour_schema)
+    To only parse some fields see spark_functions.parse_tours.
+
+    Parameters:
+    batches (Iterator[pa.RecordBatch]): Record batches with a `value` and a `file_path` column.
+    fields (List[str]): Only parse these fields (default: all fields).
+    stats_accumulator: Receives the pf.ParseStats of every batch via add(), e.g. a Spark accumulator.
+                       Failing fields are then set to None instead of failing the task (optional).
+    passthrough (List[str]): Columns of the input batches which are appended unchanged to the output (optional).
+    slim (bool): Output the slim storage schema (slim_tour_arrow_schema).
+
+    Returns:
+    Iterator[pa.RecordBatch]: The parsed tours, one output batch per input batch.
+    """
+    schema = parsed_tour_arrow_schema_for(fields, slim)
+    for batch in batches:
+        stats = pf.ParseStats() if stats_accumulator is not None else None
+        tours = parse_records(batch.column('value').to_pylist(), batch.column('file_path').to_pylist(), fields, stats, slim)
+        if stats is not None:
+            stats_accumulator.add(stats)
+        parsed = tours_to_record_batch(tours, schema)
+        if passthrough:
+            parsed = pa.RecordBatch.from_arrays(
+                parsed.columns + [batch.column(name) for name in passthrough],
+                names=schema.names + passthrough,
+            )
+        yield parsed
+
+
+def parse_pandas_batches(batches: Iterator[pd.DataFrame], fields: List[str] = None, stats_accumulator=None, slim: bool = False) -> Iterator[pd.DataFrame]:
+    """
+    Same as parse_arrow_batches but for DataFrame.mapInPandas.
+
+    Parameters:
+    batches (Iterator[pd.DataFrame]): DataFrames with a `value` and a `file_path` column.
+    fields (List[str]): Only parse these fields (default: all fields).
+    stats_accumulator: Receives the pf.ParseStats of every batch via add(), see parse_arrow_batches (optional).
+    slim (bool): Output the slim storage schema (slim_tour_arrow_schema).
+
+    Returns:
+    Iterator[pd.DataFrame]: The parsed tours, one output DataFrame per input DataFrame.
+    """
+    schema = parsed_tour_arrow_schema_for(fields, slim)
+    for batch in batches:
+        stats = pf.ParseStats() if stats_accumulator is not None else None
+        tours = parse_records(batch['value'], batch['file_path'], fields, stats, slim)
+        if stats is not None:
+            stats_accumulator.add(stats)
+        yield tours_to_record_batch(tours, schema).to_pandas()
@@ -0,0 +1,196 @@
+### Local multi process parser which writes the parsed tours into Parquet shards
+### Used by parse-data.py, a single node alternative to the Spark job
+
+from typing import Dict, List, Tuple
+from multiprocessing import Pool
+from collections import deque
+from itertools import islice
+import json
+import os
+import pyarrow as pa
+import pyarrow.parquet as pq
+import lib.parser_functions as pf
+import lib.arrow_functions as af
+import lib.corpus as corpus
+from lib.parse_cache import ParseCache
+
+
+def plan_shards(members: List[Tuple[str, int]], max_shard_bytes: int) -> List[List[str]]:
+    """
+    Groups the tours into shards of at most max_shard_bytes raw HTML (at least one tour per shard).
+
+    Parameters:
+    members (List[Tuple[str, int]]): The member names and sizes, see corpus.list_members
+    max_shard_bytes (int): The maximum size of the raw HTML per shard.
+
+    Returns:
+    List[List[str]]: The member names per shard.
+    """
+    shards = []
+    shard = []
+    shard_bytes = 0
+    for name, size in members:
+        if shard and shard_bytes + size > max_shard_bytes:
+            shards.append(shard)
+            shard = []
+            shard_bytes = 0
+        shard.append(name)
+        shard_bytes += size
+    if shard:
+        shards.append(shard)
+    return shards
+
+
+def shard_path(output_dir: str, index: int) -> str:
+    return os.path.join(output_dir, f'part-{index:05d}.parquet')
+
+
+def parse_tours_safe(tours, cache: ParseCache = None, fields: List[str] = None, stats: pf.ParseStats = None) -> List[dict]:
+    """
+    Parses (file_path, html) pairs, tours which fail to parse are reported and skipped.
+
+    Parameters:
+    tours: Iterable of (file_path, html) pairs.
+    cache (ParseCache): Serve unchanged tours and fields from this cache (optional).
+    fields (List[str]): Only parse these fields (default: all fields).
+    stats (pf.ParseStats): Record time and failures per field, failing fields become None instead of skipping the tour (optional).
+
+    Returns:
+    List[dict]: The parsed tours.
+    """
+    parsed = []
+    for file_path, content in tours:
+        try:
+            parsed.append(cache.parse_tour(content, file_path, fields, stats) if cache else pf.parse_tour(content, file_path, fields, stats))
+        except Exception as e:
+            print(f'Failed to parse {file_path}: {e!r}')
+    return parsed
+
+
+def write_shard(tours: List[dict], output_dir: str, index: int, fields: List[str] = None, slim: bool = False) -> int:
+    """
+    Writes the parsed tours of a shard. The file is written to a temporary name first and then renamed,
+    so an existing shard file is always complete.
+
+    Parameters:
+    tours (List[dict]): The parsed tours.
+    output_dir (str): The directory of the Parquet shards.
+    index (int): The index of the shard.
+    fields (List[str]): The parsed fields (default: all fields).
+    slim (bool): Write the slim storage schema, see parser_functions.slim_tour.
+
+    Returns:
+    int: The number of written tours.
+    """
+    path = shard_path(output_dir, index)
+    schema = af.parsed_tour_arrow_schema_for(fields, slim)
+    if slim:
+        tours = [pf.slim_tour(tour) for tour in tours]
+    table = pa.Table.from_batches([af.tours_to_record_batch(tours, schema)], schema=schema)
+    # Hidden while in progress, pyarrow and Spark skip files starting with .
+    tmp_path = os.path.join(output_dir, f'.part-{index:05d}.parquet.tmp')
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, path)
+    return len(tours)
+
+
+# One cache per worker process
+_caches: Dict[str, ParseCache] = {}
+
+
+def _get_cache(cache_dir: str) -> ParseCache:
+    if cache_dir is None:
+        return None
+    if cache_dir not in _caches:
+        _caches[cache_dir] = ParseCache(cache_dir)
+    return _caches[cache_dir]
+
+
+def _parse_shard(index: int, tours: List[Tuple[str, str]], output_dir: str, cache_dir: str = None, fields: List[str] = None, slim: bool = False) -> Tuple[int, int, Dict, pf.ParseStats]:
+    cache = _get_cache(cache_dir)
+    stats = pf.ParseStats()
+    count = write_shard(parse_tours_safe(tours, cache, fields, stats), output_dir, index, fields, slim)
+    return index, count, cache.stats() if cache else None, stats
+
+
+def corpus_source(path: str, max_shard_bytes: int) -> Dict:
+    """
+    Identifies the corpus a shard plan was built from: the absolute path, the shard size and for a single file
+    (archive, compacted Parquet file) its size and modification time. Directories and glob patterns are only identified
+    by their path, so files added in the meantime do not change the plan of an interrupted run.
+    """
+    source = {'path': os.path.abspath(path), 'max_shard_bytes': max_shard_bytes}
+    if os.path.isfile(path):
+        stat = os.stat(path)
+        source.update(size=stat.st_size, mtime=stat.st_mtime)
+    return source
+
+
+def load_or_create_plan(path: str, output_dir: str, max_shard_bytes: int) -> List[List[str]]:
+    """
+    Loads the shard plan of a previous run from the output directory or creates a new one.
+    Keeping the plan makes resuming independent of files added in the meantime.
+    A plan of a different corpus (see corpus_source) is replaced and the shards written with it are deleted.
+    """
+    plan_path = os.path.join(output_dir, '_shards.json')
+    source = corpus_source(path, max_shard_bytes)
+    if os.path.exists(plan_path):
+        with open(plan_path, 'r', encoding='utf-8') as f:
+            plan = json.load(f)
+        if plan['source'] == source:
+            return plan['shards']
+        print(f'{plan_path} was built from another corpus, deleting its shards and planning again')
+        for name in os.listdir(output_dir):
+            if name.startswith('part-') and name.endswith('.parquet'):
+                os.remove(os.path.join(output_dir, name))
+    shards = plan_shards(corpus.list_members(path), max_shard_bytes)
+    with open(plan_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump({'source': source, 'shards': shards}, f)
+    os.replace(plan_path + '.tmp', plan_path)
+    return shards
+
+
+def _report(result: Tuple[int, int, Dict, pf.ParseStats], stats: pf.ParseStats):
+    index, count, cache_stats, shard_stats = result
+    stats.merge(shard_stats)
+    failures = sum(shard_stats.failures.values())
+    print(f'Shard {index} done: {count} tours' + (f', {failures} failed fields' if failures else '') + (f', cache of worker: {cache_stats}' if cache_stats else ''))
+
+
+def parse_to_parquet(path: str, output_dir: str, max_shard_bytes: int = 64 * 1024 * 1024, processes: int = None, cache_dir: str = None, fields: List[str] = None, slim: bool = False):
+    """
+    Parses all tours of a corpus with a process pool into Parquet shards.
+    The corpus is read sequentially in this process and whole shards are handed to the workers.
+    Shards which already exist in output_dir are skipped, so an interrupted run can be resumed.
+    Fields which fail to parse are written as null, the time and failures per field are printed at the end.
+
+    Parameters:
+    path (str): A directory, a glob pattern of post*.html files, a zip or a tar(.gz) archive.
+    output_dir (str): The directory of the Parquet shards.
+    max_shard_bytes (int): The maximum size of the raw HTML per shard.
+    processes (int): The number of worker processes (default: number of cores).
+    cache_dir (str): Directory of a ParseCache, tours and fields which did not change are not parsed again (optional).
+    fields (List[str]): Only parse these fields (default: all fields).
+    slim (bool): Write the slim storage schema, difficulties as ordinals and duration in seconds.
+    """
+    af.parsed_tour_arrow_schema_for(fields) # Fails early on unknown fields
+    os.makedirs(output_dir, exist_ok=True)
+    shards = load_or_create_plan(path, output_dir, max_shard_bytes)
+    pending = [(index, names) for index, names in enumerate(shards) if not os.path.exists(shard_path(output_dir, index))]
+    print(f'{len(shards)} shards, {len(shards) - len(pending)} already done')
+
+    processes = processes or os.cpu_count()
+    stats = pf.ParseStats()
+    tours = corpus.iter_members(path, [name for _, names in pending for name in names])
+    with Pool(processes) as pool:
+        running = deque()
+        for index, names in pending:
+            shard_tours = list(islice(tours, len(names)))
+            running.append(pool.apply_async(_parse_shard, (index, shard_tours, output_dir, cache_dir, fields, slim)))
+            # Only keep a few shards in memory
+            while len(running) >= 2 * processes:
+                _report(running.popleft().get(), stats)
+        while running:
+            _report(running.popleft().get(), stats)
+    if stats.calls:
+        print(stats.summary().to_string(index=False))
@@ -0,0 +1,218 @@
+### Co-hiking graph: users are connected if they were on the same tour (author and tour partners)
+### Stored as compressed sparse rows (CSR) over integer user ids, the edge weight is the number of shared tours
+
+from typing import TYPE_CHECKING, Dict, Iterable, List, Tuple
+from array import array
+from collections import defaultdict, deque
+import pyarrow.parquet as pq
+
+# pyspark is only needed for from_spark, the graph itself works without it
+if TYPE_CHECKING:
+    from pyspark.sql import DataFrame
+
+
+def tour_participants(tour: Dict) -> List[str]:
+    """
+    Returns the internal user names of the author and the tour partners of a parsed tour.
+
+    Parameters:
+    tour (Dict): A parsed tour, see parser_functions.parse_tour (needs author_internal_name and tour_partner).
+
+    Returns:
+    List[str]: The user names.
+    """
+    participants = [tour.get('author_internal_name')]
+    for partner in tour.get('tour_partner') or []:
+        participants.append(partner['user_id'] if isinstance(partner, dict) else partner.user_id)
+    return [user for user in participants if user]
+
+
+class CoHikingGraph:
+    """
+    Undirected weighted graph of users who hiked together.
+    The user names are interned to ids 0..n-1, the neighbors of user i are
+    neighbor_ids[offsets[i]:offsets[i + 1]] with the number of shared tours in the same positions of weights.
+    """
+
+    def __init__(self, names: List[str], offsets: array, neighbor_ids: array, weights: array, tour_counts: array):
+        self.names = names
+        self.ids: Dict[str, int] = {name: i for i, name in enumerate(names)}
+        self.offsets = offsets
+        self.neighbor_ids = neighbor_ids
+        self.weights = weights
+        self.tour_counts = tour_counts
+        self._components: array = None
+
+    @classmethod
+    def build(cls, tours: Iterable[Iterable[str]]) -> 'CoHikingGraph':
+        """
+        Builds the graph from the participants of every tour.
+
+        Parameters:
+        tours (Iterable[Iterable[str]]): The user names of every tour, e.g. tour_participants of the parsed tours.
+
+        Returns:
+        CoHikingGraph: The graph.
+        """
+        ids: Dict[str, int] = {}
+        tour_counts = array('i')
+        # (smaller id << 32 | larger id) -> shared tours, one int per edge instead of a tuple
+        edge_weights: Dict[int, int] = defaultdict(int)
+        for participants in tours:
+            users = set()
+            for name in participants:
+                user = ids.get(name)
+                if user is None:
+                    user = ids[name] = len(ids)
+                    tour_counts.append(0)
+                users.add(user)
+            users = sorted(users)
+            for user in users:
+                tour_counts[user] += 1
+            for i, a in enumerate(users):
+                for b in users[i + 1:]:
+                    edge_weights[(a << 32) | b] += 1
+
+        degrees = array('q', bytes(8 * (len(ids) + 1)))
+        for key in edge_weights:
+            degrees[key >> 32] += 1
+            degrees[key & 0xFFFFFFFF] += 1
+        offsets = array('q', [0])
+        for degree in degrees[:len(ids)]:
+            offsets.append(offsets[-1] + degree)
+        neighbor_ids = array('i', bytes(4 * offsets[-1]))
+        weights = array('i', bytes(4 * offsets[-1]))
+        fill = array('q', offsets[:len(ids)])
+        for key, weight in edge_weights.items():
+            a, b = key >> 32, key & 0xFFFFFFFF
+            neighbor_ids[fill[a]], weights[fill[a]] = b, weight
+            fill[a] += 1
+            neighbor_ids[fill[b]], weights[fill[b]] = a, weight
+            fill[b] += 1
+        return cls(list(ids), offsets, neighbor_ids, weights, tour_counts)
+
+    @classmethod
+    def from_tours(cls, tours: Iterable[Dict]) -> 'CoHikingGraph':
+        """
+        Builds the graph from parsed tours, see parser_functions.parse_tour.
+        """
+        return cls.build(tour_participants(tour) for tour in tours)
+
+    @classmethod
+    def read(cls, path: str) -> 'CoHikingGraph':
+        """
+        Builds the graph from the Parquet shards of parse-data.py, only the author and partner columns are read.
+        """
+        def participants():
+            table = pq.read_table(path, columns=['author_internal_name', 'tour_partner'])
+            for batch in table.to_batches():
+                yield from map(tour_participants, batch.to_pylist())
+        return cls.build(participants())
+
+    @classmethod
+    def from_spark(cls, parsed_df: 'DataFrame') -> 'CoHikingGraph':
+        """
+        Builds the graph on the driver from a DataFrame of parsed tours, the rows are streamed partition by partition.
+        """
+        from pyspark.sql.functions import col
+        rows = parsed_df.select('author_internal_name', col('tour_partner.user_id').alias('partner_ids')).toLocalIterator()
+        return cls.build([user for user in [row.author_internal_name, *(row.partner_ids or [])] if user] for row in rows)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.ids
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.neighbor_ids) // 2
+
+    def nbytes(self) -> int:
+        """
+        Returns the size of the CSR arrays in bytes (without the user names).
+        """
+        return sum(buffer.itemsize * len(buffer) for buffer in [self.offsets, self.neighbor_ids, self.weights, self.tour_counts])
+
+    def tour_count(self, name: str) -> int:
+        """
+        Returns the number of tours of a user (as author or partner).
+        """
+        return self.tour_counts[self.ids[name]]
+
+    def degree(self, name: str) -> int:
+        """
+        Returns the number of distinct users a user hiked with.
+        """
+        user = self.ids[name]
+        return self.offsets[user + 1] - self.offsets[user]
+
+    def neighbors(self, name: str, limit: int = None) -> List[Tuple[str, int]]:
+        """
+        Returns the users a user hiked with.
+
+        Parameters:
+        name (str): The internal user name.
+        limit (int): Only return the users with the most shared tours (default: all).
+
+        Returns:
+        List[Tuple[str, int]]: The user names and the number of shared tours, most shared tours first.
+        """
+        user = self.ids[name]
+        start, end = self.offsets[user], self.offsets[user + 1]
+        neighbors = sorted(zip(self.neighbor_ids[start:end], self.weights[start:end]), key=lambda neighbor: neighbor[1], reverse=True)
+        return [(self.names[neighbor], weight) for neighbor, weight in neighbors[:limit]]
+
+    def shared_tours(self, name: str, other: str) -> int:
+        """
+        Returns the number of tours two users were on together.
+        """
+        user, other_user = self.ids[name], self.ids[other]
+        start, end = self.offsets[user], self.offsets[user + 1]
+        for neighbor, weight in zip(self.neighbor_ids[start:end], self.weights[start:end]):
+            if neighbor == other_user:
+                return weight
+        return 0
+
+    def connected_components(self) -> array:
+        """
+        Labels the connected components with a breadth first search, computed once.
+
+        Returns:
+        array: The component label of every user id, labels are numbered in order of discovery.
+        """
+        if self._components is not None:
+            return self._components
+        labels = array('i', [-1]) * len(self.names)
+        label = 0
+        for root in range(len(self.names)):
+            if labels[root] != -1:
+                continue
+            labels[root] = label
+            queue = deque([root])
+            while queue:
+                user = queue.popleft()
+                for neighbor in self.neighbor_ids[self.offsets[user]:self.offsets[user + 1]]:
+                    if labels[neighbor] == -1:
+                        labels[neighbor] = label
+                        queue.append(neighbor)
+            label += 1
+        self._components = labels
+        return labels
+
+    def component(self, name: str) -> List[str]:
+        """
+        Returns all users which are connected to a user over any number of shared tours.
+        """
+        labels = self.connected_components()
+        label = labels[self.ids[name]]
+        return [self.names[user] for user, user_label in enumerate(labels) if user_label == label]
+
+    def component_sizes(self) -> List[int]:
+        """
+        Returns the sizes of all connected components, largest first.
+        """
+        sizes = defaultdict(int)
+        for label in self.connected_components():
+            sizes[label] += 1
+        return sorted(sizes.values(), reverse=True)
@@ -0,0 +1,78 @@
+### Packs the many small tour HTML files into a few large Parquet files (post_id, html, size)
+### Spark then lists and opens a handful of files instead of 46k-113k tiny objects
+
+from typing import List, Tuple
+import math
+import os
+import pyarrow as pa
+import pyarrow.parquet as pq
+import lib.corpus as corpus
+import lib.parser_functions as pf
+from lib.batch_parser import plan_shards
+
+compacted_schema = pa.schema([
+    pa.field('post_id', pa.string()),
+    pa.field('html', pa.string()),
+    pa.field('size', pa.int64()),
+])
+
+
+def balanced_groups(members: List[Tuple[str, int]], max_group_bytes: int) -> List[List[Tuple[str, int]]]:
+    """
+    Splits the members into the smallest number of groups of at most ~max_group_bytes,
+    with all groups of about the same size (instead of a small last group).
+
+    Parameters:
+    members (List[Tuple[str, int]]): The member names and sizes.
+    max_group_bytes (int): The target maximum size of a group.
+
+    Returns:
+    List[List[Tuple[str, int]]]: The groups.
+    """
+    total = sum(size for _, size in members)
+    if total == 0:
+        return [members] if members else []
+    count = math.ceil(total / max_group_bytes)
+    target = total / count
+    groups = [[]]
+    cumulative = 0
+    for member in members:
+        if groups[-1] and cumulative >= target * len(groups):
+            groups.append([])
+        groups[-1].append(member)
+        cumulative += member[1]
+    return groups
+
+
+def compact_corpus(path: str, output_dir: str, max_file_bytes: int = 512 * 1024 * 1024, max_row_group_bytes: int = 64 * 1024 * 1024):
+    """
+    Packs the tours of a corpus (see corpus.list_members) into Parquet files with balanced row groups.
+    The output can be read with spark_functions.read_compacted or, like any corpus, with corpus.iter_members (parse-data.py).
+
+    Parameters:
+    path (str): A directory, a glob pattern, a zip or a tar(.gz) archive.
+    output_dir (str): The directory of the compacted Parquet files.
+    max_file_bytes (int): The maximum raw HTML size per file.
+    max_row_group_bytes (int): The maximum raw HTML size per row group.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    members = corpus.list_members(path)
+    sizes = dict(members)
+    files = plan_shards(members, max_file_bytes)
+    tours = corpus.iter_members(path)
+    for index, names in enumerate(files):
+        file_path = os.path.join(output_dir, f'compacted-{index:05d}.parquet')
+        # Hidden while in progress, Spark / pyarrow skip files starting with . and corpus.compacted_files only takes *.parquet
+        tmp_path = os.path.join(output_dir, f'.compacted-{index:05d}.parquet.tmp')
+        with pq.ParquetWriter(tmp_path, compacted_schema, compression='zstd') as writer:
+            for group in balanced_groups([(name, sizes[name]) for name in names], max_row_group_bytes):
+                rows = [next(tours) for _ in group]
+                table = pa.Table.from_pydict({
+                    'post_id': [pf.parse_tour_id(name) for name, _ in rows],
+                    'html': [html for _, html in rows],
+                    'size': [size for _, size in group],
+                }, schema=compacted_schema)
+                writer.write_table(table, row_group_size=len(rows))
+        os.replace(tmp_path, file_path)
+        print(f'{file_path}: {len(names)} tours')
+
@@ -0,0 +1,147 @@
+### Reads the hikr corpus from a directory, a glob pattern, directly from zip / tar(.gz) archives
+### or from the Parquet files of compaction.compact_corpus. Archives are read member by member without extracting them to disk
+
+from typing import Iterator, List, Tuple
+import fnmatch
+import glob
+import os
+import tarfile
+import zipfile
+import pyarrow.parquet as pq
+import lib.parser_functions as pf
+
+tour_file_pattern = 'post*.html'
+read_buffer_size = 1024 * 1024
+
+
+def is_zip(path: str) -> bool:
+    return path.endswith('.zip')
+
+
+def is_tar(path: str) -> bool:
+    return path.endswith(('.tar', '.tar.gz', '.tgz'))
+
+
+def is_tour_member(name: str) -> bool:
+    return fnmatch.fnmatch(os.path.basename(name), tour_file_pattern)
+
+
+def compacted_files(path: str) -> List[str]:
+    """
+    Returns the compacted Parquet files of a path, files in progress (hidden .tmp files) are skipped.
+    """
+    if os.path.isdir(path):
+        return sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith('.parquet') and not name.startswith(('.', '_')))
+    return [path] if path.endswith('.parquet') else []
+
+
+def is_compacted(path: str) -> bool:
+    return bool(compacted_files(path))
+
+
+def list_members(path: str) -> List[Tuple[str, int]]:
+    """
+    Lists the tours of a corpus in the order iter_members reads them.
+
+    Parameters:
+    path (str): A directory, a glob pattern, a zip or a tar(.gz) archive or compacted Parquet files.
+
+    Returns:
+    List[Tuple[str, int]]: The member names (file paths for directories, post ids for compacted files) and their size in bytes.
+    """
+    if is_compacted(path):
+        return _list_compacted(path)
+    if is_zip(path):
+        with zipfile.ZipFile(path) as archive:
+            return [(info.filename, info.file_size) for info in archive.infolist() if is_tour_member(info.filename)]
+    if is_tar(path):
+        # tar.gz has no index, listing means decompressing it once
+        with tarfile.open(path, 'r:*') as archive:
+            return [(member.name, member.size) for member in archive if member.isfile() and is_tour_member(member.name)]
+    if os.path.isdir(path):
+        path = os.path.join(path, tour_file_pattern)
+    return [(file_path, os.path.getsize(file_path)) for file_path in sorted(glob.glob(path))]
+
+
+def _iter_zip(path: str, members: List[str] = None) -> Iterator[Tuple[str, str]]:
+    with open(path, 'rb', buffering=read_buffer_size) as f:
+        with zipfile.ZipFile(f) as archive:
+            if members is None:
+                members = [name for name in archive.namelist() if is_tour_member(name)]
+            for name in members:
+                yield name, archive.read(name).decode('utf-8')
+
+
+def _iter_tar(path: str, members: List[str] = None) -> Iterator[Tuple[str, str]]:
+    wanted = set(members) if members is not None else None
+    # Stream mode, the archive is read once from front to back
+    with tarfile.open(path, 'r|*', bufsize=read_buffer_size) as archive:
+        for member in archive:
+            if not member.isfile() or not is_tour_member(member.name):
+                continue
+            if wanted is not None and member.name not in wanted:
+                continue
+            yield member.name, archive.extractfile(member).read().decode('utf-8')
+
+
+def _list_compacted(path: str) -> List[Tuple[str, int]]:
+    # Only the post_id and size columns are read, not the HTML
+    members = []
+    for file_path in compacted_files(path):
+        table = pq.read_table(file_path, columns=['post_id', 'size'])
+        members.extend(zip(table.column('post_id').to_pylist(), table.column('size').to_pylist()))
+    return members
+
+
+def _iter_compacted(path: str, members: List[str] = None) -> Iterator[Tuple[str, str]]:
+    # One row group at a time
+    wanted = set(members) if members is not None else None
+    for file_path in compacted_files(path):
+        parquet_file = pq.ParquetFile(file_path)
+        for group in range(parquet_file.num_row_groups):
+            table = parquet_file.read_row_group(group, columns=['post_id', 'html'])
+            for post_id, html in zip(table.column('post_id').to_pylist(), table.column('html').to_pylist()):
+                if wanted is None or post_id in wanted:
+                    yield post_id, html
+
+
+def _iter_files(file_paths: List[str]) -> Iterator[Tuple[str, str]]:
+    for file_path in file_paths:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            yield file_path, f.read()
+
+
+def iter_members(path: str, members: List[str] = None) -> Iterator[Tuple[str, str]]:
+    """
+    Iterates over the tours of a corpus.
+
+    Parameters:
+    path (str): A directory, a glob pattern, a zip or a tar(.gz) archive or compacted Parquet files.
+    members (List[str]): Only read these members (default: all tours), see list_members.
+
+    Returns:
+    Iterator[Tuple[str, str]]: (member name, html) pairs. The member name can be passed to parser_functions.parse_tour as file path.
+    """
+    if is_zip(path):
+        return _iter_zip(path, members)
+    if is_tar(path):
+        return _iter_tar(path, members)
+    if is_compacted(path):
+        return _iter_compacted(path, members)
+    if members is None:
+        members = [name for name, _ in list_members(path)]
+    return _iter_files(members)
+
+
+def iter_posts(path: str) -> Iterator[Tuple[str, str]]:
+    """
+    Iterates over the tours of a corpus.
+
+    Parameters:
+    path (str): A directory, a glob pattern, a zip or a tar(.gz) archive or compacted Parquet files.
+
+    Returns:
+    Iterator[Tuple[str, str]]: (post id, html) pairs.
+    """
+    for name, content in iter_members(path):
+        yield pf.parse_tour_id(name), content
@@ -0,0 +1,143 @@
+### On disk cache of parsed tours
+### Entries are keyed by the hash of the HTML content and store every field together with the version of its extractor,
+### so only fields whose extractor changed (parser_functions.field_versions) are parsed again
+
+from typing import Dict, List
+import hashlib
+import os
+import pickle
+import lib.parser_functions as pf
+
+# Depend on the file path and not on the content, always computed
+uncached_fields = {'id'}
+
+
+def content_hash(html_content: str) -> str:
+    return hashlib.sha256(html_content.encode('utf-8')).hexdigest()
+
+
+class ParseCache:
+    """
+    Content addressed cache of parsed tours with size bounded LRU eviction.
+    Every entry is a pickle file {field: (version, value)}, the modification time is used as last access time.
+    Safe to share between processes: files are written atomically, the size bound is enforced per process.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 1024 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.partial_hits = 0
+        self.misses = 0
+        self.recomputed_fields = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+        self.total_bytes = sum(size for _, size, _ in self._entries())
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + '.pkl')
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith('.pkl'):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(root, name))
+                except FileNotFoundError: # Evicted by another process
+                    continue
+                yield os.path.join(root, name), stat.st_size, stat.st_mtime
+
+    def _load(self, key: str) -> Dict:
+        try:
+            with open(self._path(key), 'rb') as f:
+                entry = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return {}
+        try:
+            os.utime(self._path(key))
+        except FileNotFoundError: # Evicted since it was read
+            pass
+        return entry
+
+    def _store(self, key: str, entry: Dict):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        old_size = os.path.getsize(path) if os.path.exists(path) else 0
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self.total_bytes += os.path.getsize(path) - old_size
+        if self.total_bytes > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        """
+        Deletes the least recently used entries until the cache is at 90% of max_bytes.
+        """
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        self.total_bytes = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if self.total_bytes <= self.max_bytes * 0.9:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self.total_bytes -= size
+            self.evictions += 1
+
+    def parse_tour(self, html_content: str, file_path: str, fields: List[str] = None, stats: pf.ParseStats = None) -> Dict:
+        """
+        Same as parser_functions.parse_tour, but unchanged fields are served from the cache.
+
+        Parameters:
+        html_content (str): The raw HTML content.
+        file_path (str): The path of the tour file, used for the tour id.
+        fields (List[str]): Only return these fields (default: all fields).
+        stats (pf.ParseStats): Record time and failures of the parsed fields (optional). Failed fields are not cached.
+
+        Returns:
+        Dict: The parsed tour.
+        """
+        if fields is None:
+            fields = list(pf.field_parsers)
+        key = content_hash(html_content)
+        entry = self._load(key)
+        stale = [field for field in fields if field not in uncached_fields and entry.get(field, (None,))[0] != pf.field_versions[field]]
+
+        if not stale:
+            self.hits += 1
+        elif entry:
+            self.partial_hits += 1
+        else:
+            self.misses += 1
+
+        parsed = {}
+        if stale:
+            self.recomputed_fields += len(stale)
+            # Failed fields are returned but not stored, so they are parsed (and counted) again on the next run
+            failed = set()
+            parsed = pf.parse_tour(html_content, file_path, stale, stats, failed)
+            for field, value in parsed.items():
+                if field not in failed:
+                    entry[field] = (pf.field_versions[field], value)
+            if len(failed) < len(parsed):
+                self._store(key, entry)
+
+        parsed.update(pf.parse_tour(html_content, file_path, [field for field in fields if field in uncached_fields], stats))
+        return {field: parsed[field] if field in parsed else entry[field][1] for field in fields}
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the hit / miss counters of this process and the current size of the cache.
+        """
+        return {
+            'hits': self.hits,
+            'partial_hits': self.partial_hits,
+            'misses': self.misses,
+            'recomputed_fields': self.recomputed_fields,
+            'evictions': self.evictions,
+            'bytes': self.total_bytes,
+        }
@@ -1,22 +1,68 @@
 ### File Helper to extract data from the HTML FILE
 ### Extracted from: preproccesing_notebook.ipynb
 
-from typing import Dict, List
+from typing import Dict, Iterator, List, Set, Tuple, Union
 import pandas as pd
 import numpy as np
 import scrapy
 from scrapy.selector import Selector
-from datetime import datetime, timedelta
-import locale
+from datetime import date, datetime, timedelta
 import re
-from dataclasses import dataclass
-
-locale.setlocale(locale.LC_TIME, 'de_DE')
+import time
+from dataclasses import asdict, dataclass, is_dataclass
+from functools import cached_property, lru_cache
 
 # {'Klettern Schwierigkeit:', 'Geo-Tags:', 'Abstieg:', 'Wegpunkte:', 'Zufahrt zum Ankunftspunkt:', 'Wandern Schwierigkeit:', 'Ski Schwierigkeit:', 'Strecke:', 'Zufahrt zum Ausgangspunkt:', 'Mountainbike Schwierigkeit:', 'Aufstieg:', 'Region:', 'Hochtouren Schwierigkeit:', 'Zeitbedarf:', 'Unterkunftmöglichkeiten:', 'Schneeshuhtouren Schwierigkeit:', 'Tour Datum:', 'Kartennummer:', 'Klettersteig Schwierigkeit:'}
 columns =  ['Klettern Schwierigkeit:', 'Geo-Tags:', 'Abstieg:', 'Wegpunkte:', 'Zufahrt zum Ankunftspunkt:', 'Wandern Schwierigkeit:', 'Ski Schwierigkeit:', 'Strecke:', 'Zufahrt zum Ausgangspunkt:', 'Mountainbike Schwierigkeit:', 'Aufstieg:', 'Region:', 'Hochtouren Schwierigkeit:', 'Zeitbedarf:', 'Unterkunftmöglichkeiten:', 'Schneeshuhtouren Schwierigkeit:', 'Tour Datum:', 'Kartennummer:', 'Klettersteig Schwierigkeit:']
 
-def parse_region(region_raw: str)-> Dict[str, str]:
+# Raw fiche values are either the stripped text of the cell or the cell node itself
+FicheValue = Union[str, Selector]
+
+
+def _as_selector(raw: FicheValue) -> Selector:
+    """
+    Returns the given node as is or builds a Selector from the raw HTML.
+    Allows the parse_* functions to be called with either a string or an already parsed node.
+    """
+    if isinstance(raw, Selector):
+        return raw
+    return Selector(text=raw)
+
+
+def _as_html(raw: FicheValue) -> str:
+    """
+    Serializes a fiche node back to HTML for the extractors which only work on text.
+    """
+    if isinstance(raw, Selector):
+        return raw.get()
+    return raw
+
+
+def parse_fiche(document: Selector) -> Dict[str, FicheValue]:
+    """
+    Walks the fiche table of a tour once and maps every label in `columns` to its value cell.
+    
+    Parameters:
+    document (Selector): The parsed tour document.
+
+    Returns:
+    Dict[str, FicheValue]: label -> stripped text of the value cell, or the value cell node if it only contains markup, or None if missing.
+    """
+    fiche = dict.fromkeys(columns)
+    for label_td in document.css('td.fiche_rando_b'):
+        label = label_td.xpath('normalize-space(.)').get()
+        if label not in fiche or fiche[label] is not None:
+            continue
+        value_td = label_td.xpath('following-sibling::*[1][self::td][contains(concat(" ", normalize-space(@class), " "), " fiche_rando ")]')
+        if not value_td:
+            continue
+        raw_content = value_td.xpath('text()').get()
+        if raw_content: # Same semantics as the old per column query in parse()
+            fiche[label] = value_td[0] if raw_content.strip() == '' else raw_content.strip()
+    return fiche
+
+
+def parse_region(region_raw: FicheValue)-> Dict[str, str]:
     """
     Extracts the region from the raw HTML.
     
@@ -28,7 +74,7 @@ def parse_region(region_raw: str)-> Dict[str, str]:
     """
     if region_raw is None:
         return None
-    document = Selector(text=region_raw)
+    document = _as_selector(region_raw)
     a_tags = document.css('a')
     output = {}
     for i, a_tag in enumerate(a_tags):
@@ -41,6 +87,84 @@ def parse_region(region_raw: str)-> Dict[str, str]:
 
 
 
+# German month names (%B of the de_DE locale), lookup is case insensitive like strptime
+german_months = {
+    'januar': 1,
+    'februar': 2,
+    'märz': 3,
+    'april': 4,
+    'mai': 5,
+    'juni': 6,
+    'juli': 7,
+    'august': 8,
+    'september': 9,
+    'oktober': 10,
+    'november': 11,
+    'dezember': 12,
+}
+
+german_date_pattern = re.compile(r'(\d{1,2}) (\w+) (\d{4})') # '%d %B %Y', e.g. 12 Juni 2021
+german_datetime_pattern = re.compile(r'(\d{1,2})\. (\w+) (\d{4}) um (\d{1,2}):(\d{2})') # '%d. %B %Y um %H:%M', e.g. 12. Juni 2021 um 14:30
+
+
+def _german_month(month_name: str, date_str: str) -> int:
+    month = german_months.get(month_name.lower())
+    if month is None:
+        raise ValueError(f"Unknown month in date '{date_str}'")
+    return month
+
+
+@lru_cache(maxsize=8192)
+def parse_german_date(date_str: str) -> date:
+    """
+    Parses a German date without depending on the de_DE locale. Replaces datetime.strptime(date_str, '%d %B %Y').
+    Results are memoized, the same dates occur in many tours.
+    
+    Parameters:
+    date_str (str): The date, e.g. 12 Juni 2021
+
+    Returns:
+    date: The date.
+    """
+    match = german_date_pattern.fullmatch(date_str)
+    if match is None:
+        raise ValueError(f"Date '{date_str}' does not match format '%d %B %Y'")
+    return date(int(match.group(3)), _german_month(match.group(2), date_str), int(match.group(1)))
+
+
+@lru_cache(maxsize=8192)
+def parse_german_datetime(datetime_str: str) -> datetime:
+    """
+    Parses a German publishing date without depending on the de_DE locale. Replaces datetime.strptime(datetime_str, '%d. %B %Y um %H:%M').
+    
+    Parameters:
+    datetime_str (str): The date and time, e.g. 12. Juni 2021 um 14:30
+
+    Returns:
+    datetime: The date and time.
+    """
+    match = german_datetime_pattern.fullmatch(datetime_str)
+    if match is None:
+        raise ValueError(f"Date '{datetime_str}' does not match format '%d. %B %Y um %H:%M'")
+    return datetime(int(match.group(3)), _german_month(match.group(2), datetime_str), int(match.group(1)), int(match.group(4)), int(match.group(5)))
+
+
+def parse_german_dates(values: pd.Series, with_time: bool = False) -> pd.Series:
+    """
+    Parses a whole column of German dates. Every distinct value is only parsed once.
+    
+    Parameters:
+    values (pd.Series): The dates as strings, missing values stay missing.
+    with_time (bool): Parse publishing dates ('%d. %B %Y um %H:%M') instead of dates ('%d %B %Y').
+
+    Returns:
+    pd.Series: The parsed dates.
+    """
+    parse = parse_german_datetime if with_time else parse_german_date
+    lookup = {value: parse(value) for value in values.dropna().unique()}
+    return values.map(lookup)
+
+
 def parse_tour_date(tour_date_raw: str) -> datetime.date:
     """
     Extracts the tour date from the raw HTML.
@@ -51,10 +175,9 @@ def parse_tour_date(tour_date_raw: str) -> datetime.date:
     Returns:
     datetime.date: The tour date.
     """
-    locale.setlocale(locale.LC_TIME, 'de_DE')# Just to be sure
     if tour_date_raw is None:
         return None
-    return datetime.strptime(tour_date_raw, '%d %B %Y').date()
+    return parse_german_date(tour_date_raw)
 
 
 icon_lookup = {
@@ -74,7 +197,7 @@ icon_lookup = {
 }
 
 
-@dataclass
+@dataclass(slots=True) # No per instance __dict__, there are millions of these
 class Waypoint:
     image: str
     name_raw: str
@@ -85,7 +208,7 @@ class Waypoint:
     peak_id: str
 
 
-def parse_waypoints(wegpunkte_raw: str) -> List[Waypoint]:
+def parse_waypoints(wegpunkte_raw: FicheValue) -> List[Waypoint]:
     """
     Extracts the waypoints from the raw HTML.
     
@@ -97,7 +220,7 @@ def parse_waypoints(wegpunkte_raw: str) -> List[Waypoint]:
     """
     if wegpunkte_raw is None:
         return None
-    document = Selector(text=wegpunkte_raw)
+    document = _as_selector(wegpunkte_raw)
     list_items = document.css('li:not([class])')  # This is a special case for some of the waypoints also have subpoints which I ignore for now: example: post24156.html
    
     
@@ -134,12 +257,12 @@ def parse_waypoints(wegpunkte_raw: str) -> List[Waypoint]:
 
 
 
-@dataclass
+@dataclass(slots=True)
 class HikingDifficulty:
     hiking_difficulty: str
     hiking_difficulty_description: str
 
-def parse_hiking_difficulty(hiking_difficulty_raw: str) -> HikingDifficulty:
+def parse_hiking_difficulty(hiking_difficulty_raw: FicheValue) -> HikingDifficulty:
     """
     Extracts the hiking difficulty from the raw HTML.
     
@@ -151,7 +274,7 @@ def parse_hiking_difficulty(hiking_difficulty_raw: str) -> HikingDifficulty:
     """
     if hiking_difficulty_raw is None:
         return None
-    document = Selector(text=hiking_difficulty_raw)
+    document = _as_selector(hiking_difficulty_raw)
     regex_pattern = r"(T\d[+-]?)\s*-\s*(.*)" #https://regex101.com/r/otbIAQ/1
     a_tags = document.css('a')
     assert len(a_tags) == 1, "Several A tags"
@@ -202,15 +325,15 @@ def parse_descent(descent_raw: str) -> int:
     return int(descent_raw.split(' ')[0].strip())
 
 
-@dataclass
+@dataclass(slots=True)
 class ClimbingDifficulty:
     climbing_difficulty: str
     climbing_difficulty_description: str
 
-def parse_climbing_difficulty(climbing_difficulty_raw: str) -> ClimbingDifficulty:
+def parse_climbing_difficulty(climbing_difficulty_raw: FicheValue) -> ClimbingDifficulty:
     if climbing_difficulty_raw is None:
         return None
-    document = Selector(text=climbing_difficulty_raw)
+    document = _as_selector(climbing_difficulty_raw)
     regex_pattern = r"(K\d[+-]?)\s*-\s*(.*)" #https://regex101.com/r/otbIAQ/1
     a_tags = document.css('a')
     assert len(a_tags) == 1, "Several A tags"
@@ -223,7 +346,7 @@ def parse_climbing_difficulty(climbing_difficulty_raw: str) -> ClimbingDifficult
     return None
 
 
-def parse_high_tour_difficulty(high_tour_difficulty_raw: str) -> str:
+def parse_high_tour_difficulty(high_tour_difficulty_raw: FicheValue) -> str:
     """
     Extracts the high tour difficulty from the raw HTML.
     
@@ -235,22 +358,22 @@ def parse_high_tour_difficulty(high_tour_difficulty_raw: str) -> str:
     """
     if high_tour_difficulty_raw is None:
         return None
-    document = Selector(text=high_tour_difficulty_raw)
+    document = _as_selector(high_tour_difficulty_raw)
     a_tags = document.css('a')
     assert len(a_tags) == 1, "Several A tags"
     return a_tags[0].css('::text').get().strip()
 
 
 
-@dataclass
+@dataclass(slots=True)
 class MountainBikeDifficulty:
     mountainbike_difficulty: str
     mountainbike_difficulty_description: str
 
-def parse_mountainbike_difficulty(mountainbike_difficulty_raw: str) -> MountainBikeDifficulty:
+def parse_mountainbike_difficulty(mountainbike_difficulty_raw: FicheValue) -> MountainBikeDifficulty:
     if mountainbike_difficulty_raw is None:
         return None
-    document = Selector(text=mountainbike_difficulty_raw)
+    document = _as_selector(mountainbike_difficulty_raw)
     regex_pattern = r"(S\d[+-]?)\s*-\s*(.*)" #https://regex101.com/r/otbIAQ/1
     a_tags = document.css('a')
     assert len(a_tags) == 1, "Several A tags"
@@ -263,7 +386,7 @@ def parse_mountainbike_difficulty(mountainbike_difficulty_raw: str) -> MountainB
     return None
 
 
-def parse_via_ferrata_difficulty(via_ferrata_difficulty_raw: str) -> str:
+def parse_via_ferrata_difficulty(via_ferrata_difficulty_raw: FicheValue) -> str:
     """
     Extracts the via ferrata difficulty from the raw HTML.
     
@@ -275,14 +398,14 @@ def parse_via_ferrata_difficulty(via_ferrata_difficulty_raw: str) -> str:
     """
     if via_ferrata_difficulty_raw is None:
         return None
-    document = Selector(text=via_ferrata_difficulty_raw)
+    document = _as_selector(via_ferrata_difficulty_raw)
     a_tags = document.css('a')
     assert len(a_tags) == 1, "Several A tags"
     return a_tags[0].css('::text').get().strip()
 
 
 
-def parse_ski_difficulty(ski_difficulty_raw: str) -> str:
+def parse_ski_difficulty(ski_difficulty_raw: FicheValue) -> str:
     """
     Extracts the ski difficulty from the raw HTML.
     
@@ -294,7 +417,7 @@ def parse_ski_difficulty(ski_difficulty_raw: str) -> str:
     """
     if ski_difficulty_raw is None:
         return None
-    document = Selector(text=ski_difficulty_raw)
+    document = _as_selector(ski_difficulty_raw)
     a_tags = document.css('a')
     assert len(a_tags) == 1, "Several A tags"
     return a_tags[0].css('::text').get().strip()
@@ -302,12 +425,12 @@ def parse_ski_difficulty(ski_difficulty_raw: str) -> str:
 
 
 
-@dataclass
+@dataclass(slots=True)
 class SnowshoeTourDifficulty:
     snowshoe_tour_difficulty: str
     snowshoe_tour_difficulty_description: str
 
-def parse_snowshoe_tour_difficulty(snowshoe_tour_difficulty_raw: str) -> SnowshoeTourDifficulty:
+def parse_snowshoe_tour_difficulty(snowshoe_tour_difficulty_raw: FicheValue) -> SnowshoeTourDifficulty:
     """
     Extracts the snowshoe tour difficulty from the raw HTML.
     
@@ -319,7 +442,7 @@ def parse_snowshoe_tour_difficulty(snowshoe_tour_difficulty_raw: str) -> Snowsho
     """
     if snowshoe_tour_difficulty_raw is None:
         return None
-    document = Selector(text=snowshoe_tour_difficulty_raw)
+    document = _as_selector(snowshoe_tour_difficulty_raw)
     regex_pattern = r"(WT\d[+-]?)\s*-\s*(.*)" #https://regex101.com/r/otbIAQ/1
     a_tags = document.css('a')
     assert len(a_tags) == 1, "Several A tags"
@@ -332,6 +455,75 @@ def parse_snowshoe_tour_difficulty(snowshoe_tour_difficulty_raw: str) -> Snowsho
     return None
 
 
+# Ordered base grades of every difficulty scale. A grade is stored as 3 * index of its base grade + 0 / 1 / 2 for - / none / +,
+# e.g. T4- = 9, T4 = 10, T4+ = 11. "T4 or harder" includes T4- and becomes hiking_difficulty >= grade_lower_bound('hiking_difficulty', 'T4') = 9
+alpine_grades = ['L', 'WS', 'ZS', 'S', 'SS', 'AS', 'EX']  # SAC scale of high tours and ski tours
+difficulty_scales: Dict[str, List[str]] = {
+    'hiking_difficulty': [f'T{i}' for i in range(1, 7)],
+    'climbing_difficulty': [f'K{i}' for i in range(1, 7)],
+    'hightour_difficulty': alpine_grades,
+    'mountain_bike_difficulty': [f'S{i}' for i in range(0, 6)],
+    'via_ferrata_difficulty': [f'K{i}' for i in range(1, 7)],
+    'ski_difficulty': alpine_grades,
+    'snowshoe_difficulty': [f'WT{i}' for i in range(1, 7)],
+}
+grade_modifiers = ['-', '', '+']
+# Longest base grade first, so SS is not read as S
+grade_patterns = {
+    field: re.compile(r'\s*(' + '|'.join(sorted(scale, key=len, reverse=True)) + r')([+-]?)(?!\w)')
+    for field, scale in difficulty_scales.items()
+}
+# Attribute with the grade of the difficulty dataclasses, the other scales are plain strings
+grade_attributes = {
+    'hiking_difficulty': 'hiking_difficulty',
+    'climbing_difficulty': 'climbing_difficulty',
+    'mountain_bike_difficulty': 'mountainbike_difficulty',
+    'snowshoe_difficulty': 'snowshoe_tour_difficulty',
+}
+
+
+def grade_ordinal(field: str, grade: str) -> int:
+    """
+    Encodes a difficulty grade as its position on the scale of the field.
+    
+    Parameters:
+    field (str): The difficulty field, see difficulty_scales.
+    grade (str): The grade, e.g. T4+ or ZS-. Trailing text like a description is ignored.
+    
+    Returns:
+    int: The ordinal (0-20) or None if the grade is not on the scale.
+    """
+    match = grade_patterns[field].match(grade) if grade else None
+    if match is None:
+        return None
+    return 3 * difficulty_scales[field].index(match.group(1)) + grade_modifiers.index(match.group(2))
+
+
+def grade_lower_bound(field: str, grade: str) -> int:
+    """
+    Lowest ordinal of a grade for range filters: a grade without modifier stands for the whole grade,
+    e.g. T4 -> 9 (T4-), while T4+ -> 11 only includes T4+ and harder.
+    """
+    ordinal = grade_ordinal(field, grade)
+    if ordinal is None or grade_patterns[field].match(grade).group(2):
+        return ordinal
+    return ordinal - 1
+
+
+def grade_name(field: str, ordinal: int) -> str:
+    """
+    Decodes an ordinal of grade_ordinal back to the grade, e.g. 11 -> T4+ for the hiking difficulty.
+    """
+    if ordinal is None:
+        return None
+    base, modifier = divmod(ordinal, 3)
+    return difficulty_scales[field][base] + grade_modifiers[modifier]
+
+
+def duration_seconds(duration: timedelta) -> int:
+    return int(duration.total_seconds()) if duration is not None else None
+
+
 def parse_ascent(ascent_raw: str) -> int:
     """
     Extracts the ascent from the raw HTML.
@@ -346,6 +538,8 @@ def parse_ascent(ascent_raw: str) -> int:
         return None
     return int(ascent_raw.split(' ')[0].strip())
 
+photo_id_pattern = re.compile(r'photo_id:(\d+)')
+
 def count_photos(html_content: str) -> int:
     """
     Count the number of photos in the HTML content.
@@ -356,12 +550,11 @@ def count_photos(html_content: str) -> int:
     Returns:
     int: The number of photos.
     """
-    photo_ids = re.findall(r'photo_id:(\d+)', html_content)
-    return len(photo_ids)
+    return sum(1 for _ in photo_id_pattern.finditer(html_content))
 
 
 
-@dataclass
+@dataclass(slots=True)
 class Peak:
     latitude: float
     longitude: float
@@ -369,6 +562,93 @@ class Peak:
     height: int
     id: int
 
+
+# Single pass scanner for the peak map and the photo ids, replaces the old regex https://regex101.com/r/3EiAxt/1
+# which backtracked over the whole page with seven lazy groups
+scan_pattern = re.compile(r'pizs\.push\(\{|photo_id:(\d+)')
+peak_key_patterns = [
+    re.compile(r'piz_lat:([\d.]+),'),
+    re.compile(r'piz_lon:([\d.]+),'),
+    re.compile(r'piz_name:"(.*?)",', re.DOTALL),
+    re.compile(r'piz_height:(\d+),'),
+    re.compile(r'piz_id:(\d+)'),
+]
+max_peak_block_length = 4096  # Bounded lookahead for a single pizs.push({...}) block
+
+
+def _read_peak(html_content: str, start: int) -> Peak:
+    """
+    Reads the piz_* keys of a single pizs.push({...}) block starting at `start`.
+    The end of the block (the first `})`) is found first, at most max_peak_block_length characters ahead,
+    and every key is only searched inside the block, so a key is never taken from the following block.
+    
+    Parameters:
+    html_content (str): The raw HTML content.
+    start (int): The position right after `pizs.push({`.
+    
+    Returns:
+    Peak: The peak or None if the block is incomplete.
+    """
+    endpos = html_content.find('})', start, min(len(html_content), start + max_peak_block_length))
+    if endpos == -1:
+        return None
+    values = []
+    pos = start
+    for pattern in peak_key_patterns:
+        match = pattern.search(html_content, pos, endpos)
+        if match is None:
+            return None
+        values.append(match.group(1))
+        pos = match.end()
+    return Peak(
+        latitude=float(values[0]),
+        longitude=float(values[1]),
+        name=values[2],
+        height=int(values[3]),
+        id=int(values[4])
+    )
+
+
+def scan_peaks_and_photos(html_content: str) -> Iterator[Union[Peak, str]]:
+    """
+    Scans the HTML content once for the peak map and the photo ids.
+    
+    Parameters:
+    html_content (str): The raw HTML content.
+    
+    Returns:
+    Iterator[Union[Peak, str]]: Lazily yields a Peak for every pizs.push block and the id (str) of every photo.
+    """
+    for match in scan_pattern.finditer(html_content):
+        photo_id = match.group(1)
+        if photo_id is not None:
+            yield photo_id
+            continue
+        peak = _read_peak(html_content, match.end())
+        if peak is not None:
+            yield peak
+
+
+def parse_peaks_and_photo_count(html_content: str) -> Tuple[List[Peak], int]:
+    """
+    Parses the peak map and counts the photos in one pass over the HTML content.
+    
+    Parameters:
+    html_content (str): The raw HTML content.
+    
+    Returns:
+    Tuple[List[Peak], int]: The peaks and the number of photos.
+    """
+    peaks = []
+    photo_count = 0
+    for item in scan_peaks_and_photos(html_content):
+        if isinstance(item, Peak):
+            peaks.append(item)
+        else:
+            photo_count += 1
+    return peaks, photo_count
+
+
 def parse_peak_map(html_content: str) -> list[Peak]:
     """
     Parse the peak map from the HTML content.
@@ -379,29 +659,15 @@ def parse_peak_map(html_content: str) -> list[Peak]:
     Returns:
     list[Peak]: A list of peaks.
     """
-    pattern = r'pizs\.push\(\{.*?piz_lat:([\d.]+),.*?piz_lon:([\d.]+),.*?piz_name:"(.*?)",.*?piz_height:(\d+),.*?piz_id:(\d+).*?\}\)' ## Regex: https://regex101.com/r/3EiAxt/1
-    matches = re.findall(pattern, html_content, re.DOTALL)
-        
-    # Parse the peak information and yield the data
-    peaks = []
-    for match in matches:
-        peak = Peak(
-            latitude=float(match[0]),
-            longitude=float(match[1]),
-            name=match[2],
-            height=int(match[3]),
-            id=int(match[4])
-        )
-        peaks.append(peak)
-    return peaks
+    return [item for item in scan_peaks_and_photos(html_content) if isinstance(item, Peak)]
 
 
-@dataclass
+@dataclass(slots=True)
 class TourPartner:
     name: str
     user_id: str
 
-def parse_tour_partners(html_content: str) -> List[TourPartner]:
+def parse_tour_partners(html_content: Union[str, Selector]) -> List[TourPartner]:
     """
     Parse the tour partners from the HTML content.  
     
@@ -411,7 +677,7 @@ def parse_tour_partners(html_content: str) -> List[TourPartner]:
     Returns:
     List[TourPartner]: A list of tour partners.
     """
-    document = Selector(text=html_content)
+    document = _as_selector(html_content)
     ## Only use the div whhich contains: <b>Tourengänger:</b>
     div = document.xpath('//div[contains(@class, "div15") and contains(.//b/text(), "Tourengänger:")]')
 
@@ -419,15 +685,15 @@ def parse_tour_partners(html_content: str) -> List[TourPartner]:
     partners = []
     for a in div.css('a'):
         url = a.css('::attr(href)').get()
-        partners.append({
-            'name': a.css('::text').get(),
-            'user_id': url.split('/')[-2]
-        })
+        partners.append(TourPartner(
+            name=a.css('::text').get(),
+            user_id=url.split('/')[-2]
+        ))
 
     return partners
 
 
-def parse_page_views(html_content: str) -> int:
+def parse_page_views(html_content: Union[str, Selector]) -> int:
     """
     Parse the page views from the HTML content.
     
@@ -437,7 +703,212 @@ def parse_page_views(html_content: str) -> int:
     Returns:
     int: The number of page views.
     """
-    document = Selector(text=html_content)
+    document = _as_selector(html_content)
     div = document.css('div[style="text-align:center;color:#666;font-size:0.814em"]')
     views = int(div.css('b::text').get())
-    return views
\ No newline at end of file
+    return views
+
+
+def parse_tour_id(file_path: str) -> str:
+    """
+    Extracts the tour id from the file path.
+    
+    Parameters:
+    file_path (str): The path of the tour file, e.g. ./data/raw/200posts/post24001.html
+
+    Returns:
+    str: The tour id, e.g. 24001
+    """
+    return file_path.split('/')[-1].split('.')[0].replace('post', '')
+
+
+class TourDocument:
+    """
+    A tour which is parsed lazily and only once. The DOM, the fiche table and the peak / photo scan
+    are built on first access and shared by all field extractors.
+    """
+
+    def __init__(self, html_content: str, file_path: str):
+        self.html_content = html_content
+        self.file_path = file_path
+
+    @cached_property
+    def document(self) -> Selector:
+        return Selector(text=self.html_content)
+
+    @cached_property
+    def fiche(self) -> Dict[str, FicheValue]:
+        return parse_fiche(self.document)
+
+    @cached_property
+    def peaks_and_photo_count(self) -> Tuple[List[Peak], int]:
+        return parse_peaks_and_photo_count(self.html_content)
+
+    @cached_property
+    def publishing_date_str(self) -> str:
+        return self.document.css('div.author::text').re_first(r'\d{1,2}\. \w+ \d{4} um \d{2}:\d{2}')
+
+
+def _parse_publishing_date(tour: TourDocument) -> datetime:
+    return parse_german_datetime(tour.publishing_date_str) if tour.publishing_date_str else None
+
+
+# Extractor per field of ParsedTour, in the order of the schema
+field_parsers = {
+    'name': lambda tour: tour.document.css('h1.title::text').get(),
+    'id': lambda tour: parse_tour_id(tour.file_path),
+    'author_public_name': lambda tour: tour.document.css('div.author a.standard::text').get(),
+    'author_internal_name': lambda tour: tour.document.css('img[id^="anchor_author_"]::attr(onmouseover)').re_first(r'"https://www.hikr.org/","\d+","(.*?)","'),
+    'author_id': lambda tour: tour.document.css('img[id^="anchor_author_"]::attr(id)').re_first(r'anchor_author_(\d+)'),
+    'publishing_date_str': lambda tour: tour.publishing_date_str,
+    'publishing_date': _parse_publishing_date,
+    'photo_count': lambda tour: tour.peaks_and_photo_count[1],
+    'peaks': lambda tour: tour.peaks_and_photo_count[0],
+    'regions': lambda tour: parse_region(tour.fiche['Region:']),
+    'tour_date': lambda tour: parse_tour_date(_as_html(tour.fiche['Tour Datum:'])),
+    'waypoints': lambda tour: parse_waypoints(tour.fiche['Wegpunkte:']),
+    'hiking_difficulty': lambda tour: parse_hiking_difficulty(tour.fiche['Wandern Schwierigkeit:']),
+    'ascent': lambda tour: parse_ascent(_as_html(tour.fiche['Aufstieg:'])),
+    'descent': lambda tour: parse_descent(_as_html(tour.fiche['Abstieg:'])),
+    'duration': lambda tour: parse_duration(_as_html(tour.fiche['Zeitbedarf:'])),
+    'climbing_difficulty': lambda tour: parse_climbing_difficulty(tour.fiche['Klettern Schwierigkeit:']),
+    'hightour_difficulty': lambda tour: parse_high_tour_difficulty(tour.fiche['Hochtouren Schwierigkeit:']),
+    'mountain_bike_difficulty': lambda tour: parse_mountainbike_difficulty(tour.fiche['Mountainbike Schwierigkeit:']),
+    'via_ferrata_difficulty': lambda tour: parse_via_ferrata_difficulty(tour.fiche['Klettersteig Schwierigkeit:']),
+    'ski_difficulty': lambda tour: parse_ski_difficulty(tour.fiche['Ski Schwierigkeit:']),
+    'snowshoe_difficulty': lambda tour: parse_snowshoe_tour_difficulty(tour.fiche['Schneeshuhtouren Schwierigkeit:']),
+    'tour_partner': lambda tour: parse_tour_partners(tour.document),
+    'page_views': lambda tour: parse_page_views(tour.document),
+}
+
+# Version of every field extractor. Increase the version when an extractor changes,
+# cached values of this field are then recomputed (see parse_cache.py)
+field_versions = {field: 1 for field in field_parsers}
+
+
+class ParseStats:
+    """
+    Wall time, invocation and failure counters per field of parse_tour.
+    The time of the shared stages (DOM, fiche table, peak scan) is counted for the first field which needs them.
+    Stats of several workers can be combined with merge (see spark_functions.ParseStatsAccumulatorParam).
+    """
+
+    def __init__(self):
+        self.calls: Dict[str, int] = {}
+        self.seconds: Dict[str, float] = {}
+        self.failures: Dict[str, int] = {}
+        self.first_errors: Dict[str, str] = {}
+
+    def run(self, field: str, parser, tour: 'TourDocument', failed: Set[str] = None):
+        """
+        Runs the extractor of a field. A failing extractor is counted and returns None instead of raising,
+        the field is added to `failed` (if given) so callers can tell a failure from a missing value.
+        """
+        start = time.perf_counter()
+        try:
+            return parser(tour)
+        except Exception as e:
+            self.failures[field] = self.failures.get(field, 0) + 1
+            self.first_errors.setdefault(field, f'{tour.file_path}: {e!r}')
+            if failed is not None:
+                failed.add(field)
+            return None
+        finally:
+            self.calls[field] = self.calls.get(field, 0) + 1
+            self.seconds[field] = self.seconds.get(field, 0.0) + time.perf_counter() - start
+
+    def merge(self, other: 'ParseStats') -> 'ParseStats':
+        for field, calls in other.calls.items():
+            self.calls[field] = self.calls.get(field, 0) + calls
+        for field, seconds in other.seconds.items():
+            self.seconds[field] = self.seconds.get(field, 0.0) + seconds
+        for field, failures in other.failures.items():
+            self.failures[field] = self.failures.get(field, 0) + failures
+        for field, error in other.first_errors.items():
+            self.first_errors.setdefault(field, error)
+        return self
+
+    def summary(self) -> pd.DataFrame:
+        """
+        Returns:
+        pd.DataFrame: One row per field with calls, total and average time, failures and the first error, slowest fields first.
+        """
+        rows = [{
+            'field': field,
+            'calls': calls,
+            'total_seconds': self.seconds.get(field, 0.0),
+            'avg_ms': self.seconds.get(field, 0.0) / calls * 1000,
+            'failures': self.failures.get(field, 0),
+            'first_error': self.first_errors.get(field),
+        } for field, calls in self.calls.items()]
+        return pd.DataFrame(rows, columns=['field', 'calls', 'total_seconds', 'avg_ms', 'failures', 'first_error']).sort_values('total_seconds', ascending=False)
+
+
+def parse_tour(html_content: str, file_path: str, fields: List[str] = None, stats: ParseStats = None, failed: Set[str] = None) -> Dict:
+    """
+    Parses a whole tour. The HTML is only parsed once, the fiche table is walked in a single pass
+    and the field extractors get the sub nodes of the shared document.
+    
+    Parameters:
+    html_content (str): The raw HTML content.
+    file_path (str): The path of the tour file, used for the tour id.
+    fields (List[str]): Only parse these fields (default: all fields of field_parsers).
+    stats (ParseStats): Record the time and failures per field, failing fields are set to None instead of raising (optional).
+    failed (Set[str]): Collects the fields of this tour which failed, only with stats (optional).
+
+    Returns:
+    Dict: The parsed tour with the same keys as ParsedTour.
+    """
+    tour = TourDocument(html_content, file_path)
+    if fields is None:
+        fields = field_parsers
+    if stats is None:
+        return {field: field_parsers[field](tour) for field in fields}
+    return {field: stats.run(field, field_parsers[field], tour, failed) for field in fields}
+
+
+def slim_tour(tour: Dict) -> Dict:
+    """
+    Converts a parsed tour into the slim storage representation: the difficulties become ordinals
+    (see grade_ordinal) without the repeated descriptions and the duration becomes seconds.
+    
+    Parameters:
+    tour (Dict): The parsed tour, see parse_tour. Can contain only some fields.
+
+    Returns:
+    Dict: The slim tour.
+    """
+    slim = dict(tour)
+    for field, value in tour.items():
+        if field in difficulty_scales and value is not None:
+            attribute = grade_attributes.get(field)
+            if attribute is not None:
+                value = value.get(attribute) if isinstance(value, dict) else getattr(value, attribute)
+            slim[field] = grade_ordinal(field, value)
+        elif field == 'duration':
+            slim[field] = duration_seconds(value)
+    return slim
+
+
+def _plain_value(value):
+    if is_dataclass(value):
+        return asdict(value)
+    if isinstance(value, timedelta):
+        return str(value)
+    if isinstance(value, list):
+        return [_plain_value(item) for item in value]
+    return value
+
+
+def plain_tour(tour: Dict) -> Dict:
+    """
+    Converts a parsed tour into values which a row at a time Spark udf can return with parsed_tour_schema:
+    the dataclasses become dicts (they have __slots__ and no __dict__ which Spark could read) and the duration a string.
+    
+    Parameters:
+    tour (Dict): The parsed tour, see parse_tour.
+
+    Returns:
+    Dict: The converted tour.
+    """
+    return {field: _plain_value(value) for field, value in tour.items()}
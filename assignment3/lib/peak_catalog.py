@@ -0,0 +1,260 @@
+### Deduplicated catalog of the peaks of all tours with a grid index for nearest / radius / bounding box queries
+### Tours only keep the peak ids (see with_peak_ids), the coordinates are stored once in the catalog
+
+from typing import TYPE_CHECKING, Dict, Iterable, List, Tuple
+from collections import defaultdict
+import math
+import pyarrow as pa
+import pyarrow.parquet as pq
+from lib.parser_functions import Peak
+
+# pyspark is only needed for the Spark builders, the catalog itself works without it
+if TYPE_CHECKING:
+    from pyspark.sql import DataFrame
+
+earth_radius_km = 6371.0088
+km_per_degree = math.pi * earth_radius_km / 180
+
+catalog_arrow_schema = pa.schema([
+    pa.field('id', pa.int32()),
+    pa.field('name', pa.string()),
+    pa.field('latitude', pa.float32()),
+    pa.field('longitude', pa.float32()),
+    pa.field('height', pa.int32()),
+    pa.field('tour_count', pa.int64()),
+])
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    Returns the great circle distance between two points in km.
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((phi2 - phi1) / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    return 2 * earth_radius_km * math.asin(min(1.0, math.sqrt(a)))
+
+
+def build_peak_catalog(parsed_df: 'DataFrame') -> 'DataFrame':
+    """
+    Builds the deduplicated peak catalog from parsed tours, one row per peak id.
+
+    Parameters:
+    parsed_df (DataFrame): The parsed tours (needs peaks).
+
+    Returns:
+    DataFrame: id, name, latitude, longitude, height and the number of tours per peak.
+    """
+    from pyspark.sql.functions import col, count, explode, first
+    return parsed_df \
+        .select(explode(col('peaks')).alias('peak')) \
+        .groupBy(col('peak.id').alias('id')) \
+        .agg(
+            first('peak.name').alias('name'),
+            first('peak.latitude').alias('latitude'),
+            first('peak.longitude').alias('longitude'),
+            first('peak.height').alias('height'),
+            count('*').alias('tour_count'),
+        )
+
+
+def with_peak_ids(parsed_df: 'DataFrame') -> 'DataFrame':
+    """
+    Replaces the peaks of every tour by the list of their ids, the peaks can be looked up in the catalog.
+
+    Parameters:
+    parsed_df (DataFrame): The parsed tours (needs peaks).
+
+    Returns:
+    DataFrame: The tours with a peak_ids column instead of peaks.
+    """
+    from pyspark.sql.functions import col, transform
+    return parsed_df.withColumn('peak_ids', transform(col('peaks'), lambda peak: peak['id'])).drop('peaks')
+
+
+class PeakCatalog:
+    """
+    In memory peak catalog with a uniform latitude / longitude grid index.
+    Every grid cell holds the positions of its peaks, queries only look at the cells which overlap the search area.
+    """
+
+    def __init__(self, peaks: Iterable[Peak], tour_counts: Dict[int, int] = None, cell_degrees: float = 0.1):
+        """
+        Parameters:
+        peaks (Iterable[Peak]): The peaks, duplicates of the same id are ignored.
+        tour_counts (Dict[int, int]): Number of tours per peak id (optional).
+        cell_degrees (float): Size of a grid cell in degrees, 0.1 is about 11km x 7.5km in the alps.
+        """
+        self.cell_degrees = cell_degrees
+        self.peaks: List[Peak] = []
+        self.positions: Dict[int, int] = {}
+        self.tour_counts = tour_counts or {}
+        self.cells: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+        for peak in peaks:
+            if peak.id in self.positions:
+                continue
+            self.positions[peak.id] = len(self.peaks)
+            self.cells[self._cell(peak.latitude, peak.longitude)].append(len(self.peaks))
+            self.peaks.append(peak)
+
+    @classmethod
+    def from_tours(cls, tours: Iterable[Dict], **kwargs) -> 'PeakCatalog':
+        """
+        Builds the catalog from parsed tours (see parser_functions.parse_tour), also counts the tours per peak.
+        """
+        peaks = {}
+        tour_counts = defaultdict(int)
+        for tour in tours:
+            for peak in tour['peaks'] or []:
+                if isinstance(peak, dict):
+                    peak = Peak(**peak)
+                peaks.setdefault(peak.id, peak)
+                tour_counts[peak.id] += 1
+        return cls(peaks.values(), dict(tour_counts), **kwargs)
+
+    @classmethod
+    def from_table(cls, table: pa.Table, **kwargs) -> 'PeakCatalog':
+        """
+        Builds the catalog from a table with the columns of build_peak_catalog.
+        """
+        rows = table.to_pylist()
+        peaks = [Peak(latitude=row['latitude'], longitude=row['longitude'], name=row['name'], height=row['height'], id=row['id']) for row in rows]
+        tour_counts = {row['id']: row['tour_count'] for row in rows if row.get('tour_count') is not None}
+        return cls(peaks, tour_counts, **kwargs)
+
+    @classmethod
+    def read(cls, path: str, **kwargs) -> 'PeakCatalog':
+        """
+        Reads a catalog written by write or by Spark (build_peak_catalog(...).write.parquet(path)).
+        """
+        return cls.from_table(pq.read_table(path), **kwargs)
+
+    def write(self, path: str):
+        """
+        Writes the catalog as a single Parquet file.
+        """
+        table = pa.Table.from_pydict({
+            'id': [peak.id for peak in self.peaks],
+            'name': [peak.name for peak in self.peaks],
+            'latitude': [peak.latitude for peak in self.peaks],
+            'longitude': [peak.longitude for peak in self.peaks],
+            'height': [peak.height for peak in self.peaks],
+            'tour_count': [self.tour_counts.get(peak.id, 0) for peak in self.peaks],
+        }, schema=catalog_arrow_schema)
+        pq.write_table(table, path)
+
+    def __len__(self) -> int:
+        return len(self.peaks)
+
+    def __contains__(self, peak_id: int) -> bool:
+        return peak_id in self.positions
+
+    def get(self, peak_id: int) -> Peak:
+        """
+        Returns the peak with this id or None.
+        """
+        position = self.positions.get(peak_id)
+        return self.peaks[position] if position is not None else None
+
+    def resolve(self, peak_ids: Iterable[int]) -> List[Peak]:
+        """
+        Returns the peaks of a tour from its peak ids (see with_peak_ids), unknown ids are skipped.
+        """
+        return [self.peaks[self.positions[peak_id]] for peak_id in peak_ids if peak_id in self.positions]
+
+    def _cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        return math.floor(latitude / self.cell_degrees), math.floor(longitude / self.cell_degrees)
+
+    def _candidates(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> Iterable[int]:
+        """
+        Returns the positions of the peaks in all cells which overlap the bounding box.
+        """
+        min_row, min_column = self._cell(min_lat, min_lon)
+        max_row, max_column = self._cell(max_lat, max_lon)
+        if (max_row - min_row + 1) * (max_column - min_column + 1) > len(self.cells):
+            # Large area: walking the occupied cells is cheaper than the empty ones
+            cells = [cell for cell in self.cells if min_row <= cell[0] <= max_row and min_column <= cell[1] <= max_column]
+        else:
+            cells = [(row, column) for row in range(min_row, max_row + 1) for column in range(min_column, max_column + 1) if (row, column) in self.cells]
+        for cell in cells:
+            yield from self.cells[cell]
+
+    def within_bbox(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> List[Peak]:
+        """
+        Returns the peaks inside a bounding box (borders included).
+
+        Parameters:
+        min_lat (float): The southern border.
+        min_lon (float): The western border.
+        max_lat (float): The northern border.
+        max_lon (float): The eastern border.
+
+        Returns:
+        List[Peak]: The peaks, in no particular order.
+        """
+        peaks = []
+        for position in self._candidates(min_lat, min_lon, max_lat, max_lon):
+            peak = self.peaks[position]
+            if min_lat <= peak.latitude <= max_lat and min_lon <= peak.longitude <= max_lon:
+                peaks.append(peak)
+        return peaks
+
+    def within_radius(self, latitude: float, longitude: float, radius_km: float) -> List[Tuple[Peak, float]]:
+        """
+        Returns the peaks within a great circle distance of a point.
+
+        Parameters:
+        latitude (float): The latitude of the point.
+        longitude (float): The longitude of the point.
+        radius_km (float): The radius in km.
+
+        Returns:
+        List[Tuple[Peak, float]]: The peaks and their distance in km, nearest first.
+        """
+        delta_lat = radius_km / km_per_degree
+        min_lat, max_lat = latitude - delta_lat, latitude + delta_lat
+        cos_lat = math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+        if min_lat <= -90 or max_lat >= 90 or radius_km >= km_per_degree * 180 * cos_lat:
+            # Circle contains a pole or wraps around the date line
+            min_lat, max_lat = max(min_lat, -90), min(max_lat, 90)
+            min_lon, max_lon = -180, 180
+        else:
+            delta_lon = radius_km / (km_per_degree * cos_lat)
+            min_lon, max_lon = longitude - delta_lon, longitude + delta_lon
+        candidates = list(self._candidates(min_lat, min_lon, max_lat, max_lon))
+        # Parts of the box beyond the date line
+        if min_lon < -180:
+            candidates.extend(self._candidates(min_lat, min_lon + 360, max_lat, 180))
+        if max_lon > 180:
+            candidates.extend(self._candidates(min_lat, -180, max_lat, max_lon - 360))
+
+        results = []
+        for position in set(candidates):
+            peak = self.peaks[position]
+            distance = haversine_km(latitude, longitude, peak.latitude, peak.longitude)
+            if distance <= radius_km:
+                results.append((peak, distance))
+        results.sort(key=lambda result: result[1])
+        return results
+
+    def nearest(self, latitude: float, longitude: float, n: int = 1) -> List[Tuple[Peak, float]]:
+        """
+        Returns the n nearest peaks of a point. The search radius starts at about one grid cell and doubles
+        until it holds n peaks, every radius query is exact so the result is as well.
+
+        Parameters:
+        latitude (float): The latitude of the point.
+        longitude (float): The longitude of the point.
+        n (int): The number of peaks.
+
+        Returns:
+        List[Tuple[Peak, float]]: The peaks and their distance in km, nearest first.
+        """
+        n = min(n, len(self.peaks))
+        if n <= 0:
+            return []
+        radius_km = self.cell_degrees * km_per_degree
+        while True:
+            results = self.within_radius(latitude, longitude, radius_km)
+            if len(results) >= n or radius_km >= math.pi * earth_radius_km:
+                return results[:n]
+            radius_km *= 2
@@ -0,0 +1,443 @@
+### Spark helpers for the parsed hikr tours
+### Extracted from: DAWR Assignment 3 Spark Skeleton.ipynb
+
+from pyspark import Accumulator, AccumulatorParam
+from pyspark.sql import DataFrame, SparkSession
+from pyspark.sql import Column
+from pyspark.sql.functions import array, col, current_timestamp, element_at, filter, lit, regexp_extract, regexp_extract_all, regexp_replace, row_number, sha2, size, split, struct, transform, when, year
+from pyspark.sql.window import Window
+from pyspark.sql.utils import AnalysisException
+from pyspark.sql.types import StructType, StructField, StringType, IntegerType, ByteType, FloatType, DateType, TimestampType, ArrayType
+from functools import partial
+from typing import Callable, Dict, List
+import lib.corpus as corpus
+import lib.parser_functions as pf
+import lib.arrow_functions as af
+import lib.aggregates as aggregates
+
+
+# Schema of a parsed tour, see parser_functions.parse_tour
+parsed_tour_schema = StructType([
+    StructField("name", StringType(), nullable=True),
+    StructField("id", StringType()),
+    StructField("author_public_name", StringType()),
+    StructField("author_internal_name", StringType()),
+    StructField("author_id", StringType()),
+    StructField("publishing_date_str", StringType()),
+    StructField("publishing_date", TimestampType()),
+    StructField("photo_count", IntegerType()),
+    StructField("peaks", ArrayType(StructType([
+        StructField("latitude", FloatType()),
+        StructField("longitude", FloatType()),
+        StructField("name", StringType()),
+        StructField("height", IntegerType()),
+        StructField("id", IntegerType())
+    ]))),
+    StructField("regions", StructType([
+        StructField("region_0_content", StringType()),
+        StructField("country", StringType()),
+        StructField("region_2_content", StringType()),
+        StructField("region_3_content", StringType()),
+        StructField("region_4_content", StringType())
+    ])),
+    StructField("tour_date", DateType()),
+    StructField("waypoints", ArrayType(StructType([
+        StructField("image", StringType()),
+        StructField("name_raw", StringType()),
+        StructField("type", StringType()),
+        StructField("waypoint_url", StringType()),
+        StructField("height", IntegerType()),
+        StructField("name", StringType()),
+        StructField("peak_id", StringType())
+    ]))),
+    StructField("hiking_difficulty", StructType([
+        StructField("hiking_difficulty", StringType()),
+        StructField("hiking_difficulty_description", StringType())
+    ])),
+    StructField("ascent", IntegerType()),
+    StructField("descent", IntegerType()),
+    StructField("duration", StringType()),  # Spark SQL doesn't have a built-in type for timedelta
+    StructField("climbing_difficulty", StructType([
+        StructField("climbing_difficulty", StringType()),
+        StructField("climbing_difficulty_description", StringType())
+    ])),
+    StructField("hightour_difficulty", StringType()),
+    StructField("mountain_bike_difficulty", StructType([
+        StructField("mountainbike_difficulty", StringType()),
+        StructField("mountainbike_difficulty_description", StringType())
+    ])),
+    StructField("via_ferrata_difficulty", StringType()),
+    StructField("ski_difficulty", StringType()),
+    StructField("snowshoe_difficulty", StructType([
+        StructField("snowshoe_tour_difficulty", StringType()),
+        StructField("snowshoe_tour_difficulty_description", StringType())
+    ])),
+    StructField("tour_partner", ArrayType(StructType([
+        StructField("name", StringType()),
+        StructField("user_id", StringType()),
+    ]))),
+    StructField("page_views", IntegerType()),
+])
+
+
+# Storage variant of parsed_tour_schema, see parser_functions.slim_tour:
+# difficulties as ordinals without descriptions, duration in seconds
+slim_tour_schema = StructType([
+    StructField(field.name, ByteType()) if field.name in pf.difficulty_scales
+    else StructField(field.name, IntegerType()) if field.name == "duration"
+    else field
+    for field in parsed_tour_schema
+])
+
+
+def parsed_tour_schema_for(fields: List[str] = None, slim: bool = False) -> StructType:
+    """
+    Returns the schema of a parsed tour which only contains the given fields.
+
+    Parameters:
+    fields (List[str]): The fields in output order (default: all fields).
+    slim (bool): Use the slim storage schema (slim_tour_schema).
+
+    Returns:
+    StructType: The schema.
+    """
+    schema = slim_tour_schema if slim else parsed_tour_schema
+    if fields is None:
+        return schema
+    return StructType([schema[field] for field in fields])
+
+
+def difficulty_at_least(field: str, grade: str) -> Column:
+    """
+    Filter on a difficulty of the slim schema, e.g. difficulty_at_least("hiking_difficulty", "T4") for "T4 or harder"
+    (T4-, T4, T4+ and above, see parser_functions.grade_lower_bound), "T4+" excludes T4- and T4.
+    Compares the ordinals, no string comparison.
+    """
+    return col(field) >= lit(pf.grade_lower_bound(field, grade))
+
+
+def with_grade_names(slim_df: DataFrame) -> DataFrame:
+    """
+    Decodes the difficulty ordinals of the slim schema back to the grades (e.g. 11 -> T4+) for display.
+    """
+    for field in pf.difficulty_scales:
+        if field in slim_df.columns:
+            names = array(*[lit(pf.grade_name(field, ordinal)) for ordinal in range(3 * len(pf.difficulty_scales[field]))])
+            slim_df = slim_df.withColumn(field, element_at(names, col(field).cast(IntegerType()) + 1))
+    return slim_df
+
+
+class ParseStatsAccumulatorParam(AccumulatorParam):
+    """
+    Combines the parser_functions.ParseStats of all executors.
+    """
+
+    def zero(self, value: pf.ParseStats) -> pf.ParseStats:
+        return pf.ParseStats()
+
+    def addInPlace(self, value1: pf.ParseStats, value2: pf.ParseStats) -> pf.ParseStats:
+        return value1.merge(value2)
+
+
+def parse_stats_accumulator(spark: SparkSession) -> Accumulator:
+    """
+    Returns an accumulator for parse_tours which collects the time and failures per field on all executors.
+    Note: tasks which are retried are counted again.
+    """
+    return spark.sparkContext.accumulator(pf.ParseStats(), ParseStatsAccumulatorParam())
+
+
+# Schema of ParseStats.summary, first_error is None for all fields of a run without failures so it can not be inferred
+parse_stats_summary_schema = "field string, calls long, total_seconds double, avg_ms double, failures long, first_error string"
+
+
+def parse_stats_summary(spark: SparkSession, stats_accumulator: Accumulator) -> DataFrame:
+    """
+    Returns the collected parse stats as a table, one row per field (see ParseStats.summary).
+    Only complete after an action on the parsed DataFrame ran.
+    """
+    summary = stats_accumulator.value.summary()
+    # Missing first errors can be NaN in pandas, Spark only accepts None in a string column
+    rows = summary.astype(object).where(summary.notna(), None).values.tolist()
+    return spark.createDataFrame(rows, parse_stats_summary_schema)
+
+
+def parse_tours(tours_df: DataFrame, fields: List[str] = None, stats_accumulator: Accumulator = None, slim: bool = False) -> DataFrame:
+    """
+    Parses the tours with mapInArrow. Only the requested fields are extracted, the DOM work of all other fields is skipped
+    (e.g. the peaks only need the peak map scan and no DOM at all).
+
+    Parameters:
+    tours_df (DataFrame): DataFrame with a `value` (html) and a `file_path` column.
+    fields (List[str]): The fields to parse (default: all fields of parser_functions.field_parsers).
+    stats_accumulator (Accumulator): Collect time and failures per field, see parse_stats_accumulator.
+                                     Failing fields are then set to null instead of failing the task (optional).
+    slim (bool): Output the slim storage schema, difficulties as ordinals and duration in seconds (see slim_tour_schema).
+
+    Returns:
+    DataFrame: The parsed tours with the schema parsed_tour_schema_for(fields, slim).
+    """
+    parse = partial(af.parse_arrow_batches, fields=fields, stats_accumulator=stats_accumulator, slim=slim)
+    return tours_df.select("value", "file_path").mapInArrow(parse, parsed_tour_schema_for(fields, slim))
+
+
+def _regex_number(value: Column, pattern: str, data_type=IntegerType()) -> Column:
+    # regexp_extract returns an empty string if the pattern does not match, which can not be cast with ANSI mode
+    extracted = regexp_extract(value, pattern, 1)
+    return when(extracted != "", extracted.cast(data_type))
+
+
+def _native_peaks(value: Column) -> Column:
+    peak_blocks = regexp_extract_all(value, lit(r"(?s)pizs\.push\(\{.*?\}\)"), 0)
+    peaks = transform(peak_blocks, lambda block: struct(
+        _regex_number(block, r"piz_lat:([\d.]+),", FloatType()).alias("latitude"),
+        _regex_number(block, r"piz_lon:([\d.]+),", FloatType()).alias("longitude"),
+        # regexp_extract can not tell a missing name from an empty one
+        when(block.rlike(r'(?s)piz_name:".*?",'), regexp_extract(block, r'(?s)piz_name:"(.*?)",', 1)).alias("name"),
+        _regex_number(block, r"piz_height:(\d+),").alias("height"),
+        _regex_number(block, r"piz_id:(\d+)").alias("id"),
+    ))
+    # Incomplete blocks (any key missing, including the name) are skipped like in parser_functions.scan_peaks_and_photos
+    return filter(peaks, lambda peak: peak["id"].isNotNull() & peak["latitude"].isNotNull() & peak["longitude"].isNotNull() & peak["name"].isNotNull() & peak["height"].isNotNull())
+
+
+# Fields which are extracted with Spark SQL expressions on the raw HTML (value) and the file path, without Python.
+# Same results as parser_functions.field_parsers on well formed pages.
+native_field_extractors: Dict[str, Callable[[Column, Column], Column]] = {
+    "id": lambda value, file_path: regexp_replace(regexp_extract(file_path, r"([^/.]*)[^/]*$", 1), "post", ""),
+    "photo_count": lambda value, file_path: size(split(value, r"photo_id:\d+")) - 1,
+    "peaks": lambda value, file_path: _native_peaks(value),
+    "ascent": lambda value, file_path: _regex_number(value, r"(?s)>\s*Aufstieg:\s*</td>\s*<td[^>]*>\s*(\d+)"),
+    "descent": lambda value, file_path: _regex_number(value, r"(?s)>\s*Abstieg:\s*</td>\s*<td[^>]*>\s*(\d+)"),
+    "page_views": lambda value, file_path: _regex_number(value, r'(?s)<div style="text-align:center;color:#666;font-size:0\.814em">.*?<b>\s*(\d+)\s*</b>'),
+}
+
+
+def native_fields(tours_df: DataFrame, fields: List[str] = None) -> DataFrame:
+    """
+    Extracts the fields of native_field_extractors with Spark SQL only, no Python worker is involved.
+    The result can be joined with parse_tours(tours_df, other_fields) on `id`.
+
+    Parameters:
+    tours_df (DataFrame): DataFrame with a `value` (html) and a `file_path` column.
+    fields (List[str]): The native fields (default: all of native_field_extractors), `id` is always included.
+
+    Returns:
+    DataFrame: The fields with the types of parsed_tour_schema.
+    """
+    fields = ["id"] + [field for field in (fields or native_field_extractors) if field != "id"]
+    return tours_df.select(*[_native_column(field) for field in fields])
+
+
+def _native_column(field: str) -> Column:
+    return native_field_extractors[field](col("value"), col("file_path")).cast(parsed_tour_schema[field].dataType).alias(field)
+
+
+def parse_tours_hybrid(tours_df: DataFrame, fields: List[str] = None, stats_accumulator: Accumulator = None, slim: bool = False) -> DataFrame:
+    """
+    Same result as parse_tours, but the regex friendly fields (see native_field_extractors) are computed
+    by Spark SQL and only the DOM dependent fields go through Python. The native columns are computed
+    before mapInArrow and passed through it, so the HTML is read once and no join is needed.
+
+    Parameters:
+    tours_df (DataFrame): DataFrame with a `value` (html) and a `file_path` column.
+    fields (List[str]): The fields to parse (default: all fields).
+    stats_accumulator (Accumulator): Collect time and failures of the Python fields, see parse_stats_accumulator (optional).
+    slim (bool): Output the slim storage schema (see slim_tour_schema).
+
+    Returns:
+    DataFrame: The parsed tours with the schema parsed_tour_schema_for(fields, slim).
+    """
+    schema = parsed_tour_schema_for(fields, slim)
+    fields = schema.names
+    native = [field for field in fields if field in native_field_extractors]
+    python = [field for field in fields if field not in native_field_extractors]
+    native_df = tours_df.select("value", "file_path", *[_native_column(field) for field in native])
+    if not python:
+        return native_df.select(*fields)
+    parse = partial(af.parse_arrow_batches, fields=python, stats_accumulator=stats_accumulator, passthrough=native, slim=slim)
+    return native_df \
+        .mapInArrow(parse, StructType([schema[field] for field in python + native])) \
+        .select(*fields)
+
+
+def read_corpus(spark: SparkSession, path: str, num_partitions: int = None) -> DataFrame:
+    """
+    Reads the tours of a corpus (directory, glob pattern, zip or tar(.gz) archive) into a DataFrame
+    with the same columns as spark.read.text(..., wholetext=True) + input_file_name().
+    Compacted Parquet files (compaction.compact_corpus) are read with read_compacted.
+    The path must be readable from all executors (local or shared file system).
+    Zip archives and directories are split into partitions by member, a tar archive is streamed by a single task.
+
+    Parameters:
+    spark (SparkSession): The spark session.
+    path (str): The corpus path.
+    num_partitions (int): The number of partitions (default: spark.default.parallelism).
+
+    Returns:
+    DataFrame: DataFrame with a `value` (html) and a `file_path` column.
+    """
+    if corpus.is_compacted(path):
+        return read_compacted(spark, path)
+    sc = spark.sparkContext
+    if corpus.is_tar(path):
+        rdd = sc.parallelize([path], 1).flatMap(lambda archive_path: corpus.iter_members(archive_path))
+    else:
+        members = [name for name, _ in corpus.list_members(path)]
+        rdd = sc.parallelize(members, num_partitions).mapPartitions(lambda names: corpus.iter_members(path, list(names)))
+    return spark.createDataFrame(rdd.map(lambda tour: (tour[1], tour[0])), StructType([
+        StructField("value", StringType()),
+        StructField("file_path", StringType()),
+    ]))
+
+
+def read_compacted(spark: SparkSession, path: str) -> DataFrame:
+    """
+    Reads tours packed by compaction.compact_corpus. Replaces the per file listing of
+    spark.read.text(..., wholetext=True), no openCostInBytes / maxPartitionBytes tuning needed.
+
+    Parameters:
+    spark (SparkSession): The spark session.
+    path (str): The directory of the compacted Parquet files, e.g. s3a://dawr-hikr-compacted/
+
+    Returns:
+    DataFrame: DataFrame with a `value` (html) and a `file_path` (post id) column.
+    """
+    # Leftovers of an interrupted compaction are hidden .tmp files, the filter also skips any other stray file
+    return spark.read.option("pathGlobFilter", "*.parquet").parquet(path).select(col("html").alias("value"), col("post_id").alias("file_path"))
+
+
+def with_fingerprint(tours_df: DataFrame) -> DataFrame:
+    """
+    Adds the post id (from the file path) and a content fingerprint, both computed natively by Spark.
+
+    Parameters:
+    tours_df (DataFrame): DataFrame with a `value` (html) and a `file_path` column.
+
+    Returns:
+    DataFrame: tours_df with a `post_id` and a `fingerprint` column.
+    """
+    return tours_df \
+        .withColumn("post_id", regexp_extract(col("file_path"), r"(\d+)[^/]*$", 1)) \
+        .withColumn("fingerprint", sha2(col("value"), 256))
+
+
+def ingest_incremental(spark: SparkSession, tours_df: DataFrame, table_path: str, fields: List[str] = None, aggregates_path: str = None) -> int:
+    """
+    Parses only new or changed tours and appends them to a Parquet table partitioned by tour year.
+    A manifest of the parsed post ids and their content fingerprints is kept in `{table_path}/_manifest`
+    (ignored by Spark when reading the table). Changed tours are appended as a new version, use read_latest to read the table.
+
+    Parameters:
+    spark (SparkSession): The spark session.
+    tours_df (DataFrame): DataFrame with a `value` (html) and a `file_path` column.
+    table_path (str): The path of the parsed tours table.
+    fields (List[str]): The fields to parse (default: all fields), `id` and `tour_date` are always parsed,
+                        with aggregates_path also the fields the aggregates need (aggregates.aggregate_fields).
+    aggregates_path (str): Keep the aggregate tables (see aggregates.py) in this directory up to date (optional).
+
+    Returns:
+    int: The number of parsed tours.
+    """
+    if fields is not None:
+        required = ["id", "tour_date"] + (aggregates.aggregate_fields if aggregates_path is not None else [])
+        fields = list(fields) + [field for field in required if field not in fields]
+    manifest_path = f"{table_path}/_manifest"
+    tours_df = with_fingerprint(tours_df)
+    try:
+        manifest_df = spark.read.parquet(manifest_path)
+        changed_df = tours_df.join(manifest_df, ["post_id", "fingerprint"], "left_anti")
+    except AnalysisException: # First run, no manifest yet
+        manifest_df = None
+        changed_df = tours_df
+    changed_df = changed_df.cache()
+
+    count = changed_df.count()
+    print(f"{count} new or changed tours")
+    if count == 0:
+        changed_df.unpersist()
+        return 0
+
+    parsed_df = parse_tours(changed_df, fields) \
+        .join(changed_df.select(col("post_id").alias("id"), "fingerprint"), "id") \
+        .withColumn("ingested_at", current_timestamp()) \
+        .withColumn("tour_year", year(col("tour_date"))) \
+        .cache()
+    parsed_df.write.mode("append").partitionBy("tour_year").parquet(table_path)
+    if aggregates_path is not None:
+        updated = 0 if manifest_df is None else changed_df.join(manifest_df.select("post_id"), "post_id", "left_semi").count()
+        if updated:
+            # Changed tours can not be retracted from the aggregates, rebuild them
+            aggregates.build_aggregates(read_latest(spark, table_path), aggregates_path)
+        else:
+            aggregates.update_aggregates(spark, parsed_df, aggregates_path)
+    # The manifest is written last, tours of an interrupted run are parsed again and deduplicated by read_latest
+    changed_df.select("post_id", "fingerprint").write.mode("append").parquet(manifest_path)
+    parsed_df.unpersist()
+    changed_df.unpersist()
+    return count
+
+
+def read_latest(spark: SparkSession, table_path: str) -> DataFrame:
+    """
+    Reads the table written by ingest_incremental with only the latest version of every tour.
+
+    Parameters:
+    spark (SparkSession): The spark session.
+    table_path (str): The path of the parsed tours table.
+
+    Returns:
+    DataFrame: The parsed tours.
+    """
+    latest = Window.partitionBy("id").orderBy(col("ingested_at").desc())
+    return spark.read.parquet(table_path) \
+        .withColumn("version", row_number().over(latest)) \
+        .where(col("version") == 1) \
+        .drop("version")
+
+
+# Columns of the layout written by write_parsed_tours
+partition_columns = ["country", "tour_year"]
+cluster_columns = ["regions.region_2_content", "regions.region_3_content", "tour_date"]
+
+
+def write_parsed_tours(parsed_df: DataFrame, path: str, mode: str = "overwrite", row_group_bytes: int = 32 * 1024 * 1024, max_records_per_file: int = 200000):
+    """
+    Writes parsed tours as Parquet partitioned by country and tour year (country=Schweiz/tour_year=2019/...).
+    Every partition is written by a single task and sorted by region and tour date, so the min / max statistics
+    of the row groups are narrow and filters on region, date range or difficulty skip most row groups.
+
+    Parameters:
+    parsed_df (DataFrame): The parsed tours (full or slim schema, needs regions and tour_date).
+    path (str): The output directory.
+    mode (str): The save mode, e.g. overwrite or append.
+    row_group_bytes (int): The target size of a row group, smaller row groups can be skipped more selectively.
+    max_records_per_file (int): Split large partitions (e.g. Schweiz) into several files.
+    """
+    parsed_df \
+        .withColumn("country", col("regions.country")) \
+        .withColumn("tour_year", year(col("tour_date"))) \
+        .repartition(*partition_columns) \
+        .sortWithinPartitions(*partition_columns, *cluster_columns) \
+        .write \
+        .mode(mode) \
+        .partitionBy(*partition_columns) \
+        .option("parquet.block.size", row_group_bytes) \
+        .option("maxRecordsPerFile", max_records_per_file) \
+        .parquet(path)
+
+
+def read_parsed_tours(spark: SparkSession, path: str) -> DataFrame:
+    """
+    Reads the tours written by write_parsed_tours. Filters on country and tour_year prune whole directories,
+    filters on the other columns (also nested ones like regions.region_2_content) are pushed down to the row group statistics:
+    read_parsed_tours(spark, path).where((col("country") == "Schweiz") & (col("tour_date") >= "2020-01-01"))
+
+    Parameters:
+    spark (SparkSession): The spark session.
+    path (str): The directory written by write_parsed_tours.
+
+    Returns:
+    DataFrame: The parsed tours with the additional country and tour_year columns.
+    """
+    return spark.read.parquet(path)
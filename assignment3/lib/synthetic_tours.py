@@ -0,0 +1,126 @@
+### Generator for synthetic hikr tour pages
+### Mimics the parts of a hikr.org tour page which parser_functions extracts, used for offline benchmarks
+
+from typing import Dict, Iterator, List, Tuple
+import random
+
+month_names = ['Januar', 'Februar', 'März', 'April', 'Mai', 'Juni', 'Juli', 'August', 'September', 'Oktober', 'November', 'Dezember']
+
+waypoint_icons = [
+    'https://s.hikr.org/r4icons/ico2_peak_s.png',
+    'https://s.hikr.org/r4icons/ico2_hut_s.png',
+    'https://s.hikr.org/r4icons/ico2_pass_s.png',
+    'https://s.hikr.org/r4icons/ico2_lake_s.png',
+    'https://s.hikr.org/r4icons/ico2_ort_s.png',
+]
+
+hiking_difficulties = ['T1 - Wandern', 'T2 - Bergwandern', 'T3 - anspruchsvolles Bergwandern', 'T4 - Alpinwandern', 'T5 - anspruchsvolles Alpinwandern', 'T6 - schwieriges Alpinwandern']
+
+# Label -> function(rng) returning the HTML of the value cell
+fiche_generators = {
+    'Region:': lambda rng: ' <a href="https://www.hikr.org/region1/">Welt</a> &raquo; <a href="https://www.hikr.org/region2/">Schweiz</a> &raquo; <a href="https://www.hikr.org/region3/">Bern</a> &raquo; <a href="https://www.hikr.org/region4/">Berner Oberland</a>',
+    'Tour Datum:': lambda rng: f'{rng.randint(1, 28)} {rng.choice(month_names)} {rng.randint(2005, 2024)}',
+    'Wandern Schwierigkeit:': lambda rng: f' <a href="https://www.hikr.org/difficulty/">{rng.choice(hiking_difficulties)}</a>',
+    'Klettern Schwierigkeit:': lambda rng: f' <a href="https://www.hikr.org/difficulty/">K{rng.randint(1, 6)} - Klettersteig</a>',
+    'Hochtouren Schwierigkeit:': lambda rng: ' <a href="https://www.hikr.org/difficulty/">WS</a>',
+    'Ski Schwierigkeit:': lambda rng: ' <a href="https://www.hikr.org/difficulty/">ZS</a>',
+    'Aufstieg:': lambda rng: f'{rng.randint(100, 2500)} m',
+    'Abstieg:': lambda rng: f'{rng.randint(100, 2500)} m',
+    'Zeitbedarf:': lambda rng: f'{rng.randint(1, 12)}:{rng.randint(0, 59):02d}',
+    'Strecke:': lambda rng: 'Parkplatz - Hütte - Gipfel',
+    'Kartennummer:': lambda rng: '1:25000',
+}
+
+
+def _waypoints_html(rng: random.Random, count: int) -> str:
+    items = []
+    for i in range(count):
+        height = rng.randint(400, 4500)
+        items.append(f'<li><img src="{rng.choice(waypoint_icons)}" /> <a href="https://www.hikr.org/dir/Waypoint_{i}_{1000 + i}/">Waypoint {i} {height} m</a></li>')
+    return f' <ul class="wegpunkte">{"".join(items)}</ul>'
+
+
+def _fiche_html(rng: random.Random, fields: List[str], waypoints: int) -> str:
+    rows = []
+    for label in fields:
+        value = fiche_generators[label](rng)
+        rows.append(f'<tr><td class="fiche_rando_b">{label}</td><td class="fiche_rando">{value}</td></tr>')
+    if waypoints:
+        rows.append(f'<tr><td class="fiche_rando_b">Wegpunkte:</td><td class="fiche_rando">{_waypoints_html(rng, waypoints)}</td></tr>')
+    return f'<table class="fiche_rando">{"".join(rows)}</table>'
+
+
+def _peaks_js(rng: random.Random, count: int) -> str:
+    lines = []
+    for i in range(count):
+        lines.append(f'pizs.push({{piz_lat:{rng.uniform(45.8, 47.8):.5f},piz_lon:{rng.uniform(5.9, 10.5):.5f},piz_name:"Peak {i}",piz_height:{rng.randint(1000, 4600)},piz_id:{rng.randint(1, 100000)},piz_url:"https://www.hikr.org/dir/Peak_{i}/"}});')
+    return '\n'.join(lines)
+
+
+def _photos_js(rng: random.Random, count: int) -> str:
+    return '\n'.join(f'photos.push({{photo_id:{rng.randint(1, 10**7)},w:800,h:600}});' for _ in range(count))
+
+
+def generate_tour_html(rng: random.Random, waypoints: int = 8, peaks: int = 3, photos: int = 20, partners: int = 2, fiche_fields: List[str] = None, filler_bytes: int = 30000) -> str:
+    """
+    Generates a synthetic hikr tour page.
+
+    Parameters:
+    rng (random.Random): The random generator, use a seeded one for reproducible pages.
+    waypoints (int): Number of waypoints.
+    peaks (int): Number of peaks in the peak map.
+    photos (int): Number of photos.
+    partners (int): Number of tour partners.
+    fiche_fields (List[str]): Labels of fiche_generators to include (default: all).
+    filler_bytes (int): Size of unrelated markup, real pages are around 50KB.
+
+    Returns:
+    str: The HTML of the page.
+    """
+    if fiche_fields is None:
+        fiche_fields = list(fiche_generators)
+    author_id = rng.randint(1, 100000)
+    partner_links = ', '.join(f'<a href="https://www.hikr.org/user/partner{i}/">Partner {i}</a>' for i in range(partners))
+    filler = '<div class="text"><p>Lorem ipsum dolor sit amet, consectetur adipiscing elit.</p></div>\n' * max(filler_bytes // 80, 0)
+    return f'''<html><head><title>Tour</title></head><body>
+<h1 class="title">Synthetic Tour {rng.randint(1, 10**6)}</h1>
+<div class="author"><img id="anchor_author_{author_id}" onmouseover='show_user("https://www.hikr.org/","{author_id}","user{author_id}","")' src="x.png" />
+<a class="standard" href="https://www.hikr.org/user/user{author_id}/">User {author_id}</a> {rng.randint(1, 28)}. {rng.choice(month_names)} {rng.randint(2005, 2024)} um {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}</div>
+{_fiche_html(rng, fiche_fields, waypoints)}
+{filler}
+<div class="div15"><b>Tourengänger:</b> {partner_links}</div>
+<div style="text-align:center;color:#666;font-size:0.814em">Diese Seite wurde <b>{rng.randint(1, 50000)}</b> mal angesehen</div>
+<script>
+var pizs = [];
+{_peaks_js(rng, peaks)}
+var photos = [];
+{_photos_js(rng, photos)}
+</script>
+</body></html>'''
+
+
+def generate_tours(count: int, seed: int = 42, **kwargs) -> Dict[str, str]:
+    """
+    Generates `count` synthetic tours.
+
+    Parameters:
+    count (int): Number of tours.
+    seed (int): Seed of the random generator.
+    kwargs: Passed to generate_tour_html.
+
+    Returns:
+    Dict[str, str]: file path -> HTML
+    """
+    return dict(iter_tours(count, seed, **kwargs))
+
+
+def iter_tours(count: int, seed: int = 42, **kwargs) -> Iterator[Tuple[str, str]]:
+    """
+    Lazily generates the same tours as generate_tours, only one page is in memory at a time.
+
+    Returns:
+    Iterator[Tuple[str, str]]: (file path, HTML)
+    """
+    rng = random.Random(seed)
+    for i in range(count):
+        yield f'./synthetic/post{100000 + i}.html', generate_tour_html(rng, **kwargs)
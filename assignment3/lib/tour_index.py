@@ -0,0 +1,222 @@
+### Inverted index over parsed tours: tour name words, region levels, waypoint names and types and authors
+### Postings are sorted tour numbers, delta and varint encoded into one bytes blob. Lookups only need Python (no Spark)
+
+from typing import Dict, Iterable, List, Set, Tuple
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+import pickle
+import re
+import unicodedata
+import pyarrow.parquet as pq
+
+# Columns of the parsed tours which are needed to build the index
+index_columns = ['id', 'name', 'regions', 'waypoints', 'author_public_name', 'author_internal_name']
+word_pattern = re.compile(r'\w+')
+
+
+def normalize(text: str) -> str:
+    """
+    Lower case without diacritics and repeated whitespace, e.g. 'Piz Palü ' -> 'piz palu'.
+    """
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ' '.join(''.join(char for char in decomposed if not unicodedata.combining(char)).casefold().split())
+
+
+def _get(value, key: str):
+    # Parsed values are dataclasses (parse_tour) or dicts (read from Parquet)
+    return value.get(key) if isinstance(value, dict) else getattr(value, key, None)
+
+
+def tour_terms(tour: Dict) -> Set[str]:
+    """
+    Returns the index terms of a parsed tour as 'field:value':
+    name (every word of the tour name), region (every region level), waypoint (waypoint name),
+    waypoint_type (e.g. hut) and author (public and internal name).
+    """
+    terms = set()
+    if tour.get('name'):
+        terms.update(f'name:{word}' for word in word_pattern.findall(normalize(tour['name'])))
+    regions = tour.get('regions') or {}
+    for level in regions.values() if isinstance(regions, dict) else []:
+        if level:
+            terms.add(f'region:{normalize(level)}')
+    for waypoint in tour.get('waypoints') or []:
+        name, waypoint_type = _get(waypoint, 'name') or _get(waypoint, 'name_raw'), _get(waypoint, 'type')
+        if name:
+            terms.add(f'waypoint:{normalize(name)}')
+        if waypoint_type:
+            terms.add(f'waypoint_type:{waypoint_type}')
+    for author in [tour.get('author_public_name'), tour.get('author_internal_name')]:
+        if author:
+            terms.add(f'author:{normalize(author)}')
+    return terms
+
+
+def encode_postings(numbers: List[int]) -> bytes:
+    """
+    Encodes sorted tour numbers as varints of the gaps between them (7 bits per byte, high bit = more bytes follow).
+    """
+    encoded = bytearray()
+    previous = 0
+    for number in numbers:
+        gap = number - previous
+        previous = number
+        while gap >= 0x80:
+            encoded.append((gap & 0x7F) | 0x80)
+            gap >>= 7
+        encoded.append(gap)
+    return bytes(encoded)
+
+
+def decode_postings(encoded: bytes) -> List[int]:
+    """
+    Decodes the tour numbers of encode_postings.
+    """
+    numbers = []
+    number = 0
+    gap = 0
+    shift = 0
+    for byte in encoded:
+        gap |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        number += gap
+        numbers.append(number)
+        gap = 0
+        shift = 0
+    return numbers
+
+
+class TourIndex:
+    """
+    Read only inverted index. Tours are numbered 0..n-1 in build order, terms are sorted so
+    prefix lookups are a binary search, the postings of term i are blob[offsets[i]:offsets[i + 1]].
+    """
+
+    def __init__(self, tour_ids: List[str], terms: List[str], offsets: array, blob: bytes):
+        self.tour_ids = tour_ids
+        self.terms = terms
+        self.offsets = offsets
+        self.blob = blob
+
+    @classmethod
+    def build(cls, tours: Iterable[Dict]) -> 'TourIndex':
+        """
+        Builds the index from parsed tours, see parser_functions.parse_tour (only index_columns are needed).
+        """
+        tour_ids = []
+        postings: Dict[str, List[int]] = defaultdict(list)
+        for tour in tours:
+            number = len(tour_ids)
+            tour_ids.append(tour['id'])
+            for term in tour_terms(tour):
+                postings[term].append(number)
+
+        terms = sorted(postings)
+        offsets = array('q', [0])
+        blob = bytearray()
+        for term in terms:
+            blob += encode_postings(postings[term])
+            offsets.append(len(blob))
+        return cls(tour_ids, terms, offsets, bytes(blob))
+
+    @classmethod
+    def from_parquet(cls, path: str) -> 'TourIndex':
+        """
+        Builds the index from parsed tours stored as Parquet (parse-data.py or spark_functions.write_parsed_tours).
+        """
+        def tours():
+            for batch in pq.read_table(path, columns=index_columns).to_batches():
+                yield from batch.to_pylist()
+        return cls.build(tours())
+
+    def save(self, path: str):
+        with open(path, 'wb') as f:
+            pickle.dump((self.tour_ids, self.terms, self.offsets, self.blob), f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path: str) -> 'TourIndex':
+        with open(path, 'rb') as f:
+            return cls(*pickle.load(f))
+
+    def __len__(self) -> int:
+        return len(self.tour_ids)
+
+    def _postings(self, position: int) -> List[int]:
+        return decode_postings(self.blob[self.offsets[position]:self.offsets[position + 1]])
+
+    def _numbers(self, field: str, value: str) -> Set[int]:
+        """
+        Returns the tour numbers of a (field, value) term, see lookup.
+        """
+        prefix = value.endswith('*')
+        value = value[:-1] if prefix else value
+        if field != 'waypoint_type':
+            value = normalize(value)
+        if field == 'name':
+            # Every word must be in the tour name, a trailing * applies to the last word
+            words = word_pattern.findall(value)
+            if not words:
+                return set()
+            numbers = [self._term_numbers(f'name:{word}') for word in words[:-1]]
+            numbers.append(self._prefix_numbers(f'name:{words[-1]}') if prefix else self._term_numbers(f'name:{words[-1]}'))
+            return set.intersection(*numbers)
+        term = f'{field}:{value}'
+        return self._prefix_numbers(term) if prefix else self._term_numbers(term)
+
+    def _prefix_numbers(self, prefix: str) -> Set[int]:
+        numbers = set()
+        position = bisect_left(self.terms, prefix)
+        while position < len(self.terms) and self.terms[position].startswith(prefix):
+            numbers.update(self._postings(position))
+            position += 1
+        return numbers
+
+    def _term_numbers(self, term: str) -> Set[int]:
+        position = bisect_left(self.terms, term)
+        if position < len(self.terms) and self.terms[position] == term:
+            return set(self._postings(position))
+        return set()
+
+    def lookup(self, field: str, value: str) -> List[str]:
+        """
+        Returns the ids of the tours with a term.
+
+        Parameters:
+        field (str): name, region, waypoint, waypoint_type or author.
+        value (str): The value, case and diacritics are ignored. A trailing * is a prefix lookup, e.g. ('waypoint', 'piz*').
+
+        Returns:
+        List[str]: The tour ids.
+        """
+        return [self.tour_ids[number] for number in sorted(self._numbers(field, value))]
+
+    def search(self, all_of: List[Tuple[str, str]] = None, any_of: List[Tuple[str, str]] = None, none_of: List[Tuple[str, str]] = None) -> List[str]:
+        """
+        Boolean query over (field, value) terms, see lookup for the terms.
+        Example: search(all_of=[('region', 'Graubünden'), ('waypoint_type', 'hut')], none_of=[('author', 'alberto')])
+
+        Parameters:
+        all_of (List[Tuple[str, str]]): The tours must have all of these terms.
+        any_of (List[Tuple[str, str]]): The tours must have at least one of these terms.
+        none_of (List[Tuple[str, str]]): The tours must have none of these terms.
+
+        Returns:
+        List[str]: The tour ids.
+        """
+        numbers = None
+        # Smallest posting lists first, so the intersection shrinks quickly
+        for term_numbers in sorted((self._numbers(field, value) for field, value in all_of or []), key=len):
+            numbers = term_numbers if numbers is None else numbers & term_numbers
+            if not numbers:
+                return []
+        if any_of:
+            union = set().union(*[self._numbers(field, value) for field, value in any_of])
+            numbers = union if numbers is None else numbers & union
+        if numbers is None:
+            numbers = set(range(len(self.tour_ids)))
+        for field, value in none_of or []:
+            numbers -= self._numbers(field, value)
+        return [self.tour_ids[number] for number in sorted(numbers)]
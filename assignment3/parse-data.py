@@ -0,0 +1,21 @@
+import argparse
+import lib.batch_parser as batch_parser
+
+# Parses the hikr tours locally with all cores and writes them as Parquet shards
+# Example: python parse-data.py "./data/raw/post1*.html" ./data/parsed
+# Archives can be parsed without extracting them: python parse-data.py ./data/raw/200posts.zip
+# The output of compact-data.py can be parsed as well: python parse-data.py ./data/compacted
+# Rerunning the same command resumes after the last completed shard
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Parse hikr tours into Parquet shards')
+    parser.add_argument('input', help='Directory, glob pattern of post*.html files, zip or tar(.gz) archive or compacted Parquet files')
+    parser.add_argument('output', nargs='?', default='./data/parsed', help='Output directory of the Parquet shards')
+    parser.add_argument('--shard-size-mb', type=int, default=64, help='Maximum raw HTML size per shard')
+    parser.add_argument('--processes', type=int, default=None, help='Number of worker processes (default: number of cores)')
+    parser.add_argument('--cache-dir', default=None, help='Parse cache directory, only new tours and changed fields are parsed again')
+    parser.add_argument('--fields', nargs='*', default=None, help='Only parse these fields, e.g. id peaks regions ascent (default: all)')
+    parser.add_argument('--slim', action='store_true', help='Store the difficulties as ordinals and the duration in seconds')
+    args = parser.parse_args()
+
+    batch_parser.parse_to_parquet(args.input, args.output, args.shard_size_mb * 1024 * 1024, args.processes, args.cache_dir, args.fields, args.slim)
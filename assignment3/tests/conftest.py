@@ -0,0 +1,24 @@
+import os
+import sys
+import pytest
+
+# The scripts import the helpers as lib.<module> from the assignment directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+fixture_directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+@pytest.fixture(scope='session')
+def tour_html():
+    # A small tour page with every fiche field, waypoints, peaks, photos and a tour partner
+    with open(os.path.join(fixture_directory, 'post1.html'), encoding='utf-8') as f:
+        return f.read()
+
+
+@pytest.fixture(scope='session')
+def spark():
+    pytest.importorskip('pyspark')
+    from pyspark.sql import SparkSession
+    spark = SparkSession.builder.master('local[1]').appName('tests').getOrCreate()
+    yield spark
+    spark.stop()
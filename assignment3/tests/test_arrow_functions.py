@@ -0,0 +1,94 @@
+import time
+from datetime import datetime
+import pyarrow as pa
+import lib.arrow_functions as af
+import lib.parser_functions as pf
+
+
+def _batch(tour_html, count=4):
+    return pa.RecordBatch.from_pydict({'value': [tour_html] * count, 'file_path': [f'tour/post{number}.html' for number in range(count)]})
+
+
+class StatsCollector:
+    # Same interface as a Spark accumulator of ParseStats
+    def __init__(self):
+        self.value = pf.ParseStats()
+
+    def add(self, stats):
+        self.value = self.value.merge(stats)
+
+
+def _row_by_row(tours, schema):
+    # Reference: pyarrow converts the plain Python values itself
+    return pa.Table.from_pylist([{field.name: af.to_arrow_value(tour.get(field.name)) for field in schema} for tour in tours], schema=schema)
+
+
+def test_record_batch_same_as_pyarrow(tour_html):
+    batch = _batch(tour_html)
+    tours = af.parse_records(batch.column('value').to_pylist(), batch.column('file_path').to_pylist())
+    # Missing and empty lists next to each other
+    tours[0]['peaks'] = None
+    tours[1]['tour_partner'] = []
+
+    record_batch = af.tours_to_record_batch(tours)
+
+    assert record_batch.schema == af.parsed_tour_arrow_schema
+    assert pa.Table.from_batches([record_batch]).to_pylist() == _row_by_row(tours, af.parsed_tour_arrow_schema).to_pylist()
+
+
+def test_parse_arrow_batches(tour_html):
+    parsed = list(af.parse_arrow_batches(iter([_batch(tour_html)])))
+
+    assert len(parsed) == 1
+    assert parsed[0].schema == af.parsed_tour_arrow_schema
+    assert parsed[0].column('id').to_pylist() == ['0', '1', '2', '3']
+
+
+def test_parse_arrow_batches_fields_and_passthrough(tour_html):
+    batch = _batch(tour_html)
+    fields = ['id', 'peaks', 'hiking_difficulty']
+    stats = StatsCollector()
+    parsed = list(af.parse_arrow_batches(iter([batch]), fields, stats, passthrough=['file_path'], slim=True))
+
+    assert len(parsed) == 1
+    assert parsed[0].schema.names == fields + ['file_path']
+    assert parsed[0].schema.field('hiking_difficulty').type == pa.int8()
+    assert parsed[0].column('file_path').equals(batch.column('file_path'))
+    assert set(stats.value.calls) == set(fields)
+
+
+def test_parse_pandas_batches(tour_html):
+    parsed = list(af.parse_pandas_batches(iter([_batch(tour_html, 5).to_pandas()]), ['id', 'photo_count']))
+    assert list(parsed[0].columns) == ['id', 'photo_count']
+    assert len(parsed[0]) == 5
+
+
+def test_records_are_slotted():
+    for record_type in [pf.Waypoint, pf.Peak, pf.TourPartner]:
+        assert not hasattr(record_type(*[None] * len(record_type.__slots__)), '__dict__')
+
+
+def test_record_list_builder_handles_nulls():
+    struct_type = af.parsed_tour_arrow_schema.field('peaks').type.value_type
+    builder = af.RecordListBuilder(struct_type)
+    records = [[pf.Peak(46.37, 9.96, 'Piz Palü', 3900, 1), pf.Peak(None, None, None, None, 2)], None, [], [{'latitude': 1.0, 'longitude': 2.0, 'name': 'x', 'height': None, 'id': 3}]]
+    for record in records:
+        builder.append(record)
+
+    assert builder.finish().equals(pa.array(af.to_arrow_value(records), type=pa.list_(struct_type)))
+
+
+def test_publishing_date_is_the_udf_instant(monkeypatch):
+    # The udf path stores naive datetimes like TimestampType.toInternal: time.mktime, i.e. local time of the worker
+    monkeypatch.setenv('TZ', 'Europe/Zurich')
+    time.tzset()
+    try:
+        published = datetime(2021, 6, 12, 14, 30)
+        schema = pa.schema([af.parsed_tour_arrow_schema.field('publishing_date')])
+        record_batch = af.tours_to_record_batch([{'publishing_date': published}], schema)
+        micros = record_batch.column('publishing_date').cast(pa.int64())[0].as_py()
+        assert micros == int(time.mktime(published.timetuple())) * 1000000
+        assert record_batch.schema.field('publishing_date').type == pa.timestamp('us', tz='UTC')
+    finally:
+        monkeypatch.undo()
+        time.tzset()
@@ -0,0 +1,51 @@
+import os
+import zipfile
+import pyarrow.parquet as pq
+import lib.batch_parser as batch_parser
+
+
+def _write_tours(directory, count, first_id, tour_html):
+    os.makedirs(directory)
+    for number in range(first_id, first_id + count):
+        with open(os.path.join(directory, f'post{number}.html'), 'w', encoding='utf-8') as f:
+            f.write(tour_html)
+
+
+def _write_zip(path, count, first_id, tour_html):
+    with zipfile.ZipFile(path, 'w') as archive:
+        for number in range(first_id, first_id + count):
+            archive.writestr(f'posts/post{number}.html', tour_html)
+
+
+def _parsed_ids(directory):
+    return sorted(pq.read_table(str(directory)).column('id').to_pylist())
+
+
+def test_resume_only_parses_missing_shards(tmp_path, capsys, tour_html):
+    _write_tours(tmp_path / 'a', 6, 100, tour_html)
+    batch_parser.parse_to_parquet(str(tmp_path / 'a'), str(tmp_path / 'parsed'), max_shard_bytes=len(tour_html.encode('utf-8')) * 2, processes=1)
+    expected = _parsed_ids(tmp_path / 'parsed')
+    os.remove(batch_parser.shard_path(str(tmp_path / 'parsed'), 0))
+
+    batch_parser.parse_to_parquet(str(tmp_path / 'a'), str(tmp_path / 'parsed'), max_shard_bytes=len(tour_html.encode('utf-8')) * 2, processes=1)
+    assert '3 shards, 2 already done' in capsys.readouterr().out
+    assert _parsed_ids(tmp_path / 'parsed') == expected == [str(number) for number in range(100, 106)]
+    assert [name for name in os.listdir(tmp_path / 'parsed') if name.startswith('.')] == []
+
+
+def test_plan_of_another_corpus_is_rebuilt(tmp_path, tour_html):
+    _write_tours(tmp_path / 'a', 6, 100, tour_html)
+    _write_tours(tmp_path / 'b', 4, 200, tour_html)
+    batch_parser.parse_to_parquet(str(tmp_path / 'a'), str(tmp_path / 'parsed'), max_shard_bytes=len(tour_html.encode('utf-8')) * 2, processes=1)
+    batch_parser.parse_to_parquet(str(tmp_path / 'b'), str(tmp_path / 'parsed'), max_shard_bytes=len(tour_html.encode('utf-8')) * 2, processes=1)
+
+    assert _parsed_ids(tmp_path / 'parsed') == [str(number) for number in range(200, 204)]
+
+
+def test_changed_archive_is_planned_again(tmp_path, tour_html):
+    _write_zip(tmp_path / 'a.zip', 6, 100, tour_html)
+    batch_parser.parse_to_parquet(str(tmp_path / 'a.zip'), str(tmp_path / 'parsed'), max_shard_bytes=len(tour_html.encode('utf-8')) * 2, processes=1)
+    _write_zip(tmp_path / 'a.zip', 3, 100, tour_html)
+    batch_parser.parse_to_parquet(str(tmp_path / 'a.zip'), str(tmp_path / 'parsed'), max_shard_bytes=len(tour_html.encode('utf-8')) * 2, processes=1)
+
+    assert _parsed_ids(tmp_path / 'parsed') == [str(number) for number in range(100, 103)]
@@ -0,0 +1,53 @@
+import os
+import random
+import subprocess
+import sys
+from collections import defaultdict
+from lib.cohiking_graph import CoHikingGraph, tour_participants
+
+
+def _random_tours(count=300, users=80, seed=11):
+    rng = random.Random(seed)
+    return [[f'user{rng.randrange(users)}' for _ in range(rng.randint(1, 4))] for _ in range(count)]
+
+
+def test_import_without_pyspark():
+    directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = 'import sys; sys.modules["pyspark"] = None; import lib.cohiking_graph'
+    assert subprocess.run([sys.executable, '-c', code], cwd=directory).returncode == 0
+
+
+def test_same_as_brute_force():
+    tours = _random_tours()
+    graph = CoHikingGraph.build(tours)
+
+    shared = defaultdict(int)
+    tour_counts = defaultdict(int)
+    for participants in tours:
+        users = sorted(set(participants))
+        for user in users:
+            tour_counts[user] += 1
+        for i, a in enumerate(users):
+            for b in users[i + 1:]:
+                shared[a, b] += 1
+                shared[b, a] += 1
+
+    assert graph.edge_count == len(shared) // 2
+    for user in tour_counts:
+        assert graph.tour_count(user) == tour_counts[user]
+        assert dict(graph.neighbors(user)) == {b: weight for (a, b), weight in shared.items() if a == user}
+        assert graph.degree(user) == len(graph.neighbors(user))
+    a, b = next(iter(shared))
+    assert graph.shared_tours(a, b) == shared[a, b]
+
+
+def test_components():
+    graph = CoHikingGraph.build([['a', 'b'], ['b', 'c'], ['d', 'e'], ['f']])
+
+    assert graph.component_sizes() == [3, 2, 1]
+    assert sorted(graph.component('c')) == ['a', 'b', 'c']
+
+
+def test_participants_of_parsed_tour():
+    tour = {'author_internal_name': 'mong', 'tour_partner': [{'name': 'Alberto', 'user_id': 'alberto'}, {'name': 'Gast', 'user_id': None}]}
+    assert tour_participants(tour) == ['mong', 'alberto']
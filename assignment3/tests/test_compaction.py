@@ -0,0 +1,49 @@
+import os
+import pyarrow.parquet as pq
+import lib.batch_parser as batch_parser
+import lib.compaction as compaction
+import lib.corpus as corpus
+import lib.parser_functions as pf
+import lib.synthetic_tours as synthetic_tours
+
+
+def _write_corpus(directory, count=12):
+    tours = {}
+    for file_path, html in synthetic_tours.iter_tours(count, filler_bytes=2000):
+        path = os.path.join(directory, os.path.basename(file_path))
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(html)
+        tours[pf.parse_tour_id(path)] = html
+    return tours
+
+
+def test_balanced_groups():
+    groups = compaction.balanced_groups([(str(i), 10) for i in range(10)], 40)
+    assert sorted(len(group) for group in groups) == [3, 3, 4]
+
+
+def test_compacted_corpus_is_read_like_the_raw_corpus(tmp_path):
+    raw, compacted = tmp_path / 'raw', tmp_path / 'compacted'
+    raw.mkdir()
+    tours = _write_corpus(str(raw))
+    compaction.compact_corpus(str(raw), str(compacted), max_file_bytes=20000, max_row_group_bytes=8000)
+    # Leftover of an interrupted run
+    (compacted / '.compacted-00099.parquet.tmp').write_bytes(b'incomplete')
+
+    assert len(corpus.compacted_files(str(compacted))) > 1
+    assert dict(corpus.iter_members(str(compacted))) == tours
+    assert dict(corpus.list_members(str(compacted))) == {post_id: len(html.encode('utf-8')) for post_id, html in tours.items()}
+    subset = sorted(tours)[3:6]
+    assert [post_id for post_id, _ in corpus.iter_members(str(compacted), subset)] == subset
+
+
+def test_parse_data_reads_compacted_files(tmp_path):
+    raw, compacted, parsed = tmp_path / 'raw', tmp_path / 'compacted', tmp_path / 'parsed'
+    raw.mkdir()
+    tours = _write_corpus(str(raw))
+    compaction.compact_corpus(str(raw), str(compacted), max_file_bytes=20000)
+
+    batch_parser.parse_to_parquet(str(compacted), str(parsed), max_shard_bytes=30000, processes=1, fields=['id', 'name'])
+
+    table = pq.read_table(str(parsed))
+    assert sorted(table.column('id').to_pylist()) == sorted(tours)
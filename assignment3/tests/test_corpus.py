@@ -0,0 +1,39 @@
+import io
+import os
+import tarfile
+import zipfile
+import lib.corpus as corpus
+
+
+def _write_directory(directory, tours):
+    os.makedirs(directory)
+    for name, html in tours.items():
+        with open(os.path.join(directory, name), 'w', encoding='utf-8') as f:
+            f.write(html)
+    # Not a tour
+    with open(os.path.join(directory, 'index.html'), 'w') as f:
+        f.write('<html></html>')
+
+
+def test_archives_are_read_like_the_directory(tmp_path, tour_html):
+    tours = {f'post{number}.html': tour_html.replace('Synthetic Tour 596854', f'Tour {number}') for number in range(5)}
+    _write_directory(tmp_path / 'tours', tours)
+    with zipfile.ZipFile(tmp_path / 'tours.zip', 'w') as archive:
+        for name, html in tours.items():
+            archive.writestr(f'tours/{name}', html)
+        archive.writestr('tours/index.html', '<html></html>')
+    with tarfile.open(tmp_path / 'tours.tar.gz', 'w:gz') as archive:
+        for name, html in tours.items():
+            data = html.encode('utf-8')
+            info = tarfile.TarInfo(f'tours/{name}')
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+
+    expected = sorted((corpus.pf.parse_tour_id(name), html) for name, html in tours.items())
+    for path in ['tours', 'tours.zip', 'tours.tar.gz']:
+        path = str(tmp_path / path)
+        assert sorted(corpus.iter_posts(path)) == expected
+        members = corpus.list_members(path)
+        assert len(members) == len(tours)
+        # Only some members, e.g. one shard of batch_parser
+        assert [name for name, _ in corpus.iter_members(path, [members[1][0]])] == [members[1][0]]
@@ -0,0 +1,28 @@
+from datetime import date, datetime
+import pandas as pd
+import pytest
+import lib.parser_functions as pf
+
+
+def test_parse_german_date():
+    assert pf.parse_german_date('12 Juni 2021') == date(2021, 6, 12)
+    assert pf.parse_german_date('1 märz 2019') == date(2019, 3, 1)
+    assert pf.parse_german_date('31 Dezember 1999') == date(1999, 12, 31)
+
+
+def test_parse_german_datetime():
+    assert pf.parse_german_datetime('12. Juni 2021 um 14:30') == datetime(2021, 6, 12, 14, 30)
+    assert pf.parse_german_datetime('3. März 2020 um 7:05') == datetime(2020, 3, 3, 7, 5)
+
+
+@pytest.mark.parametrize('value', ['12 June 2021', '12.06.2021', '12 Juni', '30 Februar 2021'])
+def test_invalid_dates_raise(value):
+    with pytest.raises(ValueError):
+        pf.parse_german_date(value)
+
+
+def test_parse_german_dates_column():
+    values = pd.Series(['12 Juni 2021', None, '12 Juni 2021', '1 Mai 2020'])
+    parsed = pf.parse_german_dates(values)
+    assert list(parsed[[0, 2, 3]]) == [date(2021, 6, 12), date(2021, 6, 12), date(2020, 5, 1)]
+    assert pd.isna(parsed[1])
@@ -0,0 +1,19 @@
+import lib.parser_functions as pf
+
+
+def test_ordinals_are_ordered():
+    grades = ['T1-', 'T1', 'T1+', 'T4-', 'T4', 'T4+', 'T6+']
+    ordinals = [pf.grade_ordinal('hiking_difficulty', grade) for grade in grades]
+    assert ordinals == sorted(ordinals)
+    assert [pf.grade_name('hiking_difficulty', ordinal) for ordinal in ordinals] == grades
+
+
+def test_longest_base_grade_wins():
+    assert pf.grade_name('hightour_difficulty', pf.grade_ordinal('hightour_difficulty', 'SS+ - sehr schwierig')) == 'SS+'
+    assert pf.grade_ordinal('hiking_difficulty', 'X5') is None
+
+
+def test_lower_bound_includes_minus_grade():
+    assert pf.grade_lower_bound('hiking_difficulty', 'T4') == pf.grade_ordinal('hiking_difficulty', 'T4-')
+    assert pf.grade_lower_bound('hiking_difficulty', 'T4+') == pf.grade_ordinal('hiking_difficulty', 'T4+')
+    assert pf.grade_lower_bound('hiking_difficulty', 'T4-') == pf.grade_ordinal('hiking_difficulty', 'T4-')
@@ -0,0 +1,47 @@
+import os
+import lib.parser_functions as pf
+from lib.parse_cache import ParseCache, uncached_fields
+
+
+def test_second_parse_is_a_hit(tmp_path, tour_html):
+    cache = ParseCache(str(tmp_path))
+    first = cache.parse_tour(tour_html, 'tour/post42.html')
+    second = cache.parse_tour(tour_html, 'tour/post42.html')
+
+    assert first == second == pf.parse_tour(tour_html, 'tour/post42.html')
+    assert (cache.misses, cache.hits) == (1, 1)
+
+
+def test_changed_extractor_is_parsed_again(tmp_path, tour_html, monkeypatch):
+    cache = ParseCache(str(tmp_path))
+    cache.parse_tour(tour_html, 'tour/post42.html')
+    monkeypatch.setitem(pf.field_versions, 'peaks', pf.field_versions['peaks'] + 1)
+
+    tour = cache.parse_tour(tour_html, 'tour/post42.html', ['name', 'peaks'])
+    assert tour == pf.parse_tour(tour_html, 'tour/post42.html', ['name', 'peaks'])
+    assert (cache.partial_hits, cache.recomputed_fields) == (1, len(pf.field_parsers) - len(uncached_fields) + 1)
+
+
+def test_entry_evicted_while_read(tmp_path, monkeypatch, tour_html):
+    cache = ParseCache(str(tmp_path))
+    cache.parse_tour(tour_html, 'tour/post42.html', ['name'])
+
+    def utime(path):
+        # Another process evicts the entry between reading and touching it
+        raise FileNotFoundError(path)
+    monkeypatch.setattr(os, 'utime', utime)
+    assert cache.parse_tour(tour_html, 'tour/post42.html', ['name']) == pf.parse_tour(tour_html, 'tour/post42.html', ['name'])
+    assert cache.hits == 1
+
+
+def test_failed_field_is_not_cached(tmp_path, tour_html):
+    cache = ParseCache(str(tmp_path))
+    html = tour_html.replace('text-align:center;color:#666', 'no-page-views')
+
+    for run in range(2):
+        stats = pf.ParseStats()
+        tour = cache.parse_tour(html, 'tour/post42.html', ['name', 'page_views'], stats)
+        assert tour['page_views'] is None
+        # The failure is reported on every run, the other field comes from the cache after the first run
+        assert stats.failures == {'page_views': 1}
+        assert set(stats.calls) == ({'name', 'page_views'} if run == 0 else {'page_views'})
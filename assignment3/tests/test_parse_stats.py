@@ -0,0 +1,37 @@
+import random
+import lib.parser_functions as pf
+import lib.synthetic_tours as synthetic_tours
+
+
+def test_summary_without_failures():
+    stats = pf.ParseStats()
+    html = synthetic_tours.generate_tour_html(random.Random(1))
+    pf.parse_tour(html, 'tour/post123.html', ['name', 'peaks'], stats)
+
+    summary = stats.summary()
+    assert set(summary['field']) == {'name', 'peaks'}
+    assert (summary['calls'] == 1).all()
+    assert (summary['failures'] == 0).all()
+    assert summary['first_error'].isna().all()
+
+
+def test_failing_field_is_counted():
+    stats = pf.ParseStats()
+    # No page views counter on the page
+    tour = pf.parse_tour('<html><body></body></html>', 'tour/post1.html', ['page_views'], stats)
+
+    summary = stats.summary().set_index('field')
+    assert tour['page_views'] is None
+    assert summary.loc['page_views', 'failures'] == 1
+    assert 'post1.html' in summary.loc['page_views', 'first_error']
+
+
+def test_spark_summary_without_failures(spark):
+    import lib.spark_functions as sf
+    accumulator = sf.parse_stats_accumulator(spark)
+    stats = pf.ParseStats()
+    pf.parse_tour(synthetic_tours.generate_tour_html(random.Random(1)), 'tour/post123.html', ['name'], stats)
+    accumulator.add(stats)
+
+    rows = sf.parse_stats_summary(spark, accumulator).collect()
+    assert [(row.field, row.failures, row.first_error) for row in rows] == [('name', 0, None)]
@@ -0,0 +1,57 @@
+from datetime import date
+import lib.parser_functions as pf
+
+
+def test_document_is_built_once(monkeypatch, tour_html):
+    calls = {'Selector': 0, 'parse_fiche': 0}
+
+    def counting(name, function):
+        def wrapper(*args, **kwargs):
+            calls[name] += 1
+            return function(*args, **kwargs)
+        return wrapper
+
+    class CountingSelector(pf.Selector):
+        def __init__(self, *args, **kwargs):
+            if 'text' in kwargs:
+                calls['Selector'] += 1
+            super().__init__(*args, **kwargs)
+    monkeypatch.setattr(pf, 'Selector', CountingSelector)
+    monkeypatch.setattr(pf, 'parse_fiche', counting('parse_fiche', pf.parse_fiche))
+
+    tour = pf.parse_tour(tour_html, 'tour/post1.html')
+
+    assert (tour['id'], tour['name'], tour['ascent'], len(tour['waypoints'])) == ('1', 'Synthetic Tour 596854', 959, 3)
+    assert calls == {'Selector': 1, 'parse_fiche': 1}
+
+
+def test_plain_tour_has_no_dataclasses(tour_html):
+    tour = pf.plain_tour(pf.parse_tour(tour_html, 'tour/post1.html'))
+
+    def plain(value):
+        if isinstance(value, dict):
+            return all(plain(item) for item in value.values())
+        if isinstance(value, list):
+            return all(plain(item) for item in value)
+        return value is None or isinstance(value, (str, int, float, date))
+    assert plain(tour)
+    assert isinstance(tour['peaks'][0], dict) and isinstance(tour['duration'], str)
+
+
+def test_only_requested_fields_are_parsed(monkeypatch, tour_html):
+    full = pf.parse_tour(tour_html, 'tour/post1.html')
+    called = []
+
+    def recording(field, parser):
+        def wrapper(tour):
+            called.append(field)
+            return parser(tour)
+        return wrapper
+    monkeypatch.setattr(pf, 'field_parsers', {field: recording(field, parser) for field, parser in pf.field_parsers.items()})
+    fields = ['photo_count', 'name', 'hiking_difficulty']
+
+    tour = pf.parse_tour(tour_html, 'tour/post1.html', fields)
+
+    assert list(tour) == fields
+    assert tour == {field: full[field] for field in fields}
+    assert called == fields
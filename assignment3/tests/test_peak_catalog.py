@@ -0,0 +1,49 @@
+import random
+import subprocess
+import sys
+import os
+from lib.parser_functions import Peak
+from lib.peak_catalog import PeakCatalog, haversine_km
+
+
+def _random_peaks(count=500, seed=5):
+    rng = random.Random(seed)
+    return [Peak(rng.uniform(45.8, 47.8), rng.uniform(5.9, 10.5), f'Peak {i}', rng.randint(1000, 4600), i) for i in range(count)]
+
+
+def test_import_without_pyspark():
+    directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = 'import sys; sys.modules["pyspark"] = None; import lib.peak_catalog'
+    assert subprocess.run([sys.executable, '-c', code], cwd=directory).returncode == 0
+
+
+def test_queries_same_as_brute_force():
+    peaks = _random_peaks()
+    catalog = PeakCatalog(peaks)
+    rng = random.Random(9)
+    for _ in range(20):
+        latitude, longitude = rng.uniform(45.8, 47.8), rng.uniform(5.9, 10.5)
+        distances = sorted((haversine_km(latitude, longitude, peak.latitude, peak.longitude), peak.id) for peak in peaks)
+
+        assert [peak.id for peak, _ in catalog.nearest(latitude, longitude, 5)] == [peak_id for _, peak_id in distances[:5]]
+        assert sorted(peak.id for peak, _ in catalog.within_radius(latitude, longitude, 15)) == sorted(peak_id for distance, peak_id in distances if distance <= 15)
+        bbox = (latitude - 0.2, longitude - 0.3, latitude + 0.2, longitude + 0.3)
+        expected = {peak.id for peak in peaks if bbox[0] <= peak.latitude <= bbox[2] and bbox[1] <= peak.longitude <= bbox[3]}
+        assert {peak.id for peak in catalog.within_bbox(*bbox)} == expected
+
+
+def test_from_tours_deduplicates_and_counts():
+    peaks = _random_peaks(3)
+    catalog = PeakCatalog.from_tours([{'peaks': peaks[:2]}, {'peaks': peaks[1:]}, {'peaks': None}])
+
+    assert len(catalog) == 3
+    assert catalog.tour_counts == {0: 1, 1: 2, 2: 1}
+
+
+def test_write_read_round_trip(tmp_path):
+    catalog = PeakCatalog.from_tours([{'peaks': _random_peaks(50)}])
+    catalog.write(str(tmp_path / 'peaks.parquet'))
+    read = PeakCatalog.read(str(tmp_path / 'peaks.parquet'))
+
+    assert [(peak.id, peak.name, peak.height) for peak in read.peaks] == [(peak.id, peak.name, peak.height) for peak in catalog.peaks]
+    assert read.tour_counts == catalog.tour_counts
@@ -0,0 +1,43 @@
+import random
+import re
+import lib.parser_functions as pf
+
+# The regex of the baseline parser, https://regex101.com/r/3EiAxt/1
+baseline_pattern = re.compile(r'pizs\.push\(\{.*?piz_lat:([\d.]+),.*?piz_lon:([\d.]+),.*?piz_name:"(.*?)",.*?piz_height:(\d+),.*?piz_id:(\d+).*?\}\)', re.DOTALL)
+
+
+def _block(name='Piz Palü', peak_id=1, with_name=True):
+    name_key = f'piz_name:"{name}",' if with_name else ''
+    return f'pizs.push({{piz_lat:46.37,piz_lon:9.96,{name_key}piz_height:3900,piz_id:{peak_id}}});\n'
+
+
+def _page(rng):
+    # Well formed peak blocks and photo ids in random order
+    parts = [
+        f'pizs.push({{piz_lat:{rng.uniform(45, 48):.5f},piz_lon:{rng.uniform(6, 10):.5f},piz_name:"Peak {number}",piz_height:{rng.randint(200, 4800)},piz_id:{rng.randint(1, 99999)},piz_url:"https://www.hikr.org/dir/Peak_{number}/"}});\n'
+        for number in range(rng.randint(0, 5))
+    ]
+    parts += [f'{{photo_id:{rng.randint(1, 10 ** 7)},title:"Foto"}},\n' for _ in range(rng.randint(0, 10))]
+    rng.shuffle(parts)
+    return '<html><script>' + ''.join(parts) + '</script></html>'
+
+
+def test_matches_baseline_on_well_formed_pages(tour_html):
+    rng = random.Random(7)
+    for html in [tour_html] + [_page(rng) for _ in range(50)]:
+        peaks, photo_count = pf.parse_peaks_and_photo_count(html)
+        expected = [(float(lat), float(lon), name, int(height), int(peak_id)) for lat, lon, name, height, peak_id in baseline_pattern.findall(html)]
+        assert [(p.latitude, p.longitude, p.name, p.height, p.id) for p in peaks] == expected
+        assert photo_count == pf.count_photos(html)
+
+
+def test_incomplete_block_does_not_take_keys_of_next_block():
+    html = _block('Ohne Name', 1, with_name=False) + _block('Piz Palü', 2)
+    peaks, _ = pf.parse_peaks_and_photo_count(html)
+    assert peaks == [pf.Peak(46.37, 9.96, 'Piz Palü', 3900, 2)]
+
+
+def test_unterminated_block_is_skipped():
+    html = 'pizs.push({piz_lat:46.37,piz_lon:9.96,piz_name:"Offen",piz_height:3900,piz_id:1' + ' ' * 5000 + _block('Piz Bernina', 2)
+    peaks, _ = pf.parse_peaks_and_photo_count(html)
+    assert [peak.id for peak in peaks] == [2]
@@ -0,0 +1,80 @@
+import pytest
+import lib.arrow_functions as af
+import lib.parser_functions as pf
+import lib.synthetic_tours as synthetic_tours
+
+# Only run where pyspark (and a JVM) is available, see the spark fixture in conftest.py
+sf = pytest.importorskip('lib.spark_functions')
+aggregates = pytest.importorskip('lib.aggregates')
+
+
+def _tours_df(spark, count=3, **kwargs):
+    return spark.createDataFrame(list((html, file_path) for file_path, html in synthetic_tours.iter_tours(count, **kwargs)), 'value string, file_path string')
+
+
+def test_publishing_date_same_instant_as_udf(spark, tour_html):
+    from pyspark.sql.functions import col, udf
+    tours_df = spark.createDataFrame([(tour_html, f'tour/post{number}.html') for number in range(3)], 'value string, file_path string')
+    parse_udf = udf(lambda content, file_path: {field: pf.parse_tour(content, file_path)[field] for field in ['id', 'publishing_date']}, returnType='id string, publishing_date timestamp')
+    expected = tours_df.select(parse_udf(col('value'), col('file_path')).alias('tour')).select('tour.id', 'tour.publishing_date')
+
+    parsed = tours_df.mapInArrow(af.parse_arrow_batches, sf.parsed_tour_schema).select('id', 'publishing_date')
+    assert sorted(parsed.collect()) == sorted(expected.collect())
+
+
+def test_ingest_only_new_or_changed_tours(spark, tmp_path):
+    tours = list(synthetic_tours.iter_tours(3))
+    table_path = str(tmp_path / 'tours')
+    assert sf.ingest_incremental(spark, _tours_df(spark), table_path, fields=['name']) == 3
+    assert sf.ingest_incremental(spark, _tours_df(spark), table_path, fields=['name']) == 0
+
+    file_path, html = tours[0]
+    changed = [(html.replace('<h1 class="title">', '<h1 class="title">Changed '), file_path)] + [(html, file_path) for file_path, html in tours[1:]]
+    assert sf.ingest_incremental(spark, spark.createDataFrame(changed, 'value string, file_path string'), table_path, fields=['name']) == 1
+
+    latest = {row.id: row.name for row in sf.read_latest(spark, table_path).collect()}
+    assert len(latest) == 3
+    assert latest[pf.parse_tour_id(file_path)].startswith('Changed ')
+
+
+def test_ingest_field_subset_with_aggregates(spark, tmp_path):
+    tours_df = _tours_df(spark, peaks=2)
+    count = sf.ingest_incremental(spark, tours_df, str(tmp_path / 'tours'), fields=['name'], aggregates_path=str(tmp_path / 'aggregates'))
+
+    assert count == 3
+    assert aggregates.read_aggregate(spark, str(tmp_path / 'aggregates'), 'peaks').count() > 0
+
+
+def test_merged_aggregates_same_as_full_aggregate(spark):
+    parsed_df = sf.parse_tours(_tours_df(spark, count=8, peaks=3), aggregates.aggregate_fields + ['id'])
+    first, second = parsed_df.where('id < "100004"'), parsed_df.where('id >= "100004"')
+
+    for name, keys in aggregates.aggregate_keys.items():
+        merged = aggregates.merge_aggregates(aggregates.compute_aggregate(first, name), aggregates.compute_aggregate(second, name), name)
+        full = aggregates.compute_aggregate(parsed_df, name)
+        assert sorted(merged.collect()) == sorted(full.select(*merged.columns).collect())
+
+
+def test_native_peaks_same_as_parser(spark):
+    blocks = [
+        'pizs.push({piz_lat:46.37,piz_lon:9.96,piz_name:"Piz Palü",piz_height:3900,piz_id:1});',
+        'pizs.push({piz_lat:46.38,piz_lon:9.90,piz_height:4049,piz_id:2});',  # No name
+        'pizs.push({piz_lat:46.40,piz_lon:9.91,piz_name:"",piz_height:3000,piz_id:3});',  # Empty name
+    ]
+    html = '<html><body><script>' + '\n'.join(blocks) + '</script></body></html>'
+    tours_df = spark.createDataFrame([(html, './post1.html')], 'value string, file_path string')
+
+    native = sf.native_fields(tours_df, ['peaks']).first().peaks
+    expected = pf.parse_tour(html, './post1.html', ['peaks'])['peaks']
+    assert [(peak.name, peak.height, peak.id) for peak in native] == [(peak.name, peak.height, peak.id) for peak in expected]
+    assert [peak.id for peak in native] == [1, 3]
+
+
+def test_parsed_tours_layout(spark, tmp_path):
+    parsed_df = sf.parse_tours(_tours_df(spark, count=6), slim=True)
+    sf.write_parsed_tours(parsed_df, str(tmp_path / 'parsed'))
+
+    assert {path.name.split('=')[0] for path in (tmp_path / 'parsed').iterdir() if path.is_dir()} == {'country'}
+    read_df = sf.read_parsed_tours(spark, str(tmp_path / 'parsed'))
+    assert {'country', 'tour_year'} <= set(read_df.columns)
+    assert read_df.count() == 6
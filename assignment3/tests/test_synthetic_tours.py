@@ -0,0 +1,12 @@
+import lib.parser_functions as pf
+import lib.synthetic_tours as synthetic_tours
+
+
+def test_iter_tours_same_as_generate_tours():
+    assert dict(synthetic_tours.iter_tours(5, seed=3, peaks=2)) == synthetic_tours.generate_tours(5, seed=3, peaks=2)
+
+
+def test_generated_counts_are_parsed():
+    for file_path, html in synthetic_tours.iter_tours(3, waypoints=4, peaks=2, photos=7, partners=1):
+        tour = pf.parse_tour(html, file_path)
+        assert (len(tour['waypoints']), len(tour['peaks']), tour['photo_count'], len(tour['tour_partner'])) == (4, 2, 7, 1)
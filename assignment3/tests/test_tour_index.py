@@ -0,0 +1,55 @@
+import random
+import pyarrow as pa
+import pyarrow.parquet as pq
+from lib.tour_index import TourIndex, decode_postings, encode_postings, tour_terms
+
+tours = [
+    {'id': '1', 'name': 'Piz Palü Überschreitung', 'regions': {'level1': 'Schweiz', 'level2': 'Graubünden'},
+     'waypoints': [{'name': 'Piz Palü', 'type': 'peak'}, {'name': 'Diavolezza', 'type': 'hut'}], 'author_public_name': 'Alberto', 'author_internal_name': 'alberto'},
+    {'id': '2', 'name': 'Pizzo Rotondo', 'regions': {'level1': 'Schweiz', 'level2': 'Tessin'},
+     'waypoints': [{'name': 'Pizzo Rotondo', 'type': 'peak'}], 'author_public_name': 'Mong', 'author_internal_name': 'mong'},
+    {'id': '3', 'name': 'Hüttenwanderung', 'regions': {'level1': 'Schweiz', 'level2': 'Graubünden'},
+     'waypoints': [{'name': 'Chamanna Coaz', 'type': 'hut'}], 'author_public_name': 'Mong', 'author_internal_name': 'mong'},
+]
+
+
+def test_postings_round_trip():
+    numbers = sorted(random.Random(5).sample(range(10 ** 6), 1000))
+    assert decode_postings(encode_postings(numbers)) == numbers
+    assert decode_postings(encode_postings([0, 127, 128, 16384])) == [0, 127, 128, 16384]
+
+
+def test_terms_are_normalized():
+    terms = tour_terms(tours[0])
+    assert {'name:piz', 'name:palu', 'region:graubunden', 'waypoint:piz palu', 'waypoint_type:hut', 'author:alberto'} <= terms
+
+
+def test_lookup():
+    index = TourIndex.build(tours)
+
+    assert len(index) == 3
+    assert index.lookup('region', 'GRAUBÜNDEN') == ['1', '3']
+    assert index.lookup('waypoint_type', 'hut') == ['1', '3']
+    assert index.lookup('name', 'piz palu') == ['1']
+    assert index.lookup('waypoint', 'piz*') == ['1', '2']
+    assert index.lookup('name', 'piz*') == ['1', '2']
+    assert index.lookup('author', 'nobody') == []
+
+
+def test_search():
+    index = TourIndex.build(tours)
+
+    assert index.search(all_of=[('region', 'Graubünden'), ('waypoint_type', 'hut')], none_of=[('author', 'alberto')]) == ['3']
+    assert index.search(any_of=[('region', 'tessin'), ('author', 'alberto')]) == ['1', '2']
+    assert index.search(none_of=[('author', 'mong')]) == ['1']
+    assert index.search(all_of=[('region', 'tessin'), ('author', 'alberto')]) == []
+
+
+def test_save_load_and_parquet(tmp_path):
+    pq.write_table(pa.Table.from_pylist(tours), tmp_path / 'tours.parquet')
+    index = TourIndex.from_parquet(str(tmp_path / 'tours.parquet'))
+    index.save(str(tmp_path / 'tours.index'))
+    loaded = TourIndex.load(str(tmp_path / 'tours.index'))
+
+    assert loaded.terms == TourIndex.build(tours).terms
+    assert loaded.lookup('region', 'graubunden') == ['1', '3']
@@ -0,0 +1,232 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+import requests
+from typing import Callable, Dict
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# On disk cache of HTTP responses, shared by the fetchers of all assignments
+# (assignment1/lib/fetch.py, assignment2/lib/geoadmin.py and openstreetmap.py import it as shared.http_cache)
+# Configured with environment variables:
+#   HTTP_CACHE_DIR      cache directory (default: ./data/http_cache)
+#   HTTP_CACHE_TTL      seconds a response is fresh (default: 7 days)
+#   HTTP_CACHE_MAX_MB   size bound of the cache (default: 1024)
+#   HTTP_CACHE_OFFLINE  1 = only serve from the cache, never touch the network
+
+# Responses with these status codes are not cached (transient errors)
+uncached_status_codes = {408, 429, 500, 502, 503, 504}
+
+
+class OfflineCacheMiss(Exception):
+    """
+    Raised in offline mode for a request which is not in the cache
+    """
+
+
+class CachedResponse:
+    """
+    The parts of a requests.Response which are stored in the cache
+    """
+
+    def __init__(self, url: str, status_code: int, headers: Dict[str, str], content: bytes, encoding: str):
+        self.url = url
+        self.status_code = status_code
+        self.headers = requests.structures.CaseInsensitiveDict(headers)
+        self.content = content
+        self.encoding = encoding
+        self.from_cache = False
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise requests.HTTPError(f'{self.status_code} for url: {self.url}', response=self)
+
+
+def normalize_request(method: str, url: str, params: dict = None, data=None) -> str:
+    """
+    Normalize a request so equal requests get the same key: lower case scheme and host,
+    query parameters of the URL and params merged and sorted, no fragment
+    :param method: HTTP method
+    :param url: URL of the request
+    :param params: Query parameters
+    :param data: Request body
+    :return: The normalized request
+    """
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True) + [(str(key), str(value)) for key, value in (params or {}).items()]
+    normalized_url = urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or '/', urlencode(sorted(query)), ''))
+    body = data if isinstance(data, (str, bytes)) else json.dumps(data, sort_keys=True) if data is not None else ''
+    return f'{method.upper()} {normalized_url} {body}'
+
+
+class HttpCache:
+    """
+    Cache of HTTP responses keyed by the normalized request, with a TTL and size bounded LRU eviction.
+    Every entry is a pickle file, the modification time is used as last access time.
+    Thread safe: the counters, the size and the eviction are guarded by a lock (fetch.map_concurrent uses a thread pool).
+    """
+
+    def __init__(self, directory: str, ttl: float = 7 * 24 * 3600, max_bytes: int = 1024 * 1024 * 1024, offline: bool = False):
+        """
+        :param directory: Directory of the cache
+        :param ttl: Seconds a response is fresh
+        :param max_bytes: Size bound of the cache
+        :param offline: Only serve from the cache (stale entries included), misses raise OfflineCacheMiss
+        """
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+        self.total_bytes = None
+        self.lock = threading.RLock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + '.pkl')
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith('.pkl'):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(root, name))
+                except FileNotFoundError:  # Evicted by another process
+                    continue
+                yield os.path.join(root, name), stat.st_size, stat.st_mtime
+
+    def load(self, key: str, ttl: float = None) -> CachedResponse:
+        """
+        Load a response from the cache
+        :param key: Key of the request, see request_key
+        :param ttl: Seconds a response is fresh (default: ttl of the cache)
+        :return: The response or None if it is missing or expired (expired responses are still served offline)
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                stored_at, response = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+        if time.time() - stored_at > (self.ttl if ttl is None else ttl) and not self.offline:
+            with self.lock:
+                self.stale += 1
+            return None
+        try:
+            os.utime(path)
+        except FileNotFoundError:  # Evicted since it was read
+            pass
+        response.from_cache = True
+        return response
+
+    def store(self, key: str, response: CachedResponse):
+        """
+        Store a response, evicts the least recently used entries if the cache is too large
+        :param key: Key of the request, see request_key
+        :param response: The response
+        """
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump((time.time(), response), f, protocol=pickle.HIGHEST_PROTOCOL)
+        # Replacing the entry and updating the size is one step, otherwise two threads storing the same key count it twice
+        with self.lock:
+            if self.total_bytes is None:
+                self.total_bytes = sum(size for _, size, _ in self._entries())
+            old_size = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+            self.total_bytes += os.path.getsize(path) - old_size
+            if self.total_bytes > self.max_bytes:
+                self.evict()
+
+    def evict(self):
+        """
+        Delete the least recently used entries until the cache is at 90% of max_bytes
+        """
+        with self.lock:
+            entries = sorted(self._entries(), key=lambda entry: entry[2])
+            self.total_bytes = sum(size for _, size, _ in entries)
+            for path, size, _ in entries:
+                if self.total_bytes <= self.max_bytes * 0.9:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                self.total_bytes -= size
+                self.evictions += 1
+
+    def request_key(self, method: str, url: str, params: dict = None, data=None) -> str:
+        return hashlib.sha256(normalize_request(method, url, params, data).encode('utf-8')).hexdigest()
+
+    def get(self, url: str, params: dict = None, ttl: float = None, fetch: Callable = requests.get, **kwargs) -> CachedResponse:
+        """
+        GET request which is served from the cache if possible
+        :param url: URL of the request
+        :param params: Query parameters
+        :param ttl: Seconds a cached response is fresh (default: ttl of the cache)
+        :param fetch: Function which sends the request, e.g. a session with retries (default: requests.get)
+        :param kwargs: Passed to fetch, e.g. headers (headers are not part of the key)
+        :return: The response
+        """
+        key = self.request_key('GET', url, params)
+        response = self.load(key, ttl)
+        with self.lock:
+            if response is not None:
+                self.hits += 1
+                return response
+            self.misses += 1
+        if self.offline:
+            raise OfflineCacheMiss(f'Not in the HTTP cache: {normalize_request("GET", url, params)}')
+        if params is not None:
+            kwargs['params'] = params
+        live = fetch(url, **kwargs)
+        response = CachedResponse(live.url, live.status_code, dict(live.headers), live.content, live.encoding)
+        if response.status_code not in uncached_status_codes:
+            self.store(key, response)
+        return response
+
+    def stats(self) -> Dict[str, int]:
+        """
+        :return: Hit / miss counters of this process and the size of the cache
+        """
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'stale': self.stale,
+                'evictions': self.evictions,
+                'bytes': self.total_bytes if self.total_bytes is not None else sum(size for _, size, _ in self._entries()),
+            }
+
+
+cache = HttpCache(
+    os.environ.get('HTTP_CACHE_DIR', './data/http_cache'),
+    ttl=float(os.environ.get('HTTP_CACHE_TTL', 7 * 24 * 3600)),
+    max_bytes=int(os.environ.get('HTTP_CACHE_MAX_MB', 1024)) * 1024 * 1024,
+    offline=os.environ.get('HTTP_CACHE_OFFLINE') == '1',
+)
+
+
+def get(url: str, params: dict = None, ttl: float = None, fetch: Callable = requests.get, **kwargs) -> CachedResponse:
+    """
+    GET request over the shared cache, see HttpCache.get
+    """
+    return cache.get(url, params, ttl, fetch, **kwargs)
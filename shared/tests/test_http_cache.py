@@ -0,0 +1,58 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import shared.http_cache as http_cache
+
+
+class FakeResponse:
+    def __init__(self, url, content=b'x' * 1000, status_code=200):
+        self.url = url
+        self.status_code = status_code
+        self.headers = {'Content-Type': 'text/plain'}
+        self.content = content
+        self.encoding = 'utf-8'
+
+
+def fetch(url, **kwargs):
+    return FakeResponse(url)
+
+
+def size_on_disk(directory):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(directory) for name in files if name.endswith('.pkl'))
+
+
+def test_equal_requests_share_the_key():
+    assert http_cache.normalize_request('get', 'HTTPS://Example.org/a?b=2&a=1#top') == http_cache.normalize_request('GET', 'https://example.org/a', {'a': 1, 'b': 2})
+
+
+def test_hit_miss_and_ttl(tmp_path):
+    cache = http_cache.HttpCache(str(tmp_path))
+    assert not cache.get('https://example.org/a', fetch=fetch).from_cache
+    assert cache.get('https://example.org/a', fetch=fetch).from_cache
+    assert not cache.get('https://example.org/a', ttl=-1, fetch=fetch).from_cache
+    assert (cache.hits, cache.misses, cache.stale) == (1, 2, 1)
+
+
+def test_transient_errors_are_not_cached(tmp_path):
+    cache = http_cache.HttpCache(str(tmp_path))
+    cache.get('https://example.org/a', fetch=lambda url, **kwargs: FakeResponse(url, status_code=503))
+    assert cache.get('https://example.org/a', fetch=fetch).status_code == 200
+    assert cache.misses == 2
+
+
+def test_offline_miss_raises(tmp_path):
+    cache = http_cache.HttpCache(str(tmp_path), offline=True)
+    with pytest.raises(http_cache.OfflineCacheMiss):
+        cache.get('https://example.org/a', fetch=fetch)
+
+
+def test_concurrent_bookkeeping(tmp_path):
+    cache = http_cache.HttpCache(str(tmp_path), max_bytes=50 * 1024)
+    urls = [f'https://example.org/{i % 100}' for i in range(1000)]
+    with ThreadPoolExecutor(16) as pool:
+        list(pool.map(lambda url: cache.get(url, fetch=fetch), urls))
+
+    assert cache.hits + cache.misses == len(urls)
+    assert cache.total_bytes == size_on_disk(tmp_path)
+    assert cache.total_bytes <= cache.max_bytes
+